@@ -0,0 +1,2 @@
+from benchmarks.synthetic import SyntheticSpec, create_app, synthetic_processor
+from benchmarks.suite import run_benchmarks, compare, load_baseline, save_baseline
@@ -0,0 +1,41 @@
+"""Pydgeot benchmarks
+
+Usage:
+  python -m benchmarks [-s SIZES] [-j N] [-b PATH] [-t RATIO] [--save]
+  python -m benchmarks -h | --help
+
+Options:
+  -h, --help                Show this screen
+  -s SIZES, --sizes SIZES   Comma separated numbers of source files [default: 1000,10000]
+  -j N, --jobs N            Number of worker threads for building content [default: 1]
+  -b PATH, --baseline PATH  Baseline JSON file to compare against [default: benchmarks/baseline.json]
+  -t RATIO, --tolerance RATIO
+                            Slowdown over the baseline considered a regression [default: 1.25]
+  --save                    Store the results in the baseline file
+"""
+
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    from docopt import docopt
+    from benchmarks import run_benchmarks, compare, load_baseline, save_baseline
+
+    args = docopt(__doc__)
+    sizes = [int(size) for size in args['--sizes'].split(',')]
+
+    with tempfile.TemporaryDirectory(prefix='pydgeot-bench-') as root:
+        results = run_benchmarks(root, sizes, jobs=max(int(args['--jobs']), 1))
+
+    regressed = False
+    for size, name, base, value, is_regressed in compare(results, load_baseline(args['--baseline']),
+                                                         float(args['--tolerance'])):
+        regressed = regressed or is_regressed
+        print('{0:>7} {1:<28} {2:>9.3f}s {3:>10} {4}'.format(
+            size, name, value,
+            '{:.3f}s'.format(base) if base is not None else '-',
+            'REGRESSED' if is_regressed else ''))
+
+    if args['--save']:
+        save_baseline(results, args['--baseline'])
+    elif regressed:
+        sys.exit(1)
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import random
+import logging
+from benchmarks.synthetic import SyntheticSpec, create_app, synthetic_processor
+
+
+default_sizes = (1000, 10000)
+default_baseline_path = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def run_benchmarks(root, sizes=default_sizes, jobs=1, samples=100, **spec_options):
+    """
+    Create a synthetic app for each size, and time building and querying it.
+
+    :param root: Directory to create synthetic apps in.
+    :type root: str
+    :param sizes: Numbers of source files to benchmark with.
+    :type sizes: collections.Iterable[int]
+    :param jobs: Number of worker threads to build with.
+    :type jobs: int
+    :param samples: Number of source paths to time dependency queries for.
+    :type samples: int
+    :param spec_options: Options for each SyntheticSpec, other than the number of files.
+    :return: Dictionary of sizes, and dictionaries of benchmark names and times in seconds.
+    :rtype: dict[str, dict[str, float]]
+    """
+    results = {}
+    with synthetic_processor():
+        for size in sizes:
+            spec = SyntheticSpec(files=size, **spec_options)
+            results[str(size)] = _run(os.path.join(root, 'app_{}'.format(size)), spec, jobs, samples)
+    return results
+
+
+def _run(path, spec, jobs, samples):
+    """
+    Time a single synthetic app.
+
+    :type path: str
+    :type spec: SyntheticSpec
+    :type jobs: int
+    :type samples: int
+    :rtype: dict[str, float]
+    """
+    from pydgeot.generator import Generator
+
+    app = create_app(path, spec)
+    # Per file logging would be timed along with the build.
+    app.log.setLevel(logging.WARNING)
+    timings = {}
+
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        timings[name] = time.perf_counter() - start
+        return value
+
+    try:
+        gen = Generator(app, jobs=jobs)
+        changes = timed('collect_changes', gen.collect_changes)
+        timed('process_changes', gen.process_changes, changes)
+        timed('collect_changes_noop', gen.collect_changes)
+
+        rng = random.Random(spec.seed)
+        sources = sorted(source.path for source in app.sources.get_sources())
+        for source in rng.sample(sources, max(len(sources) // 100, 1)):
+            with open(source, 'a') as fh:
+                fh.write('Changed\n')
+        changes = gen.collect_changes()
+        timed('process_changes_incremental', gen.process_changes, changes)
+
+        sample = rng.sample(sources, min(samples, len(sources)))
+        timed('sources_get_dependencies', lambda: [app.sources.get_dependencies(source, recursive=True)
+                                                   for source in sample])
+        timed('contexts_get_dependencies', lambda: [app.contexts.get_dependencies(source, reverse=True)
+                                                    for source in sample])
+
+        timed('clean', app.clean, [app.source_root])
+    finally:
+        app.close()
+
+    return timings
+
+
+def load_baseline(path=default_baseline_path):
+    """
+    Load stored benchmark results.
+
+    :param path: Baseline JSON file path.
+    :type path: str
+    :return: Dictionary of sizes, and dictionaries of benchmark names and times in seconds. Empty if the file does not
+             exist.
+    :rtype: dict[str, dict[str, float]]
+    """
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh).get('results', {})
+
+
+def save_baseline(results, path=default_baseline_path):
+    """
+    Store benchmark results, merged over any results already stored for other sizes.
+
+    :param results: Dictionary of sizes, and dictionaries of benchmark names and times in seconds.
+    :type results: dict[str, dict[str, float]]
+    :param path: Baseline JSON file path.
+    :type path: str
+    """
+    from pydgeot import __version__
+
+    merged = load_baseline(path)
+    merged.update(results)
+    spec = SyntheticSpec().as_dict()
+    del spec['files']
+    with open(path, 'w') as fh:
+        json.dump({'version': __version__, 'spec': spec, 'results': merged}, fh, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, tolerance=1.25):
+    """
+    Compare benchmark results to a baseline.
+
+    :param results: Dictionary of sizes, and dictionaries of benchmark names and times in seconds.
+    :type results: dict[str, dict[str, float]]
+    :param baseline: Baseline results, in the same form.
+    :type baseline: dict[str, dict[str, float]]
+    :param tolerance: Ratio of result to baseline time above which a benchmark is considered to have regressed.
+    :type tolerance: float
+    :return: List of tuples of size, benchmark name, baseline time (or None if there is no baseline,) result time, and
+             whether it has regressed.
+    :rtype: list[tuple[str, str, float | None, float, bool]]
+    """
+    comparisons = []
+    for size, timings in sorted(results.items(), key=lambda item: int(item[0])):
+        for name, value in timings.items():
+            base = baseline.get(size, {}).get(name, None)
+            comparisons.append((size, name, base, value, base is not None and value > base * tolerance))
+    return comparisons
@@ -0,0 +1,160 @@
+import os
+import json
+import random
+import contextlib
+from pydgeot.processors import register, Processor
+
+
+# Header line prefixes used by synthetic source files, followed by the file body.
+_DEPENDS = '#depends '
+_CONTEXT = '#context '
+_USES = '#uses '
+
+
+class SyntheticSpec:
+    """
+    Shape of a synthetic app source tree.
+    """
+    def __init__(self, files=1000, depth=3, branching=4, fan_out=2, context_vars=2, context_values=50,
+                 context_globs=0.1, seed=0):
+        """
+        :param files: Number of source files.
+        :type files: int
+        :param depth: Number of directory levels files are placed under.
+        :type depth: int
+        :param branching: Number of subdirectories in each directory.
+        :type branching: int
+        :param fan_out: Number of other source files each file depends on.
+        :type fan_out: int
+        :param context_vars: Number of context vars each file sets.
+        :type context_vars: int
+        :param context_values: Number of distinct values each context var may be set to.
+        :type context_values: int
+        :param context_globs: Fraction of files that depend on a context var with a glob value.
+        :type context_globs: float
+        :param seed: Random seed, so the same spec always produces the same tree.
+        :type seed: int
+        """
+        self.files = files
+        self.depth = depth
+        self.branching = branching
+        self.fan_out = fan_out
+        self.context_vars = context_vars
+        self.context_values = context_values
+        self.context_globs = context_globs
+        self.seed = seed
+
+    def as_dict(self):
+        """
+        :rtype: dict[str, int | float]
+        """
+        return dict(self.__dict__)
+
+
+@contextlib.contextmanager
+def synthetic_processor():
+    """
+    Register the 'synthetic' processor while the context is active, so it is only available to apps created within it,
+    and is removed from the available processors afterwards.
+    """
+    from pydgeot import processors
+
+    added = 'synthetic' not in processors.available
+    register(name='synthetic', help_msg='Builds synthetic benchmark sources')(SyntheticProcessor)
+    try:
+        yield
+    finally:
+        if added:
+            processors.available.pop('synthetic', None)
+
+
+def create_app(path, spec):
+    """
+    Create a new app directory, filled with a synthetic source tree processed by the 'synthetic' processor. Should be
+    called within synthetic_processor.
+
+    :param path: Directory path to create as a new app directory.
+    :type path: str
+    :param spec: Shape of the source tree to create.
+    :type spec: SyntheticSpec
+    :return: App instance for the new app directory.
+    :rtype: pydgeot.app.App
+    """
+    from pydgeot.app import App
+
+    App.create(path).close()
+    with open(os.path.join(path, 'pydgeot.conf'), 'w') as fh:
+        json.dump({'processors': ['synthetic']}, fh)
+
+    rng = random.Random(spec.seed)
+    rels = [_rel_path(spec, index) for index in range(spec.files)]
+    for index, rel in enumerate(rels):
+        lines = []
+        if index > 0 and spec.fan_out > 0:
+            deps = set(rng.randrange(index) for _ in range(spec.fan_out))
+            lines.append(_DEPENDS + ' '.join(sorted(rels[dep] for dep in deps)))
+        for var in range(spec.context_vars):
+            lines.append('{}var{}=value{}'.format(_CONTEXT, var, rng.randrange(max(spec.context_values, 1))))
+        if spec.context_vars > 0 and rng.random() < spec.context_globs:
+            lines.append('{}var{}=value{}*'.format(_USES, rng.randrange(spec.context_vars),
+                                                    rng.randrange(max(spec.context_values // 10, 1))))
+        lines.append('Synthetic file {}'.format(index))
+
+        source = os.path.join(path, 'source', rel)
+        os.makedirs(os.path.dirname(source), exist_ok=True)
+        with open(source, 'w') as fh:
+            fh.write('\n'.join(lines) + '\n')
+
+    return App(path)
+
+
+def _rel_path(spec, index):
+    """
+    Get the relative source path of a synthetic file, spreading files evenly over the directory tree.
+
+    :type spec: SyntheticSpec
+    :type index: int
+    :rtype: str
+    """
+    parts = []
+    branch = index
+    for _ in range(spec.depth):
+        parts.append('dir{}'.format(branch % spec.branching))
+        branch //= spec.branching
+    parts.append('file{}.txt'.format(index))
+    return os.path.join(*parts)
+
+
+class SyntheticProcessor(Processor):
+    """
+    Processor for synthetic source files. Header lines set the files source dependencies, context vars, and context
+    var dependencies, and the remaining body is copied to the build directory.
+    """
+    def can_process(self, path):
+        return path.endswith('.txt')
+
+    def prepare(self, path):
+        depends = []
+        contexts = []
+        uses = []
+        with open(path) as fh:
+            for line in fh:
+                if line.startswith(_DEPENDS):
+                    depends.extend(self.app.source_path(rel) for rel in line[len(_DEPENDS):].split())
+                elif line.startswith(_CONTEXT):
+                    contexts.append(tuple(line[len(_CONTEXT):].strip().split('=', 1)))
+                elif line.startswith(_USES):
+                    name, value = line[len(_USES):].strip().split('=', 1)
+                    uses.append((name, value, None))
+        self.app.sources.set_targets(path, [self.app.target_path(path)])
+        self.app.sources.set_dependencies(path, depends)
+        self.app.contexts.set_contexts(path, contexts)
+        self.app.contexts.set_dependencies(path, uses)
+
+    def generate(self, path):
+        target = self.app.target_path(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(path) as fh:
+            body = [line for line in fh if not line.startswith('#')]
+        with open(target, 'w') as fh:
+            fh.writelines(body)
@@ -1,10 +1,16 @@
 import json
 import os
+import hashlib
+import threading
 import logging
 import logging.handlers
 import importlib
 import sqlite3
-from pydgeot.app.dirconfig import DirConfig
+import time
+from pydgeot.app import schema
+from pydgeot.app.cache import BuildCache
+from pydgeot.app.database import DatabaseWriter, apply_profile, get_profile, regex_func
+from pydgeot.app.dirconfig import DirConfig, DirConfigCache
 from pydgeot.app.sources import Sources
 from pydgeot.app.contexts import Contexts
 
@@ -13,22 +19,6 @@ class AppError(Exception):
     pass
 
 
-def _db_regex_func(expr, item):
-    """
-    REGEXP search function for SQLite.
-
-    :param expr:
-    :type expr: str
-    :param item:
-    :type item:
-    :return: True if a match is found.
-    :rtype: bool
-    """
-    import re
-    reg = re.compile(expr, re.I)
-    return reg.search(item) is not None
-
-
 class App:
     plugins_package_name = 'pydgeot.plugins'
 
@@ -52,9 +42,35 @@ class App:
         self.processors = {}
         """:type: dict[str, pydgeot.processors.Processor]"""
 
+        # Root configuration file settings
+        self.settings = {}
+        """:type: dict[str, Any]"""
+
+        # Directory configurations
+        self.config_cache = DirConfigCache(self)
+
+        # Cache of generated targets, if enabled by the build_cache setting
+        self.build_cache = None
+        """:type: BuildCache | None"""
+
+        # Resolved processors, keyed by source path. Loaded from the sources table when first needed.
+        self._resolved_processors = None
+        """:type: dict[str, tuple[str, str | None]] | None"""
+        self._unsaved_processors = {}
+        """:type: dict[str, tuple[str, str | None]]"""
+        self._resolved_processors_lock = threading.Lock()
+        self._processors_digest = None
+        """:type: str | None"""
+
         self.db_path = os.path.join(self.store_root, 'pydgeot.db')
+        self.db_profile = 'default'
+        self.db_in_memory = False
+        """:type: bool"""
+        self.db_save_interval = 60
+        """:type: float"""
         self.db_connection = None
         self.db_cursor = None
+        self.db_writer = DatabaseWriter()
         self.sources = None
         """:type: Sources | None"""
         self.contexts = None
@@ -96,6 +112,17 @@ class App:
                         config = json.load(fh)
                 except ValueError as e:
                     raise AppError('Could not load config \'{}\': \'{}\''.format(config_path, e))
+            self.settings = config
+
+            build_cache = config.get('build_cache', False)
+            if build_cache:
+                options = build_cache if isinstance(build_cache, dict) else {}
+                try:
+                    max_age = float(options['max_age']) * 24 * 60 * 60 if 'max_age' in options else None
+                    max_size = int(float(options['max_size']) * 1024 * 1024) if 'max_size' in options else None
+                except (TypeError, ValueError):
+                    raise AppError('Invalid build_cache max_age or max_size, expected a number of days or megabytes')
+                self.build_cache = BuildCache(self, max_age=max_age, max_size=max_size)
 
             # Init database
             self._init_database()
@@ -110,13 +137,82 @@ class App:
 
         for name, processor in processors.available.items():
             self.processors[name] = processor(self)
+        self._processors_digest = hashlib.sha1(
+            repr(sorted((name, processor.__class__.__module__, processor.__class__.__name__)
+                        for name, processor in self.processors.items())).encode('utf-8')).hexdigest()
+
+        if self.is_valid:
+            self.config_cache.load()
 
     def _init_database(self):
-        self.db_connection = sqlite3.connect(self.db_path)
-        self.db_connection.create_function('REGEXP', 2, _db_regex_func)
+        settings = dict(self.settings.get('database', {}))
+        self.db_in_memory = bool(settings.pop('in_memory', False))
+        try:
+            self.db_save_interval = max(float(settings.pop('save_interval', 60)), 0)
+        except (TypeError, ValueError):
+            raise AppError('Invalid database save_interval, expected a number of seconds')
+        self.db_profile, pragmas = get_profile(settings)
+        if self.db_in_memory:
+            # Load the store in to memory, to be written back by commit.
+            self.db_connection = sqlite3.connect(':memory:', check_same_thread=False)
+            if os.path.isfile(self.db_path):
+                disk_connection = sqlite3.connect(self.db_path)
+                try:
+                    disk_connection.backup(self.db_connection)
+                finally:
+                    disk_connection.close()
+        else:
+            self.db_connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        apply_profile(self.db_connection, pragmas)
+        self.db_connection.create_function('REGEXP', 2, regex_func)
         self.db_cursor = self.db_connection.cursor()
+        schema.migrate(self.db_cursor)
         self.sources = Sources(self)
         self.contexts = Contexts(self)
+        self._resolved_processors = None
+        self._unsaved_processors = {}
+        self._db_saved_changes = None
+        self._db_saved_time = time.monotonic()
+
+    def commit(self, save=False):
+        """
+        Commit the current database transaction. If the database is in memory, has been changed since it was last
+        written, and was last written at least db_save_interval seconds ago, it is also written back to the store.
+
+        :param save: Write an in memory database back to the store if it has changed, however recently it was written.
+        :type save: bool
+        """
+        self.db_connection.commit()
+        if (self.db_in_memory and self.db_connection.total_changes != self._db_saved_changes and
+                (save or time.monotonic() - self._db_saved_time >= self.db_save_interval)):
+            self._save_database()
+            self._db_saved_changes = self.db_connection.total_changes
+            self._db_saved_time = time.monotonic()
+
+    def close(self):
+        """
+        Commit and close the database connection.
+        """
+        if self.db_connection is not None:
+            self.commit(save=True)
+            self.db_connection.close()
+            self.db_connection = None
+
+    def _save_database(self):
+        """
+        Write the in memory database to the store. The backup is written in a single transaction on the store, through
+        its own journal, so an interrupted write leaves the previous store in place.
+        """
+        disk_connection = sqlite3.connect(self.db_path)
+        try:
+            self.db_connection.backup(disk_connection)
+        finally:
+            disk_connection.close()
+
+    def _remove_database_files(self, *paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
 
     @classmethod
     def create(cls, path):
@@ -149,7 +245,9 @@ class App:
                     os.remove(os.path.join(root, name))
                 for name in dirs:
                     os.rmdir(os.path.join(root, name))
-        os.unlink(self.db_path)
+        self.db_connection.close()
+        # Remove any write ahead log or shared memory files left by the journal mode along with the database.
+        self._remove_database_files(self.db_path, self.db_path + '-wal', self.db_path + '-shm')
         self._init_database()
 
     def clean(self, paths):
@@ -160,16 +258,16 @@ class App:
         :param paths: List of directory paths to clean.
         :type paths: list[str]
         """
+        from pydgeot.filesystem import Scanner
+
         for path in paths:
-            if os.path.isdir(path):
-                for root, dirs, files in os.walk(path, topdown=False, followlinks=False):
-                    for source in [os.path.join(root, file) for file in files]:
-                        self.processor_delete(source)
+            for entry in Scanner(path).scan():
+                self.processor_delete(os.path.join(path, entry.path))
         for processor in self.processors.values():
             processor.generation_complete()
         self.contexts.clean(paths)
         self.sources.clean(paths)
-        self.db_connection.commit()
+        self.commit()
 
     def get_config(self, path):
         """
@@ -184,7 +282,9 @@ class App:
 
     def get_processor(self, path):
         """
-        Get a processor able to handle the given path.
+        Get a processor able to handle the given path. Resolved processors are cached, and stored with the paths
+        source entry by save_processors, keyed on the paths directory config and the set of available processors, so a
+        path is only resolved again once either changes.
 
         :param path: File path to get a capable processor for.
         :type path: str
@@ -192,7 +292,48 @@ class App:
         :rtype: pydgeot.app.processors.Processor | None
         """
         config = self.get_config(path)
+        key = '{}:{}'.format(config.fingerprint, self._processors_digest)
+
+        resolved = self._resolved_processors
+        if resolved is None:
+            with self._resolved_processors_lock:
+                if self._resolved_processors is None:
+                    self._resolved_processors = self.sources.get_processors() if self.sources is not None else {}
+                resolved = self._resolved_processors
+
+        cached = resolved.get(path, None)
+        if cached is not None and cached[0] == key:
+            return self.processors.get(cached[1], None) if cached[1] is not None else None
+
+        processor = self._resolve_processor(config, path)
+        name = None
+        if processor is not None:
+            name = next((name for name, other in self.processors.items() if other is processor), None)
+            if name is None:
+                return processor
+        resolved[path] = (key, name)
+        self._unsaved_processors[path] = (key, name)
+        return processor
+
+    def save_processors(self):
+        """
+        Store newly resolved processors with their paths source entries.
+        """
+        unsaved, self._unsaved_processors = self._unsaved_processors, {}
+        if len(unsaved) > 0 and self.sources is not None:
+            self.sources.set_processors(unsaved)
+
+    def _resolve_processor(self, config, path):
+        """
+        Find the processor able to handle the given path, asking each processor in the paths config.
 
+        :param config: Configuration for the path.
+        :type config: pydgeot.app.dirconfig.DirConfig
+        :param path: File path to get a capable processor for.
+        :type path: str
+        :return: File processor, or None if a processor capable of handling the file cannot be found.
+        :rtype: pydgeot.app.processors.Processor | None
+        """
         processors = set([processor for processor in config.processors if processor.can_process(path)])
 
         if len(processors) > 1:
@@ -246,12 +387,27 @@ class App:
 
     def processor_generate(self, path):
         """
-        Process a generate event for the given path.
+        Process a generate event for the given path. If the build cache is enabled, the paths processor is cacheable
+        and has a version, and the cache holds targets for the paths current content and inputs, they are restored
+        instead.
 
         :param path: File path to process.
         :type path: str
         """
-        return self._processor_call('generate', path)
+        processor = self.get_processor(path)
+        if self.build_cache is None or processor is None or not processor.cacheable or processor.version is None:
+            return self._processor_call('generate', path)
+
+        key = self.build_cache.key(processor, path)
+        if key is not None and self.build_cache.restore(key, path):
+            self.log.info('[%s] cached "%s"', processor.name if processor.name else processor.__class__.__name__,
+                          self.relative_path(path))
+            return processor, None
+
+        result = self._processor_call('generate', path)
+        if key is not None and result[0] is not None:
+            self.build_cache.store(key, path)
+        return result
 
     def processor_delete(self, path):
         """
@@ -315,6 +471,35 @@ class App:
         path = '' if path == '.' else path
         return path
 
+    def directory_filter(self, path, recursive=False, column='directory', case_sensitive=False):
+        """
+        Get an SQL condition on the sources tables directory column for the given directory path. Used for retrieving
+        file paths in or under the given directory. Unlike path_regex, the condition is able to use the directory
+        column index, so only rows in the selected directories are visited. Like path_regex, directories are matched
+        case insensitively by default, though only ASCII characters are folded.
+
+        :param path: Directory path.
+        :type path: str
+        :param recursive: Condition should retrieve files in all subdirectories.
+        :type recursive: bool
+        :param column: Name of the relative directory path column to filter on.
+        :type column: str
+        :param case_sensitive: Match directories case sensitively. Columns matched case insensitively should have a
+                               NOCASE index for the condition to use.
+        :type case_sensitive: bool
+        :return: Tuple of the SQL condition, and a list of its parameters.
+        :rtype: tuple[str, list[str]]
+        """
+        rel = self.relative_path(path)
+        if not case_sensitive:
+            column += ' COLLATE NOCASE'
+        if not recursive:
+            return '{0} = ?'.format(column), [rel]
+        if rel == '':
+            return '1 = 1', []
+        # Subdirectories sort between 'rel/' and the next character after the path separator.
+        return '({0} = ? OR ({0} >= ? AND {0} < ?))'.format(column), [rel, rel + os.sep, rel + chr(ord(os.sep) + 1)]
+
     def path_regex(self, path, recursive=False):
         """
         Get a regex for the given directory path. Used for retrieving file paths in or under the given directory.
@@ -0,0 +1,336 @@
+import os
+import hashlib
+import threading
+
+
+class BuildCache:
+    """
+    Content addressed cache of generated targets, kept in the Apps store directory. Entries are keyed by the content of
+    a source file, the content of the source files it depends on, the context vars it and its dependencies depend on,
+    its processor, and the content of its directory config files. Target content is stored once per distinct content,
+    however many entries refer to it.
+
+    Restoring an entry copies its targets back in to the build directory, and sets the sources targets and context
+    vars as they were after the entry was generated, without calling the processor.
+
+    Entries are stored as JSON. Pruning removes entries for sources that no longer exist, entries unused for longer than
+    max_age, and the least recently used entries once their targets take up more than max_size, along with any stored
+    target content no longer used by an entry.
+    """
+    version = 2
+    default_max_age = 30 * 24 * 60 * 60
+    default_max_size = 1024 * 1024 * 1024
+
+    def __init__(self, app, root=None, max_age=None, max_size=None):
+        """
+        :param app: Parent App instance.
+        :type app: pydgeot.app.App
+        :param root: Directory to keep the cache in. If None, the cache directory in the Apps store directory is used.
+        :type root: str | None
+        :param max_age: Seconds since an entry was last stored or restored before it is pruned, defaults to
+                        BuildCache.default_max_age.
+        :type max_age: float | None
+        :param max_size: Total size in bytes of stored targets above which the least recently used entries are pruned,
+                         defaults to BuildCache.default_max_size.
+        :type max_size: int | None
+        """
+        self.app = app
+        self.root = root if root is not None else os.path.join(app.store_root, 'cache')
+        self.max_age = max_age if max_age is not None else self.default_max_age
+        self.max_size = max_size if max_size is not None else self.default_max_size
+        self._digests = {}
+        """:type: dict[str, tuple[int, int, str]]"""
+        self._lock = threading.Lock()
+
+    def key(self, processor, path):
+        """
+        Get the cache key for generating a source path with a processor. Should be called after the source path has
+        been prepared, so its dependencies are current.
+
+        :param processor: Processor that generates the source path.
+        :type processor: pydgeot.processors.Processor
+        :param path: Source path.
+        :type path: str
+        :return: Cache key, or None if the source path or one of its dependencies could not be read.
+        :rtype: str | None
+        """
+        parts = [self.version,
+                 processor.name, processor.__class__.__module__, processor.__class__.__qualname__, processor.version,
+                 self.app.relative_path(path)]
+
+        for config_path, mtime in self.app.get_config(path).config_files:
+            parts.append((os.path.relpath(config_path, self.app.root), self._digest(config_path)
+                          if mtime is not None else None))
+
+        paths = [path] + sorted(source.path for source in self.app.sources.get_dependencies(path, recursive=True))
+        for source in paths:
+            digest = self._digest(source)
+            if digest is None:
+                return None
+            parts.append((self.app.relative_path(source), digest))
+
+        contexts = set()
+        for source in paths:
+            contexts |= set((result.name, result.value, self.app.relative_path(result.source))
+                            for result in self.app.contexts.get_dependencies(source))
+        parts.append(sorted(contexts, key=repr))
+
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def restore(self, key, path):
+        """
+        Restore the targets and context vars of a cached entry for a source path.
+
+        :param key: Cache key, from BuildCache.key.
+        :type key: str
+        :param path: Source path.
+        :type path: str
+        :return: True if the entry was restored, False if there is no complete entry for the key.
+        :rtype: bool
+        """
+        from pydgeot.filesystem import copy_file
+
+        entry = self._read_entry(self._entry_path(key))
+        if entry is None:
+            return False
+        targets = entry['targets']
+        contexts = [tuple(context) for context in entry['contexts']]
+
+        objects = [(self.app.target_path(rel), self._object_path(digest)) for rel, digest in targets]
+        if not all(os.path.isfile(object_path) for target, object_path in objects):
+            return False
+
+        try:
+            for target, object_path in objects:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # Never hard link, as changes to a built file would change the cached content.
+                copy_file(object_path, target, 'reflink')
+        except OSError as e:
+            self.app.log.warning('Unable to restore cache entry \'{}\': {}'.format(key, e))
+            return False
+        self.app.sources.set_targets(path, [target for target, object_path in objects])
+        self.app.contexts.set_contexts(path, contexts)
+        self._touch(self._entry_path(key))
+        return True
+
+    def store(self, key, path):
+        """
+        Store the current targets and context vars of a generated source path.
+
+        :param key: Cache key, from BuildCache.key, taken before the source path was generated.
+        :type key: str
+        :param path: Source path.
+        :type path: str
+        :return: True if the entry was stored, False if any of the targets are not regular files, or could not be
+                 stored.
+        :rtype: bool
+        """
+        try:
+            return self._store(key, path)
+        except (OSError, TypeError, ValueError) as e:
+            self.app.log.warning('Unable to store cache entry \'{}\': {}'.format(key, e))
+            return False
+
+    def _store(self, key, path):
+        """
+        :type key: str
+        :type path: str
+        :rtype: bool
+        """
+        import json
+        from pydgeot.filesystem import copy_file, file_digest
+
+        targets = []
+        for target in sorted(result.path for result in self.app.sources.get_targets(path)):
+            if os.path.islink(target) or not os.path.isfile(target):
+                return False
+            digest = file_digest(target)
+            object_path = self._object_path(digest)
+            if not os.path.isfile(object_path):
+                self._write(object_path, lambda temp_path: copy_file(target, temp_path, 'reflink'))
+            targets.append((self.app.relative_path(target), digest))
+
+        contexts = sorted(((result.name, result.value) for result in self.app.contexts.get_contexts(source=path)),
+                          key=repr)
+        entry = {'source': self.app.relative_path(path), 'targets': targets, 'contexts': contexts}
+
+        def write_entry(temp_path):
+            with open(temp_path, 'w') as fh:
+                json.dump(entry, fh)
+
+        self._write(self._entry_path(key), write_entry)
+        return True
+
+    def prune(self):
+        """
+        Remove entries for sources that no longer exist, entries unused for longer than max_age, and the least recently
+        used entries while the stored targets of the rest take up more than max_size. Stored targets no longer used by
+        any entry are then removed.
+
+        :return: Number of entries removed, and number of bytes of stored targets removed.
+        :rtype: tuple[int, int]
+        """
+        import time
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for entry_path in self._files(os.path.join(self.root, 'entries')):
+            entry = self._read_entry(entry_path)
+            try:
+                mtime = os.stat(entry_path).st_mtime
+            except OSError:
+                continue
+            if (entry is None or now - mtime > self.max_age or
+                    not os.path.isfile(self.app.source_path(entry['source']))):
+                removed += self._remove(entry_path)
+                continue
+            entries.append((mtime, entry_path, entry))
+
+        # Keep the most recently used entries, while their stored targets fit in max_size.
+        used = set()
+        size = 0
+        for mtime, entry_path, entry in sorted(entries, key=lambda item: item[0], reverse=True):
+            digests = set(digest for rel, digest in entry['targets']) - used
+            entry_size = sum(self._size(self._object_path(digest)) for digest in digests)
+            if size + entry_size > self.max_size:
+                removed += self._remove(entry_path)
+                continue
+            used |= digests
+            size += entry_size
+
+        removed_size = 0
+        for object_path in self._files(os.path.join(self.root, 'objects')):
+            if os.path.basename(object_path) not in used:
+                object_size = self._size(object_path)
+                if self._remove(object_path):
+                    removed_size += object_size
+
+        if removed > 0 or removed_size > 0:
+            self.app.log.info('Pruned %d build cache entries, and %.1fMB of cached targets', removed,
+                              removed_size / 1e6)
+        return removed, removed_size
+
+    def _read_entry(self, entry_path):
+        """
+        Read a stored entry.
+
+        :type entry_path: str
+        :return: Dictionary of the entries source path, targets and contexts, or None if it does not exist or could not
+                 be read.
+        :rtype: dict[str, Any] | None
+        """
+        import json
+
+        try:
+            with open(entry_path) as fh:
+                entry = json.load(fh)
+            if not isinstance(entry, dict) or not all(name in entry for name in ('source', 'targets', 'contexts')):
+                raise ValueError('Malformed entry')
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.app.log.warning('Unable to load cache entry \'{}\': {}'.format(os.path.basename(entry_path), e))
+            return None
+
+    @staticmethod
+    def _files(root):
+        """
+        Get the paths of files in a cache directory, skipping temporary files being written.
+
+        :type root: str
+        :rtype: collections.Iterable[str]
+        """
+        if not os.path.isdir(root):
+            return
+        for prefix in os.listdir(root):
+            directory = os.path.join(root, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith('.tmp'):
+                    yield os.path.join(directory, name)
+
+    @staticmethod
+    def _remove(path):
+        """
+        :type path: str
+        :return: True if the file was removed.
+        :rtype: bool
+        """
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _size(path):
+        """
+        :type path: str
+        :rtype: int
+        """
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _touch(path):
+        """
+        Mark an entry as used now, so it is pruned by age from its last use.
+
+        :type path: str
+        """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write(self, path, write):
+        """
+        Write a cache file through a temporary file, so partially written files are never read.
+
+        :type path: str
+        :type write: callable[str]
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def _digest(self, path):
+        """
+        Get the content digest of a file, reusing the last digest taken while its size and modified time are unchanged.
+
+        :type path: str
+        :rtype: str | None
+        """
+        from pydgeot.filesystem import file_digest
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._digests.get(path, None)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        try:
+            digest = file_digest(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, 'entries', key[:2], key)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
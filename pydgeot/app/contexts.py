@@ -1,9 +1,156 @@
 from collections import namedtuple
+from pydgeot.app.database import chunked, compile_regex, synchronized
+from pydgeot.app.graph import walk
 
 
 ContextResult = namedtuple('ContextResult', ['name', 'value', 'source'])
 """Named Tuple containing a context vars name, value, and source path."""
 
+_Dependency = namedtuple('_Dependency', ['name', 'value', 'globbed', 'source', 'dependency'])
+"""Named Tuple containing a context var dependencies name, value, globbed flag, source and dependency relative paths."""
+
+
+def _text(value):
+    """
+    Convert a context var value the same way SQLite does when storing it in a TEXT column.
+
+    :type value: object | None
+    :rtype: str | bytes | None
+    """
+    if value is None or isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, bool):
+        value = int(value)
+    return str(value)
+
+
+class _ContextIndex:
+    """
+    In memory index of context vars and context var dependencies, keyed by relative source paths. Used to resolve
+    context var dependencies without querying the database for each source path walked.
+    """
+    def __init__(self):
+        self.vars_by_source = {}
+        """:type: dict[str, list[tuple[str, str | None]]]"""
+        self.vars_by_name = {}
+        """:type: dict[str, dict[str, list[str | None]]]"""
+        self.deps_by_name = {}
+        """:type: dict[str, set[_Dependency]]"""
+        self.deps_by_dependency = {}
+        """:type: dict[str, set[_Dependency]]"""
+        self.deps_by_source = {}
+        """:type: dict[str, set[_Dependency]]"""
+
+    def add_var(self, source, name, value):
+        """
+        :type source: str
+        :type name: str
+        :type value: str | None
+        """
+        self.vars_by_source.setdefault(source, []).append((name, value))
+        self.vars_by_name.setdefault(name, {}).setdefault(source, []).append(value)
+
+    def remove_vars(self, source=None, name=None):
+        """
+        Remove context vars with a given name and/or source, as in Contexts.remove_context.
+
+        :type source: str | None
+        :type name: str | None
+        """
+        if source is not None:
+            if name is None:
+                names = set([var_name for var_name, _ in self.vars_by_source.pop(source, ())])
+            else:
+                names = {name}
+                remaining = [var for var in self.vars_by_source.get(source, ()) if var[0] != name]
+                if len(remaining) > 0:
+                    self.vars_by_source[source] = remaining
+                else:
+                    self.vars_by_source.pop(source, None)
+            for var_name in names:
+                sources = self.vars_by_name.get(var_name, {})
+                sources.pop(source, None)
+                if len(sources) == 0:
+                    self.vars_by_name.pop(var_name, None)
+        elif name is not None:
+            for var_source in self.vars_by_name.pop(name, {}):
+                self.remove_vars(var_source, name)
+
+    def add_dependency(self, dependency):
+        """
+        :type dependency: _Dependency
+        """
+        self.deps_by_name.setdefault(dependency.name, set()).add(dependency)
+        self.deps_by_dependency.setdefault(dependency.dependency, set()).add(dependency)
+        if dependency.source is not None:
+            self.deps_by_source.setdefault(dependency.source, set()).add(dependency)
+
+    def remove_dependencies(self, dependency=None, source=None):
+        """
+        Remove context var dependencies set for a dependency path, or that reference a context var source path.
+
+        :type dependency: str | None
+        :type source: str | None
+        """
+        if dependency is not None:
+            removed = self.deps_by_dependency.pop(dependency, set())
+        else:
+            removed = self.deps_by_source.pop(source, set())
+        for dep in removed:
+            for index, key in ((self.deps_by_name, dep.name),
+                               (self.deps_by_dependency, dep.dependency),
+                               (self.deps_by_source, dep.source)):
+                deps = index.get(key)
+                if deps is not None:
+                    deps.discard(dep)
+                    if len(deps) == 0:
+                        del index[key]
+
+    def get_dependencies(self, path, reverse=False):
+        """
+        Get context var dependencies for a relative source path.
+
+        :type path: str
+        :type reverse: bool
+        :return: Set of name, value, and relative source path tuples.
+        :rtype: set[tuple[str, str | None, str]]
+        """
+        results = set()
+        if reverse:
+            for name, value in self.vars_by_source.get(path, ()):
+                for dep in self.deps_by_name.get(name, ()):
+                    if dep.source is not None and dep.source != path:
+                        continue
+                    if value is not None and not self._match(dep, value):
+                        continue
+                    results.add((dep.name, dep.value, dep.dependency))
+        else:
+            for dep in self.deps_by_dependency.get(path, ()):
+                sources = self.vars_by_name.get(dep.name, {})
+                if dep.source is not None:
+                    sources = {dep.source: sources.get(dep.source, ())}
+                for source, values in sources.items():
+                    for value in values:
+                        if dep.value is not None and (value is None or not self._match(dep, value)):
+                            continue
+                        results.add((dep.name, value, source))
+        return results
+
+    @staticmethod
+    def _match(dependency, value):
+        """
+        Check if a context var value matches a dependencies value. A dependency without a value matches all values.
+
+        :type dependency: _Dependency
+        :type value: str
+        :rtype: bool
+        """
+        if dependency.value is None:
+            return True
+        if dependency.globbed:
+            return compile_regex(dependency.value).search(value) is not None
+        return dependency.value == value
+
 
 class Contexts:
     """
@@ -19,34 +166,57 @@ class Contexts:
         """
         self.app = app
         self.cursor = self.app.db_cursor
+        self._index = None
+        """:type: _ContextIndex | None"""
+
+    @property
+    def index(self):
+        """
+        In memory index of context vars and their dependencies. Loaded from the database on first use, and kept up to
+        date by any methods that modify context vars or dependencies.
+
+        :rtype: _ContextIndex
+        """
+        if self._index is None:
+            index = _ContextIndex()
+            results = self.cursor.execute('''
+                SELECT c.name, c.value, s.path
+                FROM context_vars AS c
+                    INNER JOIN sources s ON s.id = c.source_id
+                ''')
+            for name, value, source in results:
+                index.add_var(source, name, value)
+            results = self.cursor.execute('''
+                SELECT c.name, c.value, c.value_globbed, c.source_id, s.path, d.path
+                FROM context_var_dependencies AS c
+                    LEFT JOIN sources s ON s.id = c.source_id
+                    INNER JOIN sources d ON d.id = c.dependency_id
+                ''')
+            for name, value, globbed, source_id, source, dependency in results:
+                # Skip dependencies on sources that no longer exist.
+                if source_id is not None and source is None:
+                    continue
+                index.add_dependency(_Dependency(name, value, globbed == 1, source, dependency))
+            self._index = index
+        return self._index
 
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS context_vars (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                value TEXT,
-                source_id INTEGER NOT NULL,
-                FOREIGN KEY(source_id) REFERENCES sources(id)
-                    ON DELETE CASCADE
-                    ON UPDATE CASCADE)
-            ''')
-        # Use 'name' here rather than id in case the var isn't set yet.
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS context_var_dependencies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                value TEXT,
-                value_globbed INTEGER DEFAULT 0,
-                source_id INTEGER,
-                dependency_id INTEGER NOT NULL,
-                FOREIGN KEY(source_id) REFERENCES sources(id)
-                    ON DELETE CASCADE
-                    ON UPDATE CASCADE,
-                FOREIGN KEY(dependency_id) REFERENCES sources(id)
-                    ON DELETE CASCADE
-                    ON UPDATE CASCADE)
-            ''')
+    @synchronized
+    def forget_sources(self, paths):
+        """
+        Remove context vars and dependencies for source paths that have been removed from the sources table.
 
+        :param paths: Relative or source paths.
+        :type paths: list[str]
+        """
+        if self._index is None:
+            return
+        for path in paths:
+            rel = self.app.relative_path(path)
+            self._index.remove_vars(source=rel)
+            self._index.remove_dependencies(dependency=rel)
+            self._index.remove_dependencies(source=rel)
+
+    @synchronized
     def clean(self, paths):
         """
         Delete entries under the given source directories and their subdirectories.
@@ -55,19 +225,24 @@ class Contexts:
         :type paths: list[str]
         """
         for path in paths:
-            regex = self.app.path_regex(path, recursive=True)
-            self.cursor.execute('SELECT id FROM sources WHERE path REGEXP ?', (regex, ))
-            ids = [result[0] for result in self.cursor.fetchall()]
-            if len(ids) > 0:
-                id_query = '(' + ','.join('?' * len(ids)) + ')'
+            condition, params = self.app.directory_filter(path, recursive=True)
+            self.cursor.execute('SELECT id, path FROM sources WHERE {0}'.format(condition), params)
+            results = self.cursor.fetchall()
+            ids = [result[0] for result in results]
+            for chunk in chunked(ids):
+                id_query = '(' + ','.join('?' * len(chunk)) + ')'
                 self.cursor.execute('''
                     DELETE
                     FROM context_var_dependencies
                     WHERE
                         dependency_id IN {0}
-                    '''.format(id_query), ids)
-                self.cursor.execute('DELETE FROM context_vars WHERE source_id IN {0}'.format(id_query), ids)
+                    '''.format(id_query), chunk)
+                self.cursor.execute('DELETE FROM context_vars WHERE source_id IN {0}'.format(id_query), chunk)
+            for _, rel in results:
+                self.index.remove_vars(source=rel)
+                self.index.remove_dependencies(dependency=rel)
 
+    @synchronized
     def get_context(self, name, value=None, source=None):
         """
         Get the first context var with a given name and optional source path.
@@ -84,6 +259,7 @@ class Contexts:
         values = self.get_contexts(name, value, source)
         return list(values)[0] if len(values) > 0 else None
 
+    @synchronized
     def get_contexts(self, name=None, value=None, source=None):
         """
         Get all context vars that match name, value, and source parameters. Arguments that are None will not be used in
@@ -115,7 +291,17 @@ class Contexts:
             query_vars.append(name)
         if value is not None:
             glob = Glob(str(value))
-            if glob.is_glob:
+            if glob.is_glob and glob.like is not None:
+                # Match with SQLites LIKE where it is equivalent to the globs regex, which is for any values without line
+                # breaks. Values with line breaks fall back to REGEXP.
+                like, separators = glob.like
+                query += '''
+                    AND ((instr(c.value, char(10)) = 0 AND c.value LIKE ? ESCAPE '\\'{0}) OR
+                         (instr(c.value, char(10)) > 0 AND c.value REGEXP ?))
+                    '''.format('' if separators else " AND instr(c.value, '/') = 0")
+                query_vars.append(like)
+                query_vars.append(glob.regex)
+            elif glob.is_glob:
                 query += ' AND c.value REGEXP ?'
                 query_vars.append(glob.regex)
             else:
@@ -128,6 +314,7 @@ class Contexts:
         results = self.cursor.execute(query, query_vars)
         return set([ContextResult(result[0], result[1], self.app.source_path(result[2])) for result in results])
 
+    @synchronized
     def set_context(self, source, name, value):
         """
         Set a context var for the source path. Removes any other context vars with the same name and source path.
@@ -139,9 +326,67 @@ class Contexts:
         :param source: Source path of the context var.
         :type source: str
         """
-        self.remove_context(source, name)
-        self.add_context(source, name, value)
+        self.set_contexts(source, [(name, value)])
+
+    @synchronized
+    def set_contexts(self, source, values):
+        """
+        Set many context vars for the source path at once. Removes any other context vars with the same names and
+        source path, as set_context does for each name. Only context vars that have been added or removed since they
+        were last set are written.
+
+        :param source: Source path of the context vars.
+        :type source: str
+        :param values: Dictionary of context var names and values, or list of name and value tuples. A name given more
+                       than once in a list will have each of its values set.
+        :type values: dict[str, object] | list[tuple[str, object]]
+        """
+        rel = self.app.relative_path(source)
+        sid = self.app.sources.add_source(source)
+        new_values = {}
+        for name, value in (values.items() if isinstance(values, dict) else values):
+            new_values.setdefault(name, []).append(value)
+
+        old_values = {}
+        for chunk in chunked(new_values):
+            rows = self.cursor.execute(
+                'SELECT id, name, value FROM context_vars WHERE source_id = ? AND name IN ({0})'.format(
+                    ','.join('?' * len(chunk))),
+                [sid] + chunk)
+            for vid, name, value in rows:
+                old_values.setdefault(name, {}).setdefault(value, []).append(vid)
+
+        deletes = []
+        inserts = []
+        changed = set()
+        for name, name_values in new_values.items():
+            remaining = old_values.get(name, {})
+            for value in name_values:
+                vids = remaining.get(_text(value), None)
+                if vids:
+                    vids.pop()
+                else:
+                    inserts.append((name, value, sid))
+                    changed.add(name)
+            for vids in remaining.values():
+                if len(vids) > 0:
+                    deletes.extend(vids)
+                    changed.add(name)
 
+        if len(deletes) > 0:
+            self.cursor.executemany('DELETE FROM context_vars WHERE id = ?', [(vid, ) for vid in deletes])
+        if len(inserts) > 0:
+            self.cursor.executemany('''
+                INSERT INTO context_vars
+                    (name, value, source_id)
+                    VALUES (?, ?, ?)
+                    ''', inserts)
+        for name in changed:
+            self.index.remove_vars(source=rel, name=name)
+            for value in new_values[name]:
+                self.index.add_var(rel, name, _text(value))
+
+    @synchronized
     def add_context(self, source, name, value):
         """
         Add a context var for the source path. Allows multiple context vars with the same name and source path.
@@ -153,13 +398,30 @@ class Contexts:
         :param source: Source path of the context var.
         :type source: str
         """
+        self.add_contexts(source, [(name, value)])
+
+    @synchronized
+    def add_contexts(self, source, values):
+        """
+        Add many context vars for the source path at once.
+
+        :param source: Source path of the context vars.
+        :type source: str
+        :param values: Dictionary of context var names and values, or list of name and value tuples.
+        :type values: dict[str, object] | list[tuple[str, object]]
+        """
+        rel = self.app.relative_path(source)
         sid = self.app.sources.add_source(source)
-        self.cursor.execute('''
+        values = list(values.items() if isinstance(values, dict) else values)
+        self.cursor.executemany('''
             INSERT INTO context_vars
                 (name, value, source_id)
                 VALUES (?, ?, ?)
-                ''', (name, value, sid))
+                ''', [(name, value, sid) for name, value in values])
+        for name, value in values:
+            self.index.add_var(rel, name, _text(value))
 
+    @synchronized
     def remove_context(self, source=None, name=None):
         """
         Remove context vars with a given name and/or source path. The name and source arguments are both optional, but
@@ -180,9 +442,12 @@ class Contexts:
                     self.cursor.execute('DELETE FROM context_vars WHERE source_id = ?', (sid, ))
                 else:
                     self.cursor.execute('DELETE FROM context_vars WHERE name = ? AND source_id = ?', (name, sid))
+                self.index.remove_vars(source=rel, name=name)
         elif name is not None:
             self.cursor.execute('DELETE FROM context_vars WHERE name = ?', (name, ))
+            self.index.remove_vars(name=name)
 
+    @synchronized
     def get_dependencies(self, dependency, reverse=False, recursive=False):
         """
         Get all context var dependencies a source path depends on.
@@ -196,101 +461,34 @@ class Contexts:
         :return: Set of ContextResults.
         :rtype: set[pydgeot.app.contexts.ContextResult]
         """
-        if recursive:
-            return self._get_dependencies_recursive(dependency, reverse)
         rel = self.app.relative_path(dependency)
-        if reverse:
-            # Get all the context vars source sets
-            results = self.cursor.execute('''
-                SELECT c.name, c.value
-                FROM context_vars AS c
-                    INNER JOIN sources s ON s.id = c.source_id
-                WHERE
-                    s.path = ?
-                ''', (rel, ))
-
-            query = '''
-                SELECT c.name, c.value, d.path
-                FROM context_var_dependencies AS c
-                    LEFT JOIN sources s ON s.id = c.source_id
-                    INNER JOIN sources d ON d.id = c.dependency_id
-                WHERE
-                    0 = 1'''
-            query_vars = []
-            for name, value in list(results):
-                if name is None and value is None:
-                    continue
-                subqueries = []
-                if name is not None:
-                    subqueries.append('c.name = ?')
-                    query_vars.append(name)
-                if value is not None:
-                    subqueries.append('''
-                        ((c.value IS NULL) OR
-                         (c.value_globbed = 1 AND ? REGEXP c.value) OR
-                         (c.value_globbed <> 1 AND ? = c.value))''')
-                    query_vars.append(value)
-                    query_vars.append(value)
-                subqueries.append('(c.source_id IS NULL OR s.path = ?)')
-                query_vars.append(rel)
-                query += ' OR ({0})'.format(' AND '.join(subqueries))
-                results = self.cursor.execute(query, query_vars)
+        if recursive:
+            # Walk (name, value, source) results, following each results source path.
+            results = walk([(None, None, rel)], lambda result: self.index.get_dependencies(result[2], reverse))
         else:
-            results = self.cursor.execute('''
-                SELECT c.name, c.value, c.value_globbed, s.path
-                FROM context_var_dependencies AS c
-                    LEFT JOIN sources s ON s.id = c.source_id
-                    INNER JOIN sources d ON d.id = c.dependency_id
-                WHERE
-                    d.path = ?
-                ''', (rel, ))
-            query = '''
-                SELECT c.name, c.value, s.path
-                FROM context_vars AS c
-                    INNER JOIN sources s ON s.id = c.source_id
-                WHERE
-                    0 = 1'''
-            query_vars = []
-            for name, value, globbed, path in list(results):
-                if name is None and value is None and path is None:
-                    continue
-                subqueries = []
-                if name is not None:
-                    subqueries.append('c.name = ?')
-                    query_vars.append(name)
-                if value is not None:
-                    if globbed == 1:
-                        subqueries.append('c.value REGEXP ?')
-                    else:
-                        subqueries.append('c.value = ?')
-                    query_vars.append(value)
-                if path is not None:
-                    subqueries.append('s.path = ?')
-                    query_vars.append(path)
-                query += ' OR ({0})'.format(' AND '.join(subqueries))
-            results = self.cursor.execute(query, query_vars)
+            results = self.index.get_dependencies(rel, reverse)
 
         return set([ContextResult(result[0], result[1], self.app.source_path(result[2])) for result in results])
 
-    def _get_dependencies_recursive(self, dependency, reverse, _parent_deps=None):
+    @synchronized
+    def get_dependency_tree(self, dependencies, reverse=False):
         """
-        Get all context var dependencies a source path depends on, including all subdependencies.
+        Get the source paths of the entire context var dependency tree for a collection of source paths at once.
+        Equivalent to the union of the result sources of get_dependencies(dependency, reverse, recursive=True) for each
+        path, but walks the tree in a single pass.
 
-        :param dependency: Source path to get dependencies for.
-        :type dependency: str
-        :param reverse: Get context vars that depend on the dependency source path.
+        :param dependencies: Source paths to get dependencies for.
+        :type dependencies: collections.Iterable[str]
+        :param reverse: Get source paths that depend on context vars set by the given source paths.
         :type reverse: bool
-        :return: Set of ContextResults.
-        :rtype: set[pydgeot.app.contexts.ContextResult]
+        :return: Set of source paths.
+        :rtype: set[str]
         """
-        if _parent_deps is None:
-            _parent_deps = set()
-        dependencies = self.get_dependencies(dependency, reverse=reverse)
-        for dependency_ in list(dependencies):
-            if dependency_ not in _parent_deps:
-                dependencies |= self._get_dependencies_recursive(dependency_.source, reverse, _parent_deps=dependencies)
-        return dependencies
+        rels = walk([self.app.relative_path(dependency) for dependency in dependencies],
+                    lambda rel: set([result[2] for result in self.index.get_dependencies(rel, reverse)]))
+        return set([self.app.source_path(rel) for rel in rels])
 
+    @synchronized
     def clear_dependencies(self, dependency):
         """
         Removes all dependencies for a source path.
@@ -300,7 +498,9 @@ class Contexts:
         """
         did = self.app.sources.add_source(dependency)
         self.cursor.execute('DELETE FROM context_var_dependencies WHERE dependency_id = ?', (did, ))
+        self.index.remove_dependencies(dependency=self.app.relative_path(dependency))
 
+    @synchronized
     def add_dependency(self, dependency, name, value=None, source=None):
         """
         Add a context var dependency for a source path.
@@ -314,17 +514,105 @@ class Contexts:
         :param source: Source path of the named context var.
         :type source: str | None
         """
-        from pydgeot.filesystem import Glob
+        self.add_dependencies(dependency, [(name, value, source)])
 
-        did = self.app.sources.add_source(dependency)
-        sid = self.app.sources.add_source(source) if source is not None else None
-        is_glob = False
-        if value is not None:
-            glob = Glob(value)
-            is_glob = glob.is_glob
-            value = glob.regex if is_glob else glob.value
-        self.cursor.execute('''
+    @synchronized
+    def add_dependencies(self, dependency, values):
+        """
+        Add many context var dependencies for a source path at once.
+
+        :param dependency: Source path to set dependencies for.
+        :type dependency: str
+        :param values: List of context var name, value and source path tuples, as passed to add_dependency. Values and
+                       source paths may be None.
+        :type values: list[tuple[str, object | None, str | None]]
+        """
+        rows = self._dependency_rows(dependency, values)
+        self.cursor.executemany('''
             INSERT INTO context_var_dependencies
                 (name, value, value_globbed, source_id, dependency_id)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (name, value, is_glob, sid, did))
+            ''', [row for row, dep in rows])
+        for row, dep in rows:
+            self.index.add_dependency(dep)
+
+    @synchronized
+    def set_dependencies(self, dependency, values):
+        """
+        Replace all context var dependencies for a source path. Only dependencies that have been added or removed since
+        they were last set are written.
+
+        :param dependency: Source path to set dependencies for.
+        :type dependency: str
+        :param values: List of context var name, value and source path tuples, as passed to add_dependency. Values and
+                       source paths may be None.
+        :type values: list[tuple[str, object | None, str | None]]
+        """
+        rows = self._dependency_rows(dependency, values)
+        did = self.app.sources.add_source(dependency)
+
+        old_rows = {}
+        results = self.cursor.execute('''
+            SELECT id, name, value, value_globbed, source_id
+            FROM context_var_dependencies
+            WHERE dependency_id = ?
+            ''', (did, ))
+        for cid, name, value, globbed, sid in results:
+            old_rows.setdefault((name, value, globbed == 1, sid), []).append(cid)
+
+        deletes = []
+        inserts = []
+        for row, dep in rows:
+            cids = old_rows.get((row[0], _text(row[1]), bool(row[2]), row[3]), None)
+            if cids:
+                cids.pop()
+            else:
+                inserts.append(row)
+        for cids in old_rows.values():
+            deletes.extend(cids)
+
+        if len(deletes) > 0:
+            self.cursor.executemany('DELETE FROM context_var_dependencies WHERE id = ?', [(cid, ) for cid in deletes])
+        if len(inserts) > 0:
+            self.cursor.executemany('''
+                INSERT INTO context_var_dependencies
+                    (name, value, value_globbed, source_id, dependency_id)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', inserts)
+        if len(deletes) > 0 or len(inserts) > 0:
+            self.index.remove_dependencies(dependency=self.app.relative_path(dependency))
+            for row, dep in rows:
+                self.index.add_dependency(dep)
+
+    def _dependency_rows(self, dependency, values):
+        """
+        Get context_var_dependencies rows and index entries for dependencies of a source path, resolving the source
+        ids of the dependency and any context var source paths at once.
+
+        :param dependency: Source path to set dependencies for.
+        :type dependency: str
+        :param values: List of context var name, value and source path tuples.
+        :type values: list[tuple[str, object | None, str | None]]
+        :return: List of row and index entry tuples.
+        :rtype: list[tuple[tuple, _Dependency]]
+        """
+        from pydgeot.filesystem import Glob
+
+        values = list(values)
+        sources = [dependency] + [source for name, value, source in values if source is not None]
+        ids = self.app.sources.add_sources(sources)
+        did = ids[dependency]
+        rel = self.app.relative_path(dependency)
+
+        rows = []
+        for name, value, source in values:
+            is_glob = False
+            if value is not None:
+                glob = Glob(value)
+                is_glob = glob.is_glob
+                value = glob.regex if is_glob else glob.value
+            sid = ids[source] if source is not None else None
+            dep = _Dependency(name, _text(value), is_glob,
+                              self.app.relative_path(source) if source is not None else None, rel)
+            rows.append(((name, value, is_glob, sid, did), dep))
+        return rows
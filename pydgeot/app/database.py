@@ -0,0 +1,234 @@
+import re
+import functools
+import queue
+import threading
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_regex(expr):
+    """
+    Compile a case insensitive regex, as matched by the REGEXP SQL function. Compiled regexes are cached, as the same
+    few patterns are matched against many rows.
+
+    :param expr: Regex pattern.
+    :type expr: str
+    :return: Compiled regex.
+    :rtype: typing.Pattern[str]
+    """
+    return re.compile(expr, re.I)
+
+
+def regex_func(expr, item):
+    """
+    REGEXP search function for SQLite.
+
+    :param expr: Regex pattern.
+    :type expr: str
+    :param item: Column value to search.
+    :type item: str | None
+    :return: True if a match is found.
+    :rtype: bool
+    """
+    if item is None:
+        return False
+    return compile_regex(expr).search(str(item)) is not None
+
+
+database_profiles = {
+    'default': {},
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+    },
+    'ephemeral': {
+        'journal_mode': 'MEMORY',
+        'synchronous': 'OFF',
+        'cache_size': -64 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'locking_mode': 'EXCLUSIVE'
+    }
+}
+"""
+Named sets of PRAGMA settings for the App database. 'default' leaves SQLites defaults, 'fast' uses a write ahead log and
+larger caches while staying safe against application crashes, and 'ephemeral' trades all durability for speed, for
+stores that are thrown away after use, such as on CI.
+
+:type: dict[str, dict[str, str | int]]
+"""
+
+_pragma_values = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+    'locking_mode': ('NORMAL', 'EXCLUSIVE'),
+    'cache_size': int,
+    'mmap_size': int,
+    'busy_timeout': int
+}
+
+
+def get_profile(settings):
+    """
+    Get the PRAGMA settings for a database settings dictionary, as set under the 'database' key of the root config. A
+    named profile may be given with the 'profile' key, and any PRAGMA keys override the profiles settings.
+
+    :param settings: Database settings.
+    :type settings: dict[str, Any]
+    :return: Tuple of the profile name, and a dictionary of PRAGMA names and values.
+    :rtype: tuple[str, dict[str, str | int]]
+    :raises pydgeot.app.AppError: If the profile or any PRAGMA settings are not known, or have invalid values.
+    """
+    from pydgeot.app import AppError
+
+    settings = dict(settings)
+    name = settings.pop('profile', 'default')
+    if name not in database_profiles:
+        raise AppError('Unknown database profile \'{}\', expected one of: {}'.format(
+            name, ', '.join(sorted(database_profiles))))
+    pragmas = dict(database_profiles[name])
+
+    for key, value in settings.items():
+        allowed = _pragma_values.get(key, None)
+        if allowed is None:
+            raise AppError('Unknown database setting \'{}\''.format(key))
+        if allowed is int:
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise AppError('Database setting \'{}\' must be an integer'.format(key))
+        else:
+            value = str(value).upper()
+            if value not in allowed:
+                raise AppError('Database setting \'{}\' must be one of: {}'.format(key, ', '.join(allowed)))
+        pragmas[key] = value
+    return name, pragmas
+
+
+def apply_profile(connection, pragmas):
+    """
+    Apply PRAGMA settings to a database connection.
+
+    :param connection: Database connection.
+    :type connection: sqlite3.Connection
+    :param pragmas: Dictionary of PRAGMA names and values, as returned by get_profile.
+    :type pragmas: dict[str, str | int]
+    """
+    # Set busy_timeout first, so any following PRAGMAs wait on locks, and journal_mode last, as changing it takes a lock.
+    order = sorted(pragmas, key=lambda key: (key != 'busy_timeout', key == 'journal_mode', key))
+    for key in order:
+        connection.execute('PRAGMA {} = {}'.format(key, pragmas[key]))
+
+
+def chunked(items, size=500):
+    """
+    Split items in to lists of at most the given size, for building queries with a parameter per item that stay well
+    under SQLites host parameter limit.
+
+    :param items: Items to split.
+    :type items: collections.Iterable[T]
+    :param size: Maximum number of items in each list.
+    :type size: int
+    :return: Generator of lists of items.
+    :rtype: collections.Iterable[list[T]]
+    """
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class DatabaseWriter:
+    """
+    Funnels database calls from any number of threads in to a single writer thread. While the writer is running, it
+    owns the Apps database connection and every call is queued and run on the writer thread, in the order received.
+    While it is not running, calls are run directly in the calling thread, one at a time.
+
+    The writer is started and stopped by using it as a context manager, and may be entered multiple times.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        self._thread = None
+        """:type: threading.Thread | None"""
+        self._depth = 0
+
+    def __enter__(self):
+        with self._lock:
+            if self._depth == 0:
+                self._thread = threading.Thread(target=self._run, name='pydgeot-db-writer', daemon=True)
+                self._thread.start()
+            self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    @property
+    def is_running(self):
+        """
+        :return: If the writer thread is running.
+        :rtype: bool
+        """
+        return self._thread is not None
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call a function on the writer thread, and wait for its result.
+
+        :param func: Function to call.
+        :type func: callable
+        :return: Return value of the function.
+        :rtype: Any
+        :raises Exception: Any exception raised by the function is re-raised in the calling thread.
+        """
+        if self._thread is threading.current_thread():
+            return func(*args, **kwargs)
+
+        from concurrent.futures import Future
+
+        # Checked and queued under the lock, so a call can not be queued after the writer has been told to stop.
+        with self._lock:
+            if self._thread is None:
+                return func(*args, **kwargs)
+            future = Future()
+            self._queue.put((future, func, args, kwargs))
+        return future.result()
+
+    def _run(self):
+        """
+        Writer thread loop. Runs queued calls until a None item is received.
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, func, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+def synchronized(func):
+    """
+    Decorator for Sources and Contexts methods, sending calls through the Apps DatabaseWriter so the database connection
+    is only ever used by one thread at a time.
+
+    :param func: Method to serialize calls to. The instance it is bound to must have an `app` attribute.
+    :type func: callable
+    :return: Wrapped method.
+    :rtype: callable
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return self.app.db_writer.call(func, self, *args, **kwargs)
+    return wrapper
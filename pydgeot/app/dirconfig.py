@@ -1,13 +1,248 @@
 import os
 import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def _mtime(path):
+    """
+    Get a files modified time in nanoseconds, or None if it does not exist.
+
+    :type path: str
+    :rtype: int | None
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class DirConfigCache:
+    """
+    Per App cache of DirConfig instances, keyed by config class and directory path. The least recently used entries
+    are evicted once max_size entries are cached. Entries are not checked for changes when retrieved, instead refresh
+    should be called once per build, dropping any whose config files have changed.
+
+    File paths resolve to their directories entries. Paths known to be files are kept in a separate least recently used
+    set, bounded by the same max_size, so they are only checked for being a file once while cached, and do not evict
+    directory entries. Known files are checked again on refresh, in case they have been replaced by directories.
+
+    Cached directory configs may be saved to and loaded from a JSON snapshot in the Apps store directory, so a cold
+    start does not need to read the config file for every directory again. Only each configs path, config files, and
+    config file data are saved, and configs are parsed from them again when loaded.
+    """
+    max_size = 4096
+    snapshot_name = 'dirconfig.json'
+    snapshot_version = 4
+
+    def __init__(self, app, max_size=None):
+        """
+        :param app: Parent App instance.
+        :type app: pydgeot.app.App
+        :param max_size: Maximum number of entries to cache, defaults to DirConfigCache.max_size.
+        :type max_size: int | None
+        """
+        self.app = app
+        if max_size is not None:
+            self.max_size = max_size
+        self._configs = OrderedDict()
+        """:type: OrderedDict[tuple[type, str], BaseDirConfig]"""
+        self._files = OrderedDict()
+        """:type: OrderedDict[str, None]"""
+        self._lock = threading.RLock()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._configs)
+
+    def get(self, cls, path):
+        """
+        Get a DirConfig instance for the given file or directory path, loading it if it is not cached. Only paths that
+        are not known files or cached directories are checked for being a file.
+
+        :param cls: DirConfig class to get an instance of.
+        :type cls: type[T]
+        :param path: File or directory path.
+        :type path: str
+        :rtype: T
+        """
+        key = (cls, path)
+        with self._lock:
+            is_file = path in self._files
+            if is_file:
+                self._files.move_to_end(path)
+            else:
+                config = self._configs.get(key, None)
+                if config is not None:
+                    self._configs.move_to_end(key)
+                    return config
+
+        if is_file:
+            return self.get(cls, os.path.dirname(path))
+        if os.path.isfile(path):
+            self.add_files([path])
+            return self.get(cls, os.path.dirname(path))
+
+        config = cls(self.app, path)
+
+        with self._lock:
+            self._configs[key] = config
+            self._dirty = True
+            while len(self._configs) > self.max_size:
+                self._configs.popitem(last=False)
+        return config
+
+    def add_files(self, paths):
+        """
+        Mark paths as files, such as source paths found while scanning, so they resolve to their directories entries
+        without being checked for being a file.
+
+        :param paths: File paths.
+        :type paths: collections.Iterable[str]
+        """
+        with self._lock:
+            for path in paths:
+                self._files[path] = None
+                self._files.move_to_end(path)
+            while len(self._files) > self.max_size:
+                self._files.popitem(last=False)
+
+    def remove_files(self, paths):
+        """
+        Forget paths marked as files, such as deleted source paths.
+
+        :param paths: File paths.
+        :type paths: collections.Iterable[str]
+        """
+        with self._lock:
+            for path in paths:
+                self._files.pop(path, None)
+
+    def refresh(self):
+        """
+        Drop cached entries whose config file, or any of their parent directories config files, have been created,
+        changed or deleted since they were loaded, and known files that are no longer files.
+        """
+        mtimes = {}
+        checked = {}
+
+        def is_stale(config):
+            if id(config) not in checked:
+                checked[id(config)] = any(mtimes.setdefault(path, _mtime(path)) != mtime
+                                          for path, mtime in config.config_files)
+            return checked[id(config)]
+
+        with self._lock:
+            stale = [key for key, config in self._configs.items() if is_stale(config)]
+            for key in stale:
+                del self._configs[key]
+            if len(stale) > 0:
+                self._dirty = True
+            files = list(self._files)
+        self.remove_files([path for path in files if not os.path.isfile(path)])
+
+    def clear(self):
+        """
+        Drop all cached entries.
+        """
+        with self._lock:
+            self._configs.clear()
+            self._files.clear()
+            self._dirty = True
+
+    def load(self):
+        """
+        Load cached directory configs from the snapshot in the store directory, if one exists and was saved with the
+        same set of processors. Loaded entries are refreshed, dropping any whose config files have since changed.
+        """
+        try:
+            with open(os.path.join(self.app.store_root, self.snapshot_name)) as fh:
+                snapshot = json.load(fh)
+            header = snapshot['header']
+            entries = snapshot['configs']
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.app.log.warning('Unable to load config cache: {}'.format(e))
+            return
+
+        if header != json.loads(json.dumps(self._snapshot_header())):
+            return
+
+        classes = dict(((cls.__module__, cls.__qualname__), cls) for cls in BaseDirConfig.classes)
+        # Parents are loaded first, so each config is parsed with its cached parent.
+        for entry in sorted(entries, key=lambda entry: entry['path'].count(os.sep)):
+            cls = classes.get(tuple(entry['class']), None)
+            if cls is None:
+                continue
+            try:
+                config = cls.from_snapshot(self.app, entry['path'],
+                                           tuple((path, mtime) for path, mtime in entry['config_files']),
+                                           entry['config'])
+            except Exception as e:
+                self.app.log.warning('Unable to load config cache: {}'.format(e))
+                self.clear()
+                return
+            with self._lock:
+                self._configs[(cls, config.path)] = config
+                while len(self._configs) > self.max_size:
+                    self._configs.popitem(last=False)
+        self.refresh()
+        self._dirty = False
+
+    def save(self):
+        """
+        Save cached directory configs to a snapshot in the store directory, if they have changed since last loaded or
+        saved.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            configs = list(self._configs.values())
+            self._dirty = False
+
+        entries = [{'class': (config.__class__.__module__, config.__class__.__qualname__),
+                    'path': config.path,
+                    'config_files': config.config_files,
+                    'config': config.config_data}
+                   for config in configs]
+        path = os.path.join(self.app.store_root, self.snapshot_name)
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(temp_path, 'w') as fh:
+                json.dump({'header': self._snapshot_header(), 'configs': entries}, fh)
+            os.replace(temp_path, path)
+        except Exception as e:
+            self.app.log.warning('Unable to save config cache: {}'.format(e))
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def _snapshot_header(self):
+        """
+        Get the values a snapshot must have been saved with to be loaded. Includes each processors class and version,
+        and each DirConfig class, so a changed plugin does not load configs parsed for its old classes.
+
+        :rtype: tuple
+        """
+        from pydgeot import __version__
+        processors = sorted((name, processor.__class__.__module__, processor.__class__.__qualname__,
+                             repr(processor.version)) for name, processor in self.app.processors.items())
+        classes = sorted((cls.__module__, cls.__qualname__) for cls in BaseDirConfig.classes)
+        return self.snapshot_version, __version__, self.app.root, processors, classes
 
 
 class BaseDirConfig:
     """
     Base app configuration for a directory.
     """
-    _cached = {}
-    """:type: dict[type, dict[str, DirConfig]]"""
+    # DirConfig classes, added as they are defined.
+    classes = []
+    """:type: list[type[BaseDirConfig]]"""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        BaseDirConfig.classes.append(cls)
 
     def __init__(self, app, path):
         """
@@ -21,36 +256,87 @@ class BaseDirConfig:
         """
         self.app = app
         self.path = path
+        self.config_files = ()
+        """
+        Config file paths this config was loaded from, including its parents, and their modified times in nanoseconds,
+        or None for config files that do not exist.
 
-        self._load()
+        :type: tuple[tuple[str, int | None]]
+        """
+        self.fingerprint = None
+        """
+        Digest of config_files, identifying the exact config files and versions this config was loaded from.
+
+        :type: str | None
+        """
+        self.config_data = {}
+        """
+        Data read from this directories own config file, before parsing.
+
+        :type: dict[str, Any]
+        """
+
+        snapshot = self.__dict__.pop('_snapshot', None)
+        if snapshot is not None:
+            self._load_snapshot(*snapshot)
+        else:
+            self._load()
 
     @classmethod
     def get(cls, app, path):
         """
-        Get a DirConfig instance for the given file or directory path.
+        Get a DirConfig instance for the given file or directory path, from the Apps config cache.
 
         :param app: App associated with the directory.
         :type app: pydgeot.app.App
         :param path:
         :type path: str
         """
-        if os.path.isfile(path):
-            path = os.path.dirname(path)
-
-        if cls not in cls._cached:
-            cls._cached[cls] = {}
+        return app.config_cache.get(cls, path)
 
-        if path in cls._cached[cls]:
-            return cls._cached[cls][path]
+    @classmethod
+    def from_snapshot(cls, app, path, config_files, config_data):
+        """
+        Create a DirConfig instance from data saved in a DirConfigCache snapshot, parsing it without reading the config
+        file again.
 
-        config = cls(app, path)
-        cls._cached[cls][path] = config
+        :param app: App associated with the directory.
+        :type app: pydgeot.app.App
+        :param path: Directory the config is for.
+        :type path: str
+        :param config_files: Config file paths and modified times the config was loaded from.
+        :type config_files: tuple[tuple[str, int | None]]
+        :param config_data: Data read from the directories own config file.
+        :type config_data: dict[str, Any]
+        :rtype: T
+        """
+        config = cls.__new__(cls)
+        config._snapshot = (config_files, config_data)
+        config.__init__(app, path)
         return config
 
+    def _load_snapshot(self, config_files, config_data):
+        """
+        Parse configuration data saved in a snapshot.
+
+        :type config_files: tuple[tuple[str, int | None]]
+        :type config_data: dict[str, Any]
+        """
+        import copy
+
+        parent = None
+        if self.path != self.app.root:
+            parent = self.__class__.get(self.app, os.path.dirname(self.path))
+        self.config_files = config_files
+        self.fingerprint = hashlib.sha1(repr(self.config_files).encode('utf-8')).hexdigest()
+        self.config_data = config_data
+        self._parse(config_files[-1][0], copy.deepcopy(config_data), parent)
+
     def _load(self):
         """
         Load in the current path and parent configuration data.
         """
+        import copy
         from pydgeot.app import AppError
 
         config = {}
@@ -62,13 +348,21 @@ class BaseDirConfig:
             parent_path = os.path.dirname(self.path)
             parent = self.__class__.get(self.app, parent_path)
 
-        if os.path.isfile(config_path):
+        # Take the modified time before reading, so a change while reading will invalidate the config.
+        mtime = _mtime(config_path)
+        self.config_files = (parent.config_files if parent is not None else ()) + ((config_path, mtime), )
+        self.fingerprint = hashlib.sha1(repr(self.config_files).encode('utf-8')).hexdigest()
+
+        if mtime is not None:
             try:
                 with open(config_path) as fh:
                     config = json.load(fh)
+            except FileNotFoundError:
+                pass
             except ValueError as e:
                 raise AppError('Could not load config \'{}\': \'{}\''.format(config_path, e))
 
+        self.config_data = copy.deepcopy(config)
         self._parse(config_path, config, parent)
 
     def _parse(self, config_path, config, parent):
@@ -0,0 +1,109 @@
+def walk(nodes, neighbors):
+    """
+    Iteratively walk a graph from a set of starting nodes, collecting every node reachable from them. Nodes are only
+    visited once, so cycles in the graph are safe to walk. Starting nodes are only included in the result if they are
+    reachable from another starting node, or from themselves.
+
+    :param nodes: Nodes to start walking from.
+    :type nodes: collections.Iterable[T]
+    :param neighbors: Function returning the set of nodes adjacent to a given node.
+    :type neighbors: callable[T, collections.Iterable[T]]
+    :return: Set of reachable nodes.
+    :rtype: set[T]
+    """
+    visited = set()
+    stack = [neighbor for node in nodes for neighbor in neighbors(node)]
+    while len(stack) > 0:
+        node = stack.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+        stack.extend(neighbor for neighbor in neighbors(node) if neighbor not in visited)
+    return visited
+
+
+class DependencyGraph:
+    """
+    In memory adjacency index of dependencies between nodes, kept in both directions.
+    """
+    def __init__(self):
+        self._forward = {}
+        """:type: dict[T, set[T]]"""
+        self._reverse = {}
+        """:type: dict[T, set[T]]"""
+
+    def add(self, node, dependency):
+        """
+        Add a single dependency for a node.
+
+        :param node: Node that depends on the dependency.
+        :type node: T
+        :param dependency: Node that is depended on.
+        :type dependency: T
+        """
+        self._forward.setdefault(node, set()).add(dependency)
+        self._reverse.setdefault(dependency, set()).add(node)
+
+    def set(self, node, dependencies):
+        """
+        Replace all dependencies for a node.
+
+        :param node: Node to set dependencies for.
+        :type node: T
+        :param dependencies: Nodes the node depends on.
+        :type dependencies: collections.Iterable[T]
+        """
+        for dependency in self._forward.pop(node, ()):
+            self._discard(self._reverse, dependency, node)
+        for dependency in dependencies:
+            self.add(node, dependency)
+
+    def remove(self, node):
+        """
+        Remove a node, and all dependencies to and from it.
+
+        :param node: Node to remove.
+        :type node: T
+        """
+        for dependency in self._forward.pop(node, ()):
+            self._discard(self._reverse, dependency, node)
+        for dependent in self._reverse.pop(node, ()):
+            self._discard(self._forward, dependent, node)
+
+    def get(self, node, reverse=False):
+        """
+        Get the direct dependencies of a node.
+
+        :param node: Node to get dependencies for.
+        :type node: T
+        :param reverse: Get the nodes that depend on the node instead.
+        :type reverse: bool
+        :return: Set of nodes.
+        :rtype: set[T]
+        """
+        return set((self._reverse if reverse else self._forward).get(node, ()))
+
+    def walk(self, nodes, reverse=False):
+        """
+        Get all dependencies of the given nodes, including dependencies of dependencies.
+
+        :param nodes: Nodes to get dependencies for.
+        :type nodes: collections.Iterable[T]
+        :param reverse: Get the nodes that depend on the given nodes instead.
+        :type reverse: bool
+        :return: Set of nodes.
+        :rtype: set[T]
+        """
+        edges = self._reverse if reverse else self._forward
+        return walk(nodes, lambda node: edges.get(node, ()))
+
+    @staticmethod
+    def _discard(edges, node, other):
+        """
+        Remove a single edge, dropping the nodes entry if it has no edges left.
+        """
+        others = edges.get(node)
+        if others is not None:
+            others.discard(other)
+            if len(others) == 0:
+                del edges[node]
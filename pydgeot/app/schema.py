@@ -0,0 +1,196 @@
+import os
+
+
+migrations = []
+"""
+Ordered list of schema migration functions. Each is passed a database cursor, and a databases schema version is the
+number of migrations that have been applied to it.
+
+:type: list[callable[sqlite3.Cursor]]
+"""
+
+
+def migration(func):
+    """
+    Decorator to add a function to the end of the schema migrations list. Migrations must only ever be appended, as
+    their position determines the schema version they upgrade to.
+    """
+    migrations.append(func)
+    return func
+
+
+def get_version(cursor):
+    """
+    Get the schema version of a database.
+
+    :param cursor: Cursor for the database.
+    :type cursor: sqlite3.Cursor
+    :return: Schema version, 0 if no migrations have been applied.
+    :rtype: int
+    """
+    cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+    result = cursor.execute('SELECT version FROM schema_version').fetchone()
+    return result[0] if result is not None else 0
+
+
+def migrate(cursor):
+    """
+    Apply any schema migrations that have not yet been applied to a database. Each migration is applied and committed
+    in its own transaction.
+
+    :param cursor: Cursor for the database.
+    :type cursor: sqlite3.Cursor
+    :raises pydgeot.app.AppError: If the database has a newer schema version than is known.
+    """
+    from pydgeot.app import AppError
+
+    version = get_version(cursor)
+    if version > len(migrations):
+        raise AppError('Database schema version {} is newer than supported version {}, '
+                       'it may be reset with the \'reset\' command'.format(version, len(migrations)))
+
+    for version, func in enumerate(migrations[version:], version + 1):
+        cursor.execute('BEGIN')
+        try:
+            func(cursor)
+            cursor.execute('DELETE FROM schema_version')
+            cursor.execute('INSERT INTO schema_version (version) VALUES (?)', (version, ))
+            cursor.connection.commit()
+        except Exception:
+            cursor.connection.rollback()
+            raise
+
+
+@migration
+def _create_tables(cursor):
+    """
+    Create the initial tables. Databases created before schema versioning already have these tables.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            modified INTEGER NOT NULL,
+            UNIQUE(path))
+        ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS source_targets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            FOREIGN KEY(source_id) REFERENCES sources(id)
+                ON DELETE CASCADE
+                ON UPDATE CASCADE)
+        ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS source_dependencies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_id INTEGER NOT NULL,
+            dependency_id INTEGER NOT NULL,
+            FOREIGN KEY(source_id) REFERENCES sources(id)
+                ON DELETE CASCADE
+                ON UPDATE CASCADE,
+            FOREIGN KEY(dependency_id) REFERENCES sources(id)
+                ON DELETE CASCADE
+                ON UPDATE CASCADE)
+        ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS context_vars (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            value TEXT,
+            source_id INTEGER NOT NULL,
+            FOREIGN KEY(source_id) REFERENCES sources(id)
+                ON DELETE CASCADE
+                ON UPDATE CASCADE)
+        ''')
+    # Use 'name' here rather than id in case the var isn't set yet.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS context_var_dependencies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            value TEXT,
+            value_globbed INTEGER DEFAULT 0,
+            source_id INTEGER,
+            dependency_id INTEGER NOT NULL,
+            FOREIGN KEY(source_id) REFERENCES sources(id)
+                ON DELETE CASCADE
+                ON UPDATE CASCADE,
+            FOREIGN KEY(dependency_id) REFERENCES sources(id)
+                ON DELETE CASCADE
+                ON UPDATE CASCADE)
+        ''')
+
+
+@migration
+def _create_indexes(cursor):
+    """
+    Index the columns used for reverse lookups and deletes, which would otherwise need full table scans.
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS source_targets_source_id ON source_targets (source_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS source_targets_path ON source_targets (path)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS source_dependencies_source_id ON source_dependencies (source_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS source_dependencies_dependency_id '
+                   'ON source_dependencies (dependency_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS context_vars_name_value ON context_vars (name, value)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS context_vars_source_id ON context_vars (source_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS context_var_dependencies_dependency_id '
+                   'ON context_var_dependencies (dependency_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS context_var_dependencies_source_id '
+                   'ON context_var_dependencies (source_id)')
+
+
+@migration
+def _add_source_directories(cursor):
+    """
+    Add a relative directory column to sources, so subtree queries can use an index rather than matching every path.
+    """
+    cursor.execute("ALTER TABLE sources ADD COLUMN directory TEXT NOT NULL DEFAULT ''")
+    results = cursor.execute('SELECT id, path FROM sources').fetchall()
+    cursor.executemany('UPDATE sources SET directory = ? WHERE id = ?',
+                       [(os.path.dirname(path), sid) for sid, path in results])
+    cursor.execute('CREATE INDEX IF NOT EXISTS sources_directory ON sources (directory)')
+
+
+@migration
+def _add_source_hashes(cursor):
+    """
+    Add a content hash column to sources, used to detect changes when the content_hash setting is enabled.
+    """
+    cursor.execute('ALTER TABLE sources ADD COLUMN hash TEXT')
+
+
+@migration
+def _create_source_directories(cursor):
+    """
+    Create the table of directory snapshots, used to skip listing directories that are unchanged since the last scan.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS source_directories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL,
+            modified INTEGER NOT NULL,
+            files TEXT NOT NULL,
+            directories TEXT NOT NULL,
+            UNIQUE(path))
+        ''')
+
+
+@migration
+def _add_source_processors(cursor):
+    """
+    Add resolved processor columns to sources, so processors do not need resolving again until the sources directory
+    config or the set of available processors changes.
+    """
+    cursor.execute('ALTER TABLE sources ADD COLUMN processor TEXT')
+    cursor.execute('ALTER TABLE sources ADD COLUMN processor_key TEXT')
+
+
+@migration
+def _index_source_directories_nocase(cursor):
+    """
+    Replace the source directory index with a case insensitive one, as directories are matched case insensitively.
+    """
+    cursor.execute('DROP INDEX IF EXISTS sources_directory')
+    cursor.execute('CREATE INDEX IF NOT EXISTS sources_directory_nocase ON sources (directory COLLATE NOCASE)')
@@ -1,6 +1,8 @@
 import os
 import datetime
 from collections import namedtuple
+from pydgeot.app.database import chunked, synchronized
+from pydgeot.app.graph import DependencyGraph
 
 
 SourceResult = namedtuple('SourceResult', ['path', 'size', 'modified'])
@@ -21,38 +23,108 @@ class Sources:
         """
         self.app = app
         self.cursor = self.app.db_cursor
+        self._graph = None
+        """:type: pydgeot.app.graph.DependencyGraph | None"""
 
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sources (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                path TEXT NOT NULL,
-                size INTEGER NOT NULL,
-                modified INTEGER NOT NULL,
-                UNIQUE(path))
-            ''')
-
-        # File map tables
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS source_targets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source_id INTEGER NOT NULL,
-                path TEXT NOT NULL,
-                FOREIGN KEY(source_id) REFERENCES sources(id)
-                    ON DELETE CASCADE
-                    ON UPDATE CASCADE)
-            ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS source_dependencies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source_id INTEGER NOT NULL,
-                dependency_id INTEGER NOT NULL,
-                FOREIGN KEY(source_id) REFERENCES sources(id)
-                    ON DELETE CASCADE
-                    ON UPDATE CASCADE,
-                FOREIGN KEY(dependency_id) REFERENCES sources(id)
-                    ON DELETE CASCADE
-                    ON UPDATE CASCADE)
-            ''')
+    @property
+    def graph(self):
+        """
+        In memory index of source dependencies, keyed by relative path. Loaded from the database on first use, and kept
+        up to date by any methods that modify source dependencies.
+
+        :rtype: pydgeot.app.graph.DependencyGraph
+        """
+        if self._graph is None:
+            graph = DependencyGraph()
+            results = self.cursor.execute('''
+                SELECT s.path, d.path
+                FROM source_dependencies AS sd
+                    INNER JOIN sources s ON s.id = sd.source_id
+                    INNER JOIN sources d ON d.id = sd.dependency_id
+                ''')
+            for source, dependency in results:
+                graph.add(source, dependency)
+            self._graph = graph
+        return self._graph
+
+    def _forget(self, rels):
+        """
+        Remove relative source paths from the in memory dependency indexes.
+
+        :param rels: Relative source paths that have been removed from the database.
+        :type rels: collections.Iterable[str]
+        """
+        rels = list(rels)
+        if self._graph is not None:
+            for rel in rels:
+                self._graph.remove(rel)
+        if self.app.contexts is not None:
+            self.app.contexts.forget_sources(rels)
+
+    def _source_results(self, rels):
+        """
+        Get SourceResults for a collection of relative source paths.
+
+        :param rels: Relative source paths to get results for.
+        :type rels: collections.Iterable[str]
+        :return: Set of SourceResults.
+        :rtype: set[pydgeot.app.sources.SourceResult]
+        """
+        results = set()
+        for chunk in chunked(rels):
+            rows = self.cursor.execute(
+                'SELECT path, size, modified FROM sources WHERE path IN ({0})'.format(','.join('?' * len(chunk))),
+                chunk)
+            results |= set([self._source_result(*row) for row in rows])
+        return results
+
+    def _source_ids(self, sources, refresh=True):
+        """
+        Get database ids for a collection of source paths, adding entries for any that do not exist yet. Existing
+        entries are found with a single query per chunk of paths.
+
+        :param sources: Source paths to get ids for.
+        :type sources: collections.Iterable[str]
+        :param refresh: Update file information for existing entries, as add_source does. Otherwise only new entries
+                        are statted.
+        :type refresh: bool
+        :return: Dictionary of relative source paths and their database ids.
+        :rtype: dict[str, int]
+        """
+        rels = set([self.app.relative_path(source) for source in sources])
+        existing = {}
+        for chunk in chunked(rels):
+            rows = self.cursor.execute(
+                'SELECT id, path, size, modified FROM sources WHERE path IN ({0})'.format(','.join('?' * len(chunk))),
+                chunk)
+            for sid, rel, size, modified in rows:
+                existing[rel] = (sid, size, modified)
+
+        ids = dict([(rel, row[0]) for rel, row in existing.items()])
+        updates = []
+        for rel in rels:
+            row = existing.get(rel, None)
+            if row is not None and not refresh:
+                continue
+            try:
+                stats = os.stat(self.app.source_path(rel))
+                size = stats.st_size
+                mtime = stats.st_mtime
+            except FileNotFoundError:
+                size = 0
+                mtime = 0
+            if row is None:
+                self.cursor.execute('''
+                    INSERT INTO sources
+                        (path, directory, size, modified)
+                        VALUES (?, ?, ?, ?)
+                        ''', (rel, os.path.dirname(rel), size, mtime))
+                ids[rel] = self.cursor.lastrowid
+            elif size != row[1] or mtime != row[2]:
+                updates.append((size, mtime, row[0]))
+        if len(updates) > 0:
+            self.cursor.executemany('UPDATE sources SET size = ?, modified = ? WHERE id = ?', updates)
+        return ids
 
     def _source_result(self, *row):
         """
@@ -78,6 +150,7 @@ class Sources:
         """
         return SourceResult(self.app.target_path(row[0]), None, None)
 
+    @synchronized
     def clean(self, paths):
         """
         Delete entries under the given source directories and their subdirectories.
@@ -86,20 +159,26 @@ class Sources:
         :type paths: list[str]
         """
         for path in paths:
-            regex = self.app.path_regex(path, recursive=True)
-            self.cursor.execute('SELECT id FROM sources WHERE path REGEXP ?', (regex, ))
-            ids = [result[0] for result in self.cursor.fetchall()]
-            if len(ids) > 0:
-                id_query = '(' + ','.join('?' * len(ids)) + ')'
+            condition, params = self.app.directory_filter(path, recursive=True)
+            self.cursor.execute('SELECT id, path FROM sources WHERE {0}'.format(condition), params)
+            results = self.cursor.fetchall()
+            ids = [result[0] for result in results]
+            for chunk in chunked(ids):
+                id_query = '(' + ','.join('?' * len(chunk)) + ')'
                 self.cursor.execute('''
                     DELETE FROM source_dependencies
                     WHERE
                         source_id IN {0} OR
                         dependency_id IN {0}
-                    '''.format(id_query), (ids + ids))
-                self.cursor.execute('DELETE FROM source_targets WHERE source_id IN {0}'.format(id_query), ids)
-                self.cursor.execute('DELETE FROM sources WHERE id IN {0}'.format(id_query), ids)
-
+                    '''.format(id_query), (chunk + chunk))
+                self.cursor.execute('DELETE FROM source_targets WHERE source_id IN {0}'.format(id_query), chunk)
+                self.cursor.execute('DELETE FROM sources WHERE id IN {0}'.format(id_query), chunk)
+            if len(results) > 0:
+                self._forget([result[1] for result in results])
+            condition, params = self.app.directory_filter(path, recursive=True, column='path', case_sensitive=True)
+            self.cursor.execute('DELETE FROM source_directories WHERE {0}'.format(condition), params)
+
+    @synchronized
     def add_source(self, source):
         """
         Add a source entry to the database. Updates file information if the entry already exists.
@@ -109,30 +188,23 @@ class Sources:
         :return: Entries database id.
         :rtype: int
         """
-        rel = self.app.relative_path(source)
-        try:
-            stats = os.stat(source)
-            size = stats.st_size
-            mtime = stats.st_mtime
-        except FileNotFoundError:
-            size = 0
-            mtime = 0
-
-        self.cursor.execute('SELECT id, size, modified FROM sources WHERE path = ?', (rel, ))
-        result = self.cursor.fetchone()
-        if result is not None:
-            if size != result[1] or mtime != result[2]:
-                self.cursor.execute('UPDATE sources SET size = ?, modified = ? WHERE id = ?', (size, mtime, result[0]))
-            return result[0]
+        return self._source_ids([source])[self.app.relative_path(source)]
 
-        self.cursor.execute('''
-            INSERT INTO sources
-                (path, size, modified)
-                VALUES (?, ?, ?)
-                ''', (rel, size, mtime))
+    @synchronized
+    def add_sources(self, sources):
+        """
+        Add many source entries to the database at once. Updates file information for entries that already exist.
 
-        return self.cursor.lastrowid
+        :param sources: Source paths to add.
+        :type sources: collections.Iterable[str]
+        :return: Dictionary of the given source paths and their entries database ids.
+        :rtype: dict[str, int]
+        """
+        sources = list(sources)
+        ids = self._source_ids(sources)
+        return dict([(source, ids[self.app.relative_path(source)]) for source in sources])
 
+    @synchronized
     def get_source(self, source):
         """
         Get a SourceResult for the given path.
@@ -146,6 +218,7 @@ class Sources:
         results = list(self.cursor.execute('SELECT path, size, modified FROM sources WHERE path = ?', (rel, )))
         return self._source_result(*results[0]) if len(results) > 0 else None
 
+    @synchronized
     def get_sources(self, source_dir='', recursive=True):
         """
         Get a list SourceResults for sources in the given directory.
@@ -157,10 +230,108 @@ class Sources:
         :return: Set of SourceResults.
         :rtype: set[pydgeot.app.sources.SourceResult]
         """
-        regex = self.app.path_regex(source_dir, recursive)
-        results = self.cursor.execute('SELECT path, size, modified FROM sources WHERE path REGEXP ?', (regex, ))
+        condition, params = self.app.directory_filter(source_dir, recursive)
+        results = self.cursor.execute('SELECT path, size, modified FROM sources WHERE {0}'.format(condition), params)
         return set([self._source_result(*result) for result in results])
 
+    @synchronized
+    def get_hashes(self, source_dir='', recursive=True):
+        """
+        Get the stored content hashes for sources in the given directory.
+
+        :param source_dir: Source directory to get hashes for.
+        :type source_dir: str
+        :param recursive: Return hashes for sources in subdirectories of source_dir.
+        :type recursive: bool
+        :return: Dictionary of source paths and their content hashes. Sources without a hash are not included.
+        :rtype: dict[str, str]
+        """
+        condition, params = self.app.directory_filter(source_dir, recursive)
+        results = self.cursor.execute(
+            'SELECT path, hash FROM sources WHERE hash IS NOT NULL AND {0}'.format(condition), params)
+        return dict([(self.app.source_path(path), digest) for path, digest in results])
+
+    @synchronized
+    def set_hashes(self, hashes):
+        """
+        Set content hashes for existing sources.
+
+        :param hashes: Dictionary of source paths and their content hashes.
+        :type hashes: dict[str, str]
+        """
+        self.cursor.executemany('UPDATE sources SET hash = ? WHERE path = ?',
+                                [(digest, self.app.relative_path(path)) for path, digest in hashes.items()])
+
+    @synchronized
+    def get_processors(self):
+        """
+        Get the stored resolved processors for all sources.
+
+        :return: Dictionary of source paths, and tuples of the key the processor was resolved with and the processor
+                 name, or None if no processor could handle the source. Sources that have not been resolved are not
+                 included.
+        :rtype: dict[str, tuple[str, str | None]]
+        """
+        results = self.cursor.execute(
+            'SELECT path, processor_key, processor FROM sources WHERE processor_key IS NOT NULL')
+        return dict([(self.app.source_path(path), (key, name)) for path, key, name in results])
+
+    @synchronized
+    def set_processors(self, processors):
+        """
+        Set resolved processors for existing sources.
+
+        :param processors: Dictionary of source paths, and tuples of the key the processor was resolved with and the
+                           processor name, or None if no processor could handle the source.
+        :type processors: dict[str, tuple[str, str | None]]
+        """
+        self.cursor.executemany('UPDATE sources SET processor_key = ?, processor = ? WHERE path = ?',
+                                [(key, name, self.app.relative_path(path))
+                                 for path, (key, name) in processors.items()])
+
+    @synchronized
+    def get_directories(self, source_dir=''):
+        """
+        Get the stored snapshots for the given directory and its subdirectories.
+
+        :param source_dir: Source directory to get snapshots for.
+        :type source_dir: str
+        :return: Dictionary of directory paths and their snapshots.
+        :rtype: dict[str, pydgeot.filesystem.DirectorySnapshot]
+        """
+        import json
+        from pydgeot.filesystem import DirectorySnapshot
+
+        condition, params = self.app.directory_filter(source_dir, recursive=True, column='path',
+                                                     case_sensitive=True)
+        results = self.cursor.execute(
+            'SELECT path, modified, files, directories FROM source_directories WHERE {0}'.format(condition), params)
+        return dict([(os.path.normpath(self.app.source_path(path)),
+                      DirectorySnapshot(modified, tuple(json.loads(files)), tuple(json.loads(directories))))
+                     for path, modified, files, directories in results])
+
+    @synchronized
+    def set_directories(self, source_dir, snapshots):
+        """
+        Replace the stored snapshots for the given directory and its subdirectories.
+
+        :param source_dir: Source directory to set snapshots for.
+        :type source_dir: str
+        :param snapshots: Dictionary of directory paths and their snapshots.
+        :type snapshots: dict[str, pydgeot.filesystem.DirectorySnapshot]
+        """
+        import json
+
+        condition, params = self.app.directory_filter(source_dir, recursive=True, column='path',
+                                                     case_sensitive=True)
+        self.cursor.execute('DELETE FROM source_directories WHERE {0}'.format(condition), params)
+        self.cursor.executemany(
+            'INSERT INTO source_directories (path, modified, files, directories) VALUES (?, ?, ?, ?)',
+            [(self.app.relative_path(path), snapshot.mtime_ns, json.dumps(snapshot.files),
+              json.dumps(snapshot.directories))
+             for path, snapshot in snapshots.items()])
+
+    @synchronized
     def remove_source(self, source):
         """
         Remove a source entry, and any associated source dependencies and target files.
@@ -176,7 +347,9 @@ class Sources:
             self.cursor.execute('DELETE FROM source_targets WHERE source_id = ?', (sid, ))
             self.cursor.execute('DELETE FROM source_dependencies WHERE source_id = ? OR dependency_id = ?', (sid, sid))
             self.cursor.execute('DELETE FROM sources WHERE id = ?', (sid, ))
+            self._forget([rel])
 
+    @synchronized
     def get_targets(self, source, reverse=False):
         """
         Get a list of target paths that a source path has generated.
@@ -208,6 +381,7 @@ class Sources:
                 ''', (rel, ))
             return set([self._target_result(*result) for result in results])
 
+    @synchronized
     def set_targets(self, source, values):
         """
         Set target paths for a source path.
@@ -217,23 +391,50 @@ class Sources:
         :param values: List of target paths.
         :type values: list[str]
         """
-        rel = self.app.relative_path(source)
-        self.cursor.execute('''
-            DELETE
-            FROM source_targets
-            WHERE id IN (
-                SELECT st.id
-                FROM source_targets st
-                    INNER JOIN sources s ON s.id = st.source_id
-                WHERE s.path = ?)
-            ''', (rel, ))
-        sid = self.add_source(source)
-        self.cursor.executemany('''
-            INSERT INTO source_targets
-                (source_id, path)
-                VALUES (?, ?)
-            ''', ([(sid, self.app.relative_path(value)) for value in values]))
+        self.set_many_targets({source: values})
 
+    @synchronized
+    def set_many_targets(self, targets):
+        """
+        Set target paths for many source paths at once. Only targets that have been added or removed since they were
+        last set are written.
+
+        :param targets: Dictionary of source paths and lists of their target paths.
+        :type targets: dict[str, list[str]]
+        """
+        sids = self._source_ids(targets.keys())
+        new_targets = dict([(sids[self.app.relative_path(source)],
+                             set([self.app.relative_path(value) for value in values]))
+                            for source, values in targets.items()])
+
+        old_targets = {}
+        for chunk in chunked(new_targets):
+            rows = self.cursor.execute(
+                'SELECT id, source_id, path FROM source_targets WHERE source_id IN ({0})'.format(
+                    ','.join('?' * len(chunk))),
+                chunk)
+            for tid, sid, rel in rows:
+                old_targets.setdefault(sid, {}).setdefault(rel, []).append(tid)
+
+        deletes = []
+        inserts = []
+        for sid, rels in new_targets.items():
+            old_rels = old_targets.get(sid, {})
+            for rel, tids in old_rels.items():
+                # Drop duplicate rows along with removed targets.
+                deletes.extend(tids[1:] if rel in rels else tids)
+            inserts.extend([(sid, rel) for rel in rels if rel not in old_rels])
+
+        if len(deletes) > 0:
+            self.cursor.executemany('DELETE FROM source_targets WHERE id = ?', [(tid, ) for tid in deletes])
+        if len(inserts) > 0:
+            self.cursor.executemany('''
+                INSERT INTO source_targets
+                    (source_id, path)
+                    VALUES (?, ?)
+                ''', inserts)
+
+    @synchronized
     def get_dependencies(self, source, reverse=False, recursive=False):
         """
         Get a list of source paths that a source path depends on to generate.
@@ -253,45 +454,32 @@ class Sources:
         :return: Set of SourceResults.
         :rtype: set[pydgeot.app.sources.SourceResult]
         """
-        if recursive:
-            return self._get_dependencies_recursive(source, reverse)
         rel = self.app.relative_path(source)
-        if reverse:
-            results = self.cursor.execute('''
-                SELECT s.path, s.size, s.modified
-                FROM source_dependencies AS sd
-                    INNER JOIN sources s ON s.id = sd.source_id
-                    INNER JOIN sources d ON d.id = sd.dependency_id
-                WHERE d.path = ?
-                ''', (rel, ))
+        if recursive:
+            rels = self.graph.walk([rel], reverse=reverse)
         else:
-            results = self.cursor.execute('''
-                SELECT d.path, d.size, d.modified
-                FROM source_dependencies AS sd
-                    INNER JOIN sources s ON s.id = sd.source_id
-                    INNER JOIN sources d ON d.id = sd.dependency_id
-                WHERE s.path = ?
-                ''', (rel, ))
-        return set([self._source_result(*result) for result in results])
+            rels = self.graph.get(rel, reverse=reverse)
+        return self._source_results(rels)
 
-    def _get_dependencies_recursive(self, source, reverse, _parent_deps=set()):
+    @synchronized
+    def get_dependency_tree(self, sources, reverse=False):
         """
-        Get a list of all dependencies for a file, cascading in dependencies of dependencies.
+        Get the entire dependency tree for a collection of source paths at once. Equivalent to the union of
+        get_dependencies(source, reverse, recursive=True) for each path, but walks the tree in a single pass and does not
+        query the database.
 
-        :param source: Source path to get dependency paths for.
-        :type source: str
-        :param reverse: Perform a reverse lookup instead. Return source paths that depend on the given source path to
+        :param sources: Source paths to get dependency paths for.
+        :type sources: collections.Iterable[str]
+        :param reverse: Perform a reverse lookup instead. Return source paths that depend on the given source paths to
                         generate.
         :type reverse: bool
-        :return: Set of SourceResults.
-        :rtype: set[pydgeot.app.sources.SourceResult]
+        :return: Set of source paths.
+        :rtype: set[str]
         """
-        dependencies = self.get_dependencies(source, reverse=reverse)
-        for dependency in list(dependencies):
-            if dependency not in _parent_deps:
-                dependencies |= self._get_dependencies_recursive(dependency.path, reverse, _parent_deps=dependencies)
-        return dependencies
+        rels = self.graph.walk([self.app.relative_path(source) for source in sources], reverse=reverse)
+        return set([self.app.source_path(rel) for rel in rels])
 
+    @synchronized
     def set_dependencies(self, source, values):
         """
         Set source dependencies for a source path.
@@ -301,11 +489,50 @@ class Sources:
         :param values: List of source dependency paths.
         :type values: list[str]
         """
-        sid = self.add_source(source)
-        self.cursor.execute('DELETE FROM source_dependencies WHERE source_id = ?', (sid, ))
-        value_ids = [self.add_source(value) for value in values]
-        self.cursor.executemany('''
-            INSERT INTO source_dependencies
-                (source_id, dependency_id)
-                VALUES (?, ?)
-            ''', [(sid, value_id) for value_id in value_ids])
+        self.set_many_dependencies({source: values})
+
+    @synchronized
+    def set_many_dependencies(self, dependencies):
+        """
+        Set source dependencies for many source paths at once. Only dependencies that have been added or removed since
+        they were last set are written. Dependency paths without source entries have them added, but existing entries
+        are not updated.
+
+        :param dependencies: Dictionary of source paths and lists of their source dependency paths.
+        :type dependencies: dict[str, list[str]]
+        """
+        sids = self._source_ids(dependencies.keys())
+        value_ids = self._source_ids([value for values in dependencies.values() for value in values], refresh=False)
+        value_ids.update(sids)
+        new_deps = dict([(sids[self.app.relative_path(source)],
+                          set([value_ids[self.app.relative_path(value)] for value in values]))
+                         for source, values in dependencies.items()])
+
+        old_deps = {}
+        for chunk in chunked(new_deps):
+            rows = self.cursor.execute(
+                'SELECT id, source_id, dependency_id FROM source_dependencies WHERE source_id IN ({0})'.format(
+                    ','.join('?' * len(chunk))),
+                chunk)
+            for did, sid, value_id in rows:
+                old_deps.setdefault(sid, {}).setdefault(value_id, []).append(did)
+
+        deletes = []
+        inserts = []
+        for sid, dep_ids in new_deps.items():
+            old_dep_ids = old_deps.get(sid, {})
+            for dep_id, dids in old_dep_ids.items():
+                deletes.extend(dids[1:] if dep_id in dep_ids else dids)
+            inserts.extend([(sid, dep_id) for dep_id in dep_ids if dep_id not in old_dep_ids])
+
+        if len(deletes) > 0:
+            self.cursor.executemany('DELETE FROM source_dependencies WHERE id = ?', [(did, ) for did in deletes])
+        if len(inserts) > 0:
+            self.cursor.executemany('''
+                INSERT INTO source_dependencies
+                    (source_id, dependency_id)
+                    VALUES (?, ?)
+                ''', inserts)
+
+        for source, values in dependencies.items():
+            self.graph.set(self.app.relative_path(source), [self.app.relative_path(value) for value in values])
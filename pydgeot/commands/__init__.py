@@ -32,7 +32,7 @@ class Command:
         self.help_msg = help_msg
         self.allow_appless = allow_appless
 
-    def run(self, app, *args):
+    def run(self, app, *args, **kwargs):
         """
         Run the command function with the given app and arguments.
 
@@ -40,6 +40,9 @@ class Command:
         :type app: pydgeot.app.App | None
         :param args: Arguments to pass to the command.
         :type args: list[Any]
+        :param kwargs: Options to pass to the command. Only options the command function accepts as keyword only
+                       arguments will be passed, any others are ignored.
+        :type kwargs: dict[str, Any]
         :return: Return value of the command being run.
         :rtype: Any
         :raises pydgeot.app.CommandError: If the number of arguments passed to the command is not correct.
@@ -47,9 +50,11 @@ class Command:
         arg_len = len(args) + 1
         arg_count = self.func.__code__.co_argcount
         has_varg = self.func.__code__.co_flags & 0x04 > 0
+        options = self.func.__code__.co_varnames[arg_count:arg_count + self.func.__code__.co_kwonlyargcount]
+        kwargs = dict([(name, value) for name, value in kwargs.items() if name in options])
 
         if (has_varg and arg_len >= arg_count) or (not has_varg and arg_len == arg_count):
-            return self.func(app, *args)
+            return self.func(app, *args, **kwargs)
 
         raise CommandError('Incorrect number of arguments passed to command \'{0}\''.format(self.name))
 
@@ -2,18 +2,31 @@ from pydgeot.commands import register
 
 
 @register(help_msg='Build static content')
-def build(app):
+def build(app, *, jobs=1, profile=False):
     """
     Generate content for an App instance.
 
     :param app: App instance to generate content for.
     :type app: pydgeot.app.App
+    :param jobs: Number of worker threads to generate content with.
+    :type jobs: int
+    :param profile: Record phase, processor, and file timings, writing a report to the Apps log directory.
+    :type profile: bool
     """
     from pydgeot.commands import CommandError
     from pydgeot.generator import Generator
 
     if app.is_valid:
-        gen = Generator(app)
+        profiler = None
+        if profile:
+            from pydgeot.profiler import BuildProfiler
+            profiler = BuildProfiler(app)
+
+        gen = Generator(app, jobs=jobs, profiler=profiler)
         gen.generate()
+
+        if profiler is not None:
+            profiler.log_summary()
+            app.log.info('Wrote build profile to \'%s\'', profiler.save())
     else:
         raise CommandError('Need a valid Pydgeot app directory.')
@@ -1,24 +1,28 @@
 from pydgeot.commands import register
 
 
-@register(help_args='[event delay[, timeout]]', help_msg='Continuously build static content')
-def watch(app, *args):
+@register(help_args='[event delay[, timeout[, poll budget]]]', help_msg='Continuously build static content')
+def watch(app, *args, jobs=1):
     """
     Build content for an App instance, and then monitor changes, building content as needed.
 
     :param app: App instance to watch and build content for.
     :type app: pydgeot.app.App
     :param args: List of optional parameters for the content generator. The first element will be used for the event
-                 timeout. The second will be used for the file changed timeout.
+                 timeout. The second will be used for the file changed timeout. The third will be used for the
+                 number of stat calls the fallback observer may make per poll, or 0 for no limit.
     :type args: list[str]
+    :param jobs: Number of worker threads to generate content with.
+    :type jobs: int
     """
-    import os
+    import asyncio
     from pydgeot.commands import CommandError
     from pydgeot.generator import Generator
     from pydgeot.observer import Observer
+    from pydgeot.watcher import Watcher
 
     if app.is_valid:
-        gen = Generator(app)
+        gen = Generator(app, jobs=jobs)
         gen.generate()
 
         obs = Observer(app.source_root)
@@ -27,17 +31,16 @@ def watch(app, *args):
             obs.event_timeout = max(int(args[0]), 1)
         if len(args) >= 2:
             obs.changed_timeout = max(int(args[1]), 1)
+        if len(args) >= 3:
+            obs.io_budget = max(int(args[2]), 0)
 
-        print('Starting {0} observer ({1}s event delay, {2}s file changed timeout)'.format(obs.observer,
-                                                                                           obs.event_timeout,
-                                                                                           obs.changed_timeout))
+        print('Starting {0} observer ({1}s event delay, {2}s file changed timeout, '
+              '{3}s finished file settle time)'.format(obs.observer,
+                                                       obs.event_timeout,
+                                                       obs.changed_timeout,
+                                                       obs.settle_timeout))
 
-        def on_changed(path):
-            root = os.path.dirname(path)
-            changes = gen.collect_changes(root)
-            gen.process_changes(changes)
-
-        obs.on_changed_handlers.add(on_changed)
-        obs.start()
+        # asyncio.run cancels the watcher and waits for it to finish when interrupted, before the loop is closed.
+        asyncio.run(Watcher(gen, obs).run())
     else:
         raise CommandError('Need a valid Pydgeot app directory.')
@@ -2,6 +2,7 @@ import sys
 import os
 import stat
 from pydgeot.filesystem.glob import Glob
+from pydgeot.filesystem.scanner import Scanner, ScanEntry, DirectorySnapshot
 
 
 def is_dotfile(path):
@@ -15,6 +16,171 @@ def is_dotfile(path):
     """
     return any([part != '..' and part.startswith('.') for part in path.split(os.sep)])
 
+
+def file_digest(path, mmap_size=4 * 1024 * 1024):
+    """
+    Get a hex digest of a files content. Files at or over mmap_size bytes are memory mapped rather than read in to
+    memory. Hashing releases the GIL, so digests may be computed for many files at once from multiple threads.
+
+    :param path: File path to hash.
+    :type path: str
+    :param mmap_size: Size in bytes at which files will be memory mapped.
+    :type mmap_size: int
+    :return: SHA-1 hex digest of the file content.
+    :rtype: str
+    """
+    import hashlib
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size >= mmap_size:
+            import mmap
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            digest.update(fh.read())
+    return digest.hexdigest()
+
+
+def reflink_file(source, target):
+    """
+    Create target as a copy on write clone of source, sharing its data blocks. Only supported on Linux, by filesystems
+    such as Btrfs and XFS.
+
+    :param source: File path to clone.
+    :type source: str
+    :param target: New file path to create as the clone.
+    :type target: str
+    :raises OSError: If the platform or filesystem does not support cloning, or source and target are on different
+                     filesystems.
+    """
+    import errno
+
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, 'Reflinks are not supported on this platform')
+
+    import fcntl
+
+    with open(source, 'rb') as source_fh:
+        try:
+            with open(target, 'wb') as target_fh:
+                # FICLONE, _IOW(0x94, 9, int)
+                fcntl.ioctl(target_fh.fileno(), 0x40049409, source_fh.fileno())
+        except OSError:
+            if os.path.isfile(target):
+                os.unlink(target)
+            raise
+
+
+def copy_file(source, target, mode='copy', skip_unchanged=False):
+    """
+    Copy a file, along with its modified time and permissions. Any existing target file is replaced rather than written
+    through, so a target previously linked to source is never written to.
+
+    :param source: File path to copy.
+    :type source: str
+    :param target: File path to copy to.
+    :type target: str
+    :param mode: 'copy' to copy the files content, 'reflink' to clone the file where the filesystem supports it, or
+                 'hardlink' to create a hard link to the file where possible. Reflinks and hard links that cannot be
+                 created fall back to copying.
+    :type mode: str
+    :param skip_unchanged: Don't copy if the target is a different file with the same size and modified time as
+                           source, or, in 'hardlink' mode, is already a hard link to source.
+    :type skip_unchanged: bool
+    :return: True if the target was written, False if it was skipped.
+    :rtype: bool
+    :raises ValueError: If the mode is not known.
+    :raises IsADirectoryError: If the target is a directory.
+    """
+    import shutil
+
+    if mode not in ('copy', 'reflink', 'hardlink'):
+        raise ValueError('Unknown copy mode \'{}\''.format(mode))
+
+    source_stat = os.stat(source)
+    try:
+        target_stat = os.lstat(target)
+    except OSError:
+        target_stat = None
+
+    if target_stat is not None:
+        if stat.S_ISDIR(target_stat.st_mode):
+            raise IsADirectoryError('Unable to copy \'{}\', target \'{}\' is a directory'.format(source, target))
+        if skip_unchanged and stat.S_ISREG(target_stat.st_mode):
+            if os.path.samestat(source_stat, target_stat):
+                if mode == 'hardlink':
+                    return False
+            # Including targets copied in 'hardlink' mode, where linking failed, such as across devices.
+            elif (target_stat.st_size == source_stat.st_size and
+                    target_stat.st_mtime_ns == source_stat.st_mtime_ns):
+                return False
+        os.unlink(target)
+
+    if mode == 'hardlink':
+        try:
+            os.link(source, target)
+            return True
+        except OSError:
+            pass
+    elif mode == 'reflink':
+        try:
+            reflink_file(source, target)
+            shutil.copystat(source, target)
+            return True
+        except OSError:
+            pass
+
+    copy_content(source, target)
+    shutil.copystat(source, target)
+    return True
+
+
+def copy_content(source, target, chunk_size=1024 * 1024 * 1024):
+    """
+    Copy a files content, without its metadata. The content is copied by the kernel with os.copy_file_range or
+    os.sendfile where available, without passing through userspace, and in userspace otherwise. Any content left after
+    a kernel copy fails, or that was appended to source during the copy, is copied in userspace.
+
+    :param source: File path to copy.
+    :type source: str
+    :param target: File path to copy to.
+    :type target: str
+    :param chunk_size: Maximum number of bytes to copy with each kernel call.
+    :type chunk_size: int
+    """
+    import shutil
+
+    copies = []
+    if hasattr(os, 'copy_file_range'):
+        copies.append(lambda source_fd, target_fd, offset, count:
+                      os.copy_file_range(source_fd, target_fd, count, offset, offset))
+    if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        copies.append(lambda source_fd, target_fd, offset, count: os.sendfile(target_fd, source_fd, offset, count))
+
+    with open(source, 'rb') as source_fh, open(target, 'wb') as target_fh:
+        source_fd = source_fh.fileno()
+        target_fd = target_fh.fileno()
+        size = os.fstat(source_fd).st_size
+        offset = 0
+        for copy in copies:
+            # sendfile writes at the targets file position, rather than at an offset.
+            os.lseek(target_fd, offset, os.SEEK_SET)
+            try:
+                while offset < size:
+                    copied = copy(source_fd, target_fd, offset, min(size - offset, chunk_size))
+                    if copied == 0:
+                        break
+                    offset += copied
+            except OSError:
+                # Not supported for these files, such as across filesystems on older kernels.
+                continue
+            break
+        source_fh.seek(offset)
+        target_fh.seek(offset)
+        shutil.copyfileobj(source_fh, target_fh)
+
+
 if sys.platform == 'win32':
     try:
         import win32file
@@ -26,9 +26,11 @@ class Glob:
             import re
             self.regex = Glob.as_regex(self.value)
             self._regex = re.compile(self.regex)
+            self.like = Glob.as_like(self.value)
         else:
             self.regex = None
             self._regex = None
+            self.like = None
 
     def __hash__(self):
         return hash(self.value)
@@ -111,3 +113,67 @@ class Glob:
             i += 1
         pattern += '$'
         return pattern
+
+    @staticmethod
+    def as_like(glob):
+        """
+        Get the SQL LIKE pattern equivalent of the given glob pattern, using '\\' as the escape character. LIKE
+        patterns can not express every glob, and are case insensitive, so they are only equivalent to the globs regex
+        when matched case insensitively against values without line breaks.
+
+        Globs using only '**' wildcards can always be expressed. Globs using '?' or '*' can only be expressed if they
+        have no '**' wildcards or path separators, in which case matching values must also not contain path separators.
+
+        :param glob: The glob pattern.
+        :type glob: str
+        :return: Tuple of the LIKE pattern, and whether matching values may contain path separators. None if the glob
+                 can not be expressed as a LIKE pattern.
+        :rtype: tuple[str, bool] | None
+        """
+        pattern = ''
+        has_single = False
+        has_double = False
+        has_separator = False
+        i = 0
+        length = len(glob)
+        while i < length:
+            c = glob[i]
+            if c == '?':
+                has_single = True
+                pattern += '_'
+                i += 1
+                continue
+            elif c == '*':
+                if i < length - 1 and glob[i + 1] == '*':
+                    has_double = True
+                    i += 1
+                else:
+                    has_single = True
+                pattern += '%'
+                i += 1
+                continue
+            elif c == '\\':
+                i += 1
+                if i == length:
+                    break
+                c = glob[i]
+                if c == '\\':
+                    c = '/'
+                elif c.isalnum():
+                    # Escaped alphanumerics are regex classes, such as '\\d'.
+                    return None
+            elif c in '^$+{}[]|()':
+                # Regex special characters are left as is by as_regex.
+                return None
+            if ord(c) > 127:
+                # LIKE is only case insensitive for ASCII characters.
+                return None
+            if c == '/':
+                has_separator = True
+            if c in '%_\\':
+                pattern += '\\'
+            pattern += c
+            i += 1
+        if has_single and (has_double or has_separator):
+            return None
+        return pattern, not has_single
@@ -0,0 +1,154 @@
+import os
+import sys
+import errno
+import struct
+import ctypes
+import ctypes.util
+from collections import namedtuple
+
+
+# Minimal inotify bindings, calling the Linux syscalls through ctypes. Importing raises ImportError wherever inotify is
+# not available.
+if sys.platform != 'linux':
+    raise ImportError('inotify is only available on Linux')
+
+IN_ACCESS = 0x00000001
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_CLOSE_NOWRITE = 0x00000010
+IN_OPEN = 0x00000020
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_rm_watch = _libc.inotify_rm_watch
+except (OSError, AttributeError):
+    raise ImportError('inotify functions could not be loaded from libc')
+
+_inotify_init1.argtypes = [ctypes.c_int]
+_inotify_init1.restype = ctypes.c_int
+_inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+_inotify_add_watch.restype = ctypes.c_int
+_inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+_inotify_rm_watch.restype = ctypes.c_int
+
+# struct inotify_event header: int wd, uint32_t mask, uint32_t cookie, uint32_t len. Followed by len bytes of name.
+_event_header = struct.Struct('iIII')
+
+
+InotifyEvent = namedtuple('InotifyEvent', ['wd', 'mask', 'cookie', 'name'])
+"""Named Tuple containing an events watch descriptor, event mask, move cookie, and file name within the watch."""
+
+
+def _error(path=None):
+    """
+    Get an OSError for the last failed libc call.
+
+    :rtype: OSError
+    """
+    err = ctypes.get_errno()
+    return OSError(err, os.strerror(err), path)
+
+
+class Inotify:
+    """
+    Non-blocking inotify instance. Its file descriptor may be passed to select or epoll, and events read once it is
+    readable.
+    """
+    read_size = 64 * 1024
+
+    def __init__(self):
+        """
+        :raises OSError: If the inotify instance could not be created.
+        """
+        self.fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise _error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def fileno(self):
+        """
+        :return: Inotify file descriptor.
+        :rtype: int
+        """
+        return self.fd
+
+    def close(self):
+        """
+        Close the inotify instance, removing all of its watches.
+        """
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def add_watch(self, path, mask):
+        """
+        Watch a path for events. Adding a watch for an already watched path replaces its mask.
+
+        :param path: Path to watch.
+        :type path: str
+        :param mask: Bit mask of events to watch for.
+        :type mask: int
+        :return: Watch descriptor, identifying the path in events.
+        :rtype: int
+        :raises OSError: If the path could not be watched.
+        """
+        wd = _inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise _error(path)
+        return wd
+
+    def rm_watch(self, wd):
+        """
+        Remove a watch. Watches already removed by the kernel, such as for deleted paths, are ignored.
+
+        :param wd: Watch descriptor to remove.
+        :type wd: int
+        """
+        if _inotify_rm_watch(self.fd, wd) < 0 and ctypes.get_errno() != errno.EINVAL:
+            raise _error()
+
+    def read_events(self):
+        """
+        Read all pending events, without blocking.
+
+        :return: List of events, in the order they occurred.
+        :rtype: list[pydgeot.filesystem.inotify.InotifyEvent]
+        """
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, self.read_size)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                wd, mask, cookie, length = _event_header.unpack_from(buf, offset)
+                offset += _event_header.size
+                name = os.fsdecode(buf[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append(InotifyEvent(wd, mask, cookie, name))
+        return events
@@ -0,0 +1,156 @@
+import os
+from collections import namedtuple
+
+
+ScanEntry = namedtuple('ScanEntry', ['path', 'size', 'mtime_ns'])
+"""
+Named Tuple containing a scanned files path relative to the scan root, size, and modified time in nanoseconds. Size and
+modified time are None for files in trusted unchanged directories, which are not statted.
+"""
+
+DirectorySnapshot = namedtuple('DirectorySnapshot', ['mtime_ns', 'files', 'directories'])
+"""Named Tuple containing a directories modified time in nanoseconds, and the names of its files and subdirectories."""
+
+
+class Scanner:
+    """
+    Source tree scanner. Lists directories with os.scandir, using the stat data of each directory entry rather than
+    statting paths separately. Subdirectories may be scanned concurrently on a pool of worker threads, as scandir and
+    stat release the GIL while waiting on the file system.
+
+    Directory snapshots from a previous scan may be given. A directories modified time changes whenever entries are
+    added, removed or renamed in it, so if it matches the snapshot the directory is not listed again, and only its
+    files are statted. In trusted mode, files in unchanged directories are not statted either, and are assumed to be
+    unchanged. Snapshots for every directory scanned are collected in `directories`, to be given to the next scan.
+    """
+    # Directories modified this close to the start of a scan are not snapshotted, as further changes may not move
+    # their modified time on file systems with coarse timestamps.
+    racy_ns = 2 * 1000 * 1000 * 1000
+
+    def __init__(self, root, jobs=1, follow_links=False, snapshots=None, trusted=False):
+        """
+        :param root: Directory path to scan.
+        :type root: str
+        :param jobs: Number of worker threads to scan subdirectories with.
+        :type jobs: int
+        :param follow_links: Scan in to symlinked directories.
+        :type follow_links: bool
+        :param snapshots: Directory snapshots from a previous scan, keyed by directory path.
+        :type snapshots: dict[str, pydgeot.filesystem.scanner.DirectorySnapshot] | None
+        :param trusted: Assume files in directories matching their snapshot are unchanged.
+        :type trusted: bool
+        """
+        self.root = root
+        self.jobs = max(jobs, 1)
+        self.follow_links = follow_links
+        self.snapshots = snapshots if snapshots is not None else {}
+        self.trusted = trusted
+        self.directories = {}
+        """:type: dict[str, pydgeot.filesystem.scanner.DirectorySnapshot]"""
+        self._started_ns = 0
+
+    def scan(self):
+        """
+        Scan the root directory and all of its subdirectories. Files that disappear or can not be read while scanning
+        are skipped.
+
+        :return: Generator of ScanEntry records for each file, in no particular order.
+        :rtype: collections.Iterable[pydgeot.filesystem.scanner.ScanEntry]
+        """
+        import time
+
+        if not os.path.isdir(self.root):
+            return
+
+        self.directories = {}
+        self._started_ns = int(time.time() * 1000 * 1000 * 1000)
+
+        if self.jobs == 1:
+            directories = ['']
+            while len(directories) > 0:
+                files, subdirectories = self._scan_directory(directories.pop())
+                directories.extend(subdirectories)
+                yield from files
+            return
+
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            pending = {executor.submit(self._scan_directory, '')}
+            while len(pending) > 0:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirectories = future.result()
+                    pending |= set([executor.submit(self._scan_directory, rel) for rel in subdirectories])
+                    yield from files
+
+    def _scan_directory(self, rel):
+        """
+        List a single directory.
+
+        :param rel: Directory path relative to the scan root.
+        :type rel: str
+        :return: Tuple of ScanEntry records for the directories files, and relative paths of its subdirectories.
+        :rtype: tuple[list[pydgeot.filesystem.scanner.ScanEntry], list[str]]
+        """
+        path = os.path.join(self.root, rel) if rel != '' else self.root
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+
+        snapshot = self.snapshots.get(path, None)
+        if snapshot is not None and snapshot.mtime_ns == mtime_ns:
+            self.directories[path] = snapshot
+            return self._scan_snapshot(rel, path, snapshot), [self._join(rel, name) for name in snapshot.directories]
+
+        files = []
+        file_names = []
+        subdirectories = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if self.follow_links or not entry.is_symlink():
+                                subdirectories.append(entry.name)
+                            continue
+                        file_names.append(entry.name)
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append(ScanEntry(self._join(rel, entry.name), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            return [], []
+
+        if mtime_ns < self._started_ns - self.racy_ns:
+            self.directories[path] = DirectorySnapshot(mtime_ns, tuple(file_names), tuple(subdirectories))
+        return files, [self._join(rel, name) for name in subdirectories]
+
+    def _scan_snapshot(self, rel, path, snapshot):
+        """
+        Get ScanEntry records for the files of an unchanged directory, without listing it.
+
+        :param rel: Directory path relative to the scan root.
+        :type rel: str
+        :param path: Directory path.
+        :type path: str
+        :param snapshot: Snapshot matching the directory.
+        :type snapshot: pydgeot.filesystem.scanner.DirectorySnapshot
+        :rtype: list[pydgeot.filesystem.scanner.ScanEntry]
+        """
+        if self.trusted:
+            return [ScanEntry(self._join(rel, name), None, None) for name in snapshot.files]
+
+        files = []
+        for name in snapshot.files:
+            try:
+                stat = os.stat(os.path.join(path, name))
+            except OSError:
+                continue
+            files.append(ScanEntry(self._join(rel, name), stat.st_size, stat.st_mtime_ns))
+        return files
+
+    @staticmethod
+    def _join(rel, name):
+        return os.path.join(rel, name) if rel != '' else name
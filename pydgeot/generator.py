@@ -1,5 +1,5 @@
 import os
-import datetime
+from pydgeot.filesystem import Scanner
 
 
 class ChangeSet:
@@ -9,6 +9,8 @@ class ChangeSet:
     def __init__(self):
         self.generate = set()
         self.delete = set()
+        self.hashes = {}
+        """:type: dict[str, str]"""
 
 
 class Generator:
@@ -16,12 +18,18 @@ class Generator:
     Source content builder for App instances. Determines file changes in the Apps source directory, and passes modified
     files to the appropriate processors to generate content in the Apps build directory.
     """
-    def __init__(self, app):
+    def __init__(self, app, jobs=1, profiler=None):
         """
         :param app: Parent App instance.
         :type app: pydgeot.app.App
+        :param jobs: Number of worker threads to generate content with.
+        :type jobs: int
+        :param profiler: BuildProfiler to record phase, processor, and file timings with, if any.
+        :type profiler: pydgeot.profiler.BuildProfiler | None
         """
         self.app = app
+        self.jobs = max(jobs, 1)
+        self.profiler = profiler
 
     def generate(self):
         """
@@ -29,8 +37,16 @@ class Generator:
         """
         if not os.path.isdir(self.app.build_root):
             os.makedirs(self.app.build_root)
-        changes = self.collect_changes()
+        if self.profiler is not None:
+            self.profiler.start()
+        with self._phase('scan'):
+            changes = self.collect_changes()
         self.process_changes(changes)
+        if self.app.build_cache is not None:
+            with self._phase('cache_prune'):
+                self.app.build_cache.prune()
+        if self.profiler is not None:
+            self.profiler.stop()
 
     def process_changes(self, changes):
         """
@@ -39,58 +55,141 @@ class Generator:
         :param changes: ChangeSet to build content for.
         :type changes: pydgeot.generator.ChangeSet
         """
+        import time
+
+        start_time = time.perf_counter()
         dep_changes = ChangeSet()
 
-        # Remove deleted files and set dependencies to be updated.
-        for path in changes.delete:
-            # Grab any dependencies before deleting the path
-            dep_changes.generate |= self._get_dependency_tree(path)
+        # Grab dependencies before deleting or preparing, in case any dependencies or context vars are removed.
+        with self._phase('dependencies'):
+            dep_changes.generate |= self._get_dependency_tree(changes.delete | changes.generate)
 
-            self.app.processor_delete(path)
+        # Remove deleted files.
+        with self._phase('delete'):
+            processor_delete = self._timed('delete', self.app.processor_delete)
+            for path in changes.delete:
+                processor_delete(path)
 
         # Prepare new or updated files to set targets and dependencies.
-        for path in list(changes.generate):
-            # Grab dependencies before preparing, in case any context vars had been removed
-            dep_changes.generate |= self._get_dependency_tree(path)
-
-            # Prepare the source to refresh any new dependencies
-            self.app.processor_prepare(path)
+        with self._phase('prepare'):
+            self._process_paths(self._timed('prepare', self.app.processor_prepare), changes.generate)
 
-            # Add any files the source is dependent on or depends on it
-            dep_changes.generate |= self._get_dependency_tree(path)
+        # Add any files that depend on the prepared sources with their refreshed dependencies.
+        with self._phase('dependencies'):
+            dep_changes.generate |= self._get_dependency_tree(changes.generate)
+            dep_changes.generate -= changes.delete
 
         # Prepare dependent changes that weren't in the original changes list
-        for path in (dep_changes.generate - changes.generate):
-            self.app.processor_prepare(path)
+        with self._phase('prepare'):
+            self._process_paths(self._timed('prepare', self.app.processor_prepare),
+                                dep_changes.generate - changes.generate)
 
         # Generate everything
-        for path in (changes.generate | dep_changes.generate):
-            self.app.processor_generate(path)
+        with self._phase('generate'):
+            self._process_paths(self._timed('generate', self.app.processor_generate),
+                                changes.generate | dep_changes.generate)
 
         # Finish generation
-        self.app.processor_generation_complete()
+        with self._phase('generation_complete'):
+            self.app.processor_generation_complete()
+
+        with self._phase('commit'):
+            # Store content hashes for changed sources, now they have been built.
+            if len(changes.hashes) > 0:
+                self.app.sources.set_hashes(changes.hashes)
+
+            # Commit database changes
+            self.app.save_processors()
+            self.app.commit()
 
-        # Commit database changes
-        self.app.db_connection.commit()
+            self.app.config_cache.save()
 
-    def _get_dependency_tree(self, source):
+        if len(changes.generate) > 0 or len(changes.delete) > 0:
+            self.app.log.info('Built %d and deleted %d files in %.3fs (%s database profile)',
+                              len(changes.generate | dep_changes.generate), len(changes.delete),
+                              time.perf_counter() - start_time, self.app.db_profile)
+
+    def _phase(self, name):
+        """
+        Get a context manager timing a build phase, if profiling.
+
+        :param name: Name of the phase.
+        :type name: str
+        :rtype: contextlib.AbstractContextManager
         """
-        Get a set of the entire dependency tree for a source path.
+        import contextlib
+
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(name)
 
-        :param source: Source path to get dependency paths for.
-        :type source: str
+    def _timed(self, phase, func):
+        """
+        Get an App processor method, wrapped to record the time taken for each call, if profiling.
+
+        :param phase: Name of the processor method.
+        :type phase: str
+        :param func: App processor method.
+        :type func: callable[str]
+        :rtype: callable[str]
+        """
+        if self.profiler is None:
+            return func
+        return self.profiler.wrap(phase, func)
+
+    def _process_paths(self, func, paths):
+        """
+        Call an App processor method for each path. If more than one job is allowed, paths handled by thread safe
+        processors are spread over a pool of worker threads, and any remaining paths are processed afterwards in the
+        calling thread. Database calls made by the processors are funneled through the Apps DatabaseWriter while the
+        worker threads run.
+
+        :param func: App processor method to call, such as App.processor_generate.
+        :type func: callable[str]
+        :param paths: File paths to process.
+        :type paths: set[str]
+        :return: List of values returned by each call.
+        :rtype: list[Any]
+        """
+        if self.jobs == 1 or len(paths) < 2:
+            return [func(path) for path in paths]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        parallel_paths = []
+        serial_paths = []
+        for path in paths:
+            processor = self.app.get_processor(path)
+            if processor is None or processor.thread_safe:
+                parallel_paths.append(path)
+            else:
+                serial_paths.append(path)
+
+        with self.app.db_writer, ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(func, path) for path in parallel_paths]
+            # Re-raise any exceptions that escaped the App processor call in the calling thread.
+            results = [future.result() for future in futures]
+
+        return results + [func(path) for path in serial_paths]
+
+    def _get_dependency_tree(self, sources):
+        """
+        Get a set of the entire dependency tree for a collection of source paths.
+
+        :param sources: Source paths to get dependency paths for.
+        :type sources: set[str]
         :return: Set of source paths.
         :rtype: set[str]
         """
+        if len(sources) == 0:
+            return set()
+
         # Get source and context dependencies.
-        source_deps = set([s.path for s in self.app.sources.get_dependencies(source, reverse=True, recursive=True)])
-        context_deps = set([c.source for c in
-                            self.app.contexts.get_dependencies(source, reverse=True, recursive=True)])
+        source_deps = self.app.sources.get_dependency_tree(sources, reverse=True)
+        context_deps = self.app.contexts.get_dependency_tree(sources, reverse=True)
 
         # Get source dependencies for context dependency sources.
-        source_deps |= set([s.path
-                            for c in context_deps
-                            for s in self.app.sources.get_dependencies(c, reverse=True, recursive=True)])
+        source_deps |= self.app.sources.get_dependency_tree(context_deps, reverse=True)
 
         return source_deps | context_deps
 
@@ -102,32 +201,166 @@ class Generator:
         :type root: str
         :return: ChangeSet instance, representing any changed files.
         :rtype: pydgeot.generator.ChangeSet
+        :raises pydgeot.app.AppError: If the scan_mode setting is not known.
         """
+        from pydgeot.app import AppError
+
         if root is None:
             root = self.app.source_root
         changes = ChangeSet()
 
-        old_sources = dict([(s.path, s.modified) for s in self.app.sources.get_sources(root)])
+        self.app.config_cache.refresh()
+
+        scan_mode = self.app.settings.get('scan_mode', 'full')
+        if scan_mode not in ('full', 'prune', 'trusted'):
+            raise AppError('Unknown scan_mode \'{}\', expected one of \'full\', \'prune\' or \'trusted\''.format(
+                scan_mode))
+        snapshots = self.app.sources.get_directories(root) if scan_mode != 'full' else {}
+        scanner = Scanner(root, jobs=self.jobs, snapshots=snapshots, trusted=(scan_mode == 'trusted'))
+
+        old_sources = dict([(s.path, s) for s in self.app.sources.get_sources(root)])
         current_sources = {}
-        if os.path.isdir(root):
-            for directory, _, filenames in os.walk(root):
-                for filename in filenames:
-                    path = os.path.join(directory, filename)
+        for entry in scanner.scan():
+            path = os.path.join(root, entry.path)
 
-                    config = self.app.get_config(path)
-                    rel_path = self.app.relative_path(path)
-                    if any(glob.match_path(rel_path) for glob in config.ignore):
-                        continue
+            # Scanned entries are files, so use their directories config without checking.
+            config = self.app.get_config(os.path.dirname(path))
+            rel_path = self.app.relative_path(path)
+            if any(glob.match_path(rel_path) for glob in config.ignore):
+                continue
 
-                    stat = os.stat(path)
-                    current_sources[path] = datetime.datetime.fromtimestamp(stat.st_mtime)
+            current_sources[path] = entry
+        self.app.config_cache.add_files(current_sources)
 
-        for path, mtime in current_sources.items():
-            if path not in old_sources or (mtime - old_sources[path]).total_seconds() > 1:
+        for path, entry in current_sources.items():
+            if self._is_changed(entry, old_sources.get(path, None)):
                 changes.generate.add(path)
 
-        for old_path, old_mtime in old_sources.items():
+        if self.app.settings.get('content_hash', False):
+            self._filter_hash_changes(changes, self.app.sources.get_hashes(root))
+
+        for old_path in old_sources:
             if old_path not in current_sources:
                 changes.delete.add(old_path)
+        self.app.config_cache.remove_files(changes.delete)
+
+        if scan_mode != 'full':
+            self.app.sources.set_directories(root, scanner.directories)
 
         return changes
+
+    def collect_path_changes(self, paths):
+        """
+        Find updated or deleted files from a collection of exact file paths, such as those reported by an Observer.
+        Only the given files are checked, rather than rescanning their directories. Paths that are directories, or that
+        no longer exist and are not known sources, are rescanned with collect_changes, as they may be directories that
+        were created, moved or deleted.
+
+        :param paths: File or directory paths that have changed.
+        :type paths: collections.Iterable[str]
+        :return: ChangeSet instance, representing any changed files.
+        :rtype: pydgeot.generator.ChangeSet
+        """
+        from pydgeot.filesystem import ScanEntry
+
+        self.app.config_cache.refresh()
+
+        changes = ChangeSet()
+        rescan_roots = set()
+        for path in set(os.path.abspath(path) for path in paths):
+            if path != self.app.source_root and not path.startswith(self.app.source_root + os.sep):
+                continue
+            if os.path.isdir(path):
+                rescan_roots.add(path)
+                continue
+
+            old_source = self.app.sources.get_source(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.app.config_cache.remove_files([path])
+                if old_source is not None:
+                    changes.delete.add(path)
+                else:
+                    rescan_roots.add(path)
+                continue
+
+            self.app.config_cache.add_files([path])
+            config = self.app.get_config(path)
+            rel_path = self.app.relative_path(path)
+            if any(glob.match_path(rel_path) for glob in config.ignore):
+                continue
+
+            if self._is_changed(ScanEntry(rel_path, stat.st_size, stat.st_mtime_ns), old_source):
+                changes.generate.add(path)
+
+        if self.app.settings.get('content_hash', False) and len(changes.generate) > 0:
+            old_hashes = {}
+            for directory in set(os.path.dirname(path) for path in changes.generate):
+                old_hashes.update(self.app.sources.get_hashes(directory, recursive=False))
+            self._filter_hash_changes(changes, old_hashes)
+
+        # Rescan directories last, skipping any that are within another directory being rescanned.
+        for root in rescan_roots:
+            if any(root.startswith(other + os.sep) for other in rescan_roots):
+                continue
+            root_changes = self.collect_changes(root)
+            changes.generate |= root_changes.generate
+            changes.delete |= root_changes.delete
+            changes.hashes.update(root_changes.hashes)
+
+        return changes
+
+    @staticmethod
+    def _is_changed(entry, old_source):
+        """
+        Check if a scanned file differs from its stored source entry.
+
+        :param entry: ScanEntry for the file.
+        :type entry: pydgeot.filesystem.ScanEntry
+        :param old_source: Stored SourceResult for the file, or None if it is not a known source.
+        :type old_source: pydgeot.app.sources.SourceResult | None
+        :rtype: bool
+        """
+        if old_source is None:
+            return True
+        if entry.size is None:
+            # File in a trusted unchanged directory, which was not statted.
+            return False
+        return entry.size != old_source.size or entry.mtime_ns / 1e9 - old_source.modified.timestamp() > 1
+
+    def _filter_hash_changes(self, changes, old_hashes):
+        """
+        Hash the content of changed files, removing any whose content is unchanged from the ChangeSet and refreshing
+        their stored size and modified time. Hashes for files that have changed are set on the ChangeSet, to be stored
+        after they have been built.
+
+        :param changes: ChangeSet of files with a changed size or modified time.
+        :type changes: pydgeot.generator.ChangeSet
+        :param old_hashes: Stored content hashes for the changed files.
+        :type old_hashes: dict[str, str]
+        """
+        from pydgeot.filesystem import file_digest
+
+        def get_digest(path):
+            try:
+                return file_digest(path)
+            except OSError:
+                return None
+
+        paths = list(changes.generate)
+        if self.jobs > 1 and len(paths) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                digests = list(executor.map(get_digest, paths))
+        else:
+            digests = [get_digest(path) for path in paths]
+
+        for path, digest in zip(paths, digests):
+            if digest is None:
+                continue
+            if old_hashes.get(path, None) == digest:
+                changes.generate.discard(path)
+                self.app.sources.add_source(path)
+            else:
+                changes.hashes[path] = digest
@@ -1,15 +1,23 @@
 import sys
 import os
 import time
+import threading
+from collections import namedtuple
 
 
 class _ObserverBase:
     """
     Base class for file system observers. Queues file changes and signals change events.
+
+    Observers that can tell when a file has finished changing (such as when a writer closes it) queue it as finished.
+    Finished files are signaled once they have been quiet for a short settle period, rather than waiting for the full
+    changed timeout, which remains as a fallback for writers that never report finishing. Each files settle period
+    adapts, doubling whenever the file changes again before settling, and halving each time it is signaled.
     """
     observer = None
     changed_timeout = 10
     event_timeout = 2
+    settle_timeout = 0.05
 
     def __init__(self, path):
         """
@@ -20,49 +28,170 @@ class _ObserverBase:
         """
         self.path = path
         self.changed = {}
+        """:type: dict[str, float]"""
+        self.finished = {}
+        """:type: dict[str, float]"""
+        self.settle = {}
+        """:type: dict[str, float]"""
         self.on_changed_handlers = set()
-        """:type: set[callable[str]]"""
+        """:type: set[callable[set[str]]]"""
+        self._thread_loop = None
+        """:type: asyncio.AbstractEventLoop | None"""
+        self._stop_event = threading.Event()
 
     def start(self):
         """
-        Start file system observation loop.
+        Start file system observation loop. Runs until stop is called.
         """
         raise NotImplementedError
 
-    def queue_changed(self, path):
+    def stop(self):
+        """
+        Stop the file system observation loop. The loop finishes within its event timeout.
+        """
+        self._stop_event.set()
+
+    def wait(self, timeout):
+        """
+        Wait until the timeout has passed, or the observer is stopped. Should be used by observation loops in place of
+        sleeping.
+
+        :param timeout: Time to wait in seconds.
+        :type timeout: float
+        :return: If the observer has been stopped.
+        :rtype: bool
+        """
+        return self._stop_event.wait(timeout)
+
+    @property
+    def is_stopped(self):
+        """
+        :return: If the observer has been stopped.
+        :rtype: bool
+        """
+        return self._stop_event.is_set()
+
+    async def observe(self):
+        """
+        Run the file system observation loop as an asyncio coroutine, calling change handlers on the event loop.
+        Observers without their own asyncio support run the blocking start loop in a daemon thread, and hand signaled
+        changes back to the event loop. Runs until cancelled, or the observation loop fails, stopping the thread either
+        way.
+        """
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        def set_exception(e):
+            if not future.done():
+                future.set_exception(e)
+
+        def run():
+            try:
+                self.start()
+            except BaseException as e:
+                loop.call_soon_threadsafe(set_exception, e)
+
+        self._thread_loop = loop
+        self._stop_event.clear()
+        threading.Thread(target=run, name='pydgeot-observer', daemon=True).start()
+        try:
+            await future
+        finally:
+            self.stop()
+            self._thread_loop = None
+
+    def queue_changed(self, path, finished=False, structural=False):
         """
         Place a file change event in to the change queue. Should be called from the observation loop when file changes
-        are detected.
+        are detected. Directory paths are only queued for structural events, as created, moved or deleted directories
+        may not report events for the files inside them. Other directory events, such as a directories modified time
+        changing when a file inside it is saved, are reported for the files themselves, and would otherwise cause the
+        whole directory to be rescanned.
 
-        :param path: File path to place in to the change queue.
+        :param path: File or directory path to place in to the change queue.
         :type path: str
+        :param finished: The event signals the path has finished changing, such as a file being closed after writing,
+                         moved in to place, or deleted.
+        :type finished: bool
+        :param structural: The event created, deleted or moved the path.
+        :type structural: bool
         """
-        if not os.path.isdir(path):
-            self.changed[path] = time.time()
+        if not structural and os.path.isdir(path):
+            return
+        now = time.time()
+        if finished:
+            self.finished[path] = now
+        elif path in self.finished:
+            # Changed again before settling, so give it longer to settle from now on.
+            del self.finished[path]
+            self.settle[path] = min(self.settle.get(path, self.settle_timeout) * 2, self.changed_timeout)
+        self.changed[path] = now
 
     def signal_changed(self):
         """
-        Iterate through the change queue, signaling changes for those that are not locked, and have passed the changed
-        timeout.
+        Iterate through the change queue, signaling changes for those that are not locked, and have either finished and
+        settled, or passed the changed timeout. All paths that are ready are signaled together, as a single batch.
         """
         stime = time.time()
+        paths = set()
         for path, mtime in list(self.changed.items()):
             if self.is_locked(path):
                 continue
-            if mtime + self.changed_timeout < stime:
-                self.on_changed(path)
+            settle = self.settle.get(path, self.settle_timeout)
+            finished = self.finished.get(path, None)
+            if (finished is not None and finished + settle <= stime) or mtime + self.changed_timeout < stime:
+                paths.add(path)
                 del self.changed[path]
+                self.finished.pop(path, None)
+                if settle / 2 > self.settle_timeout:
+                    self.settle[path] = settle / 2
+                else:
+                    self.settle.pop(path, None)
+        if len(paths) > 0:
+            self.on_changed(paths)
+
+    def next_timeout(self):
+        """
+        Get how long the observation loop may wait for events before the next queued change could be ready to signal.
+
+        :return: Timeout in seconds, no longer than the event timeout.
+        :rtype: float
+        """
+        now = time.time()
+        timeout = self.event_timeout
+        for path, mtime in self.changed.items():
+            deadline = mtime + self.changed_timeout
+            finished = self.finished.get(path, None)
+            if finished is not None:
+                deadline = min(deadline, finished + self.settle.get(path, self.settle_timeout))
+            timeout = min(timeout, deadline - now)
+        return max(timeout, 0)
 
-    def on_changed(self, path):
+    def on_changed(self, paths):
         """
-        Called when a file change has been through the queue and timed out (when the file can be sure to have finished
+        Called when file changes have been through the queue and timed out (when the files can be sure to have finished
         changing.) This should be overridden in the observer instance.
 
-        :param path: File path to signal as having been changed.
-        :type path: str
+        :param paths: Set of file or directory paths to signal as having been changed, created or deleted.
+        :type paths: set[str]
+        """
+        loop = self._thread_loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._call_handlers, paths)
+        else:
+            self._call_handlers(paths)
+
+    def _call_handlers(self, paths):
+        """
+        Call each on_changed handler.
+
+        :param paths: Set of file or directory paths to signal as having been changed, created or deleted.
+        :type paths: set[str]
         """
         for handler in self.on_changed_handlers:
-            handler(path)
+            handler(paths)
 
     def is_locked(self, path):
         """
@@ -77,39 +206,185 @@ class _ObserverBase:
 
 if sys.platform == 'linux':
     try:
-        import pyinotify
+        import select
+        from pydgeot.filesystem import inotify
 
-        class Observer(_ObserverBase, pyinotify.ProcessEvent):
+        class Observer(_ObserverBase):
             """
-            File system observer for Linux using inotify.
+            File system observer for Linux using inotify directly, through ctypes. Waits for events with epoll, and
+            registers watches for each directory in the observed tree, adding watches as directories are created or
+            moved in to it.
             """
             observer = 'inotify'
+            mask = inotify.IN_CREATE | \
+                inotify.IN_DELETE | \
+                inotify.IN_MODIFY | \
+                inotify.IN_CLOSE_WRITE | \
+                inotify.IN_MOVED_FROM | \
+                inotify.IN_MOVED_TO | \
+                inotify.IN_ONLYDIR | \
+                inotify.IN_EXCL_UNLINK
+            # Events after which a path will not change further.
+            finished_mask = inotify.IN_CLOSE_WRITE | \
+                inotify.IN_DELETE | \
+                inotify.IN_MOVED_FROM | \
+                inotify.IN_MOVED_TO | \
+                inotify.IN_ISDIR
+            # Events that create, delete or move a path.
+            structural_mask = inotify.IN_CREATE | \
+                inotify.IN_DELETE | \
+                inotify.IN_MOVED_FROM | \
+                inotify.IN_MOVED_TO
+
+            def __init__(self, path):
+                super().__init__(path)
+                self.inotify = None
+                """:type: pydgeot.filesystem.inotify.Inotify | None"""
+                self.watches = {}
+                """:type: dict[int, str]"""
 
             def start(self):
-                mask = pyinotify.IN_CREATE | \
-                    pyinotify.IN_DELETE | \
-                    pyinotify.IN_MODIFY | \
-                    pyinotify.IN_MOVED_FROM | \
-                    pyinotify.IN_MOVED_TO
-                wm = pyinotify.WatchManager()
-                notifier = pyinotify.Notifier(wm, self)
-                wm.add_watch(self.path, mask, rec=True)
-                while True:
-                    notifier.process_events()
-                    if notifier.check_events(self.event_timeout * 1000):
-                        notifier.read_events()
+                with inotify.Inotify() as self.inotify, select.epoll() as epoll:
+                    epoll.register(self.inotify.fileno(), select.EPOLLIN)
+                    self.add_watches(self.path)
+                    while not self.is_stopped:
+                        if len(epoll.poll(self.next_timeout())) > 0:
+                            self.process_events()
+                        self.signal_changed()
+
+            async def observe(self):
+                import asyncio
+
+                loop = asyncio.get_event_loop()
+                timer = None
+
+                def schedule():
+                    nonlocal timer
+                    if timer is not None:
+                        timer.cancel()
+                    timer = loop.call_later(self.next_timeout(), tick) if len(self.changed) > 0 else None
+
+                def tick():
                     self.signal_changed()
+                    schedule()
+
+                def readable():
+                    self.process_events()
+                    schedule()
+
+                with inotify.Inotify() as self.inotify:
+                    self.add_watches(self.path)
+                    loop.add_reader(self.inotify.fileno(), readable)
+                    try:
+                        await loop.create_future()
+                    finally:
+                        loop.remove_reader(self.inotify.fileno())
+                        if timer is not None:
+                            timer.cancel()
+
+            def add_watches(self, path):
+                """
+                Watch a directory and all of its subdirectories.
 
-            def process_default(self, e):
+                :param path: Directory path to watch.
+                :type path: str
                 """
-                Pyinotify catch-all change event.
+                for root, dirs, files in os.walk(path):
+                    try:
+                        self.watches[self.inotify.add_watch(root, self.mask)] = root
+                    except OSError:
+                        # Removed or replaced before it could be watched.
+                        dirs[:] = []
 
-                :param e: Pyinotify change event.
-                :type e: pyinotify.ProcessEvent
+            def remove_watches(self, path):
                 """
-                self.queue_changed(e.pathname)
+                Stop watching a directory and all of its subdirectories.
+
+                :param path: Directory path to stop watching.
+                :type path: str
+                """
+                prefix = path + os.sep
+                for wd, watch_path in list(self.watches.items()):
+                    if watch_path == path or watch_path.startswith(prefix):
+                        self.inotify.rm_watch(wd)
+                        del self.watches[wd]
+
+            def process_events(self):
+                """
+                Read pending inotify events, queuing changes and updating watches.
+                """
+                for event in self.inotify.read_events():
+                    if event.mask & inotify.IN_Q_OVERFLOW:
+                        # Events were dropped, so rescan everything.
+                        self.queue_changed(self.path, finished=True, structural=True)
+                        continue
+                    directory = self.watches.get(event.wd, None)
+                    if directory is None:
+                        continue
+                    if event.mask & inotify.IN_IGNORED:
+                        del self.watches[event.wd]
+                        continue
+
+                    path = os.path.join(directory, event.name) if event.name != '' else directory
+                    if event.mask & inotify.IN_ISDIR:
+                        if event.mask & inotify.IN_MOVED_FROM:
+                            self.remove_watches(path)
+                        elif event.mask & (inotify.IN_CREATE | inotify.IN_MOVED_TO):
+                            self.add_watches(path)
+                    self.queue_changed(path, finished=(event.mask & self.finished_mask) != 0,
+                                       structural=(event.mask & self.structural_mask) != 0)
     except ImportError:
-        pass
+        try:
+            import pyinotify
+
+            class Observer(_ObserverBase, pyinotify.ProcessEvent):
+                """
+                File system observer for Linux using pyinotify.
+                """
+                observer = 'pyinotify'
+
+                # Events after which a path will not change further.
+                finished_mask = pyinotify.IN_CLOSE_WRITE | \
+                    pyinotify.IN_DELETE | \
+                    pyinotify.IN_MOVED_FROM | \
+                    pyinotify.IN_MOVED_TO | \
+                    pyinotify.IN_ISDIR
+                # Events that create, delete or move a path.
+                structural_mask = pyinotify.IN_CREATE | \
+                    pyinotify.IN_DELETE | \
+                    pyinotify.IN_MOVED_FROM | \
+                    pyinotify.IN_MOVED_TO
+
+                def start(self):
+                    mask = pyinotify.IN_CREATE | \
+                        pyinotify.IN_DELETE | \
+                        pyinotify.IN_MODIFY | \
+                        pyinotify.IN_CLOSE_WRITE | \
+                        pyinotify.IN_MOVED_FROM | \
+                        pyinotify.IN_MOVED_TO
+                    wm = pyinotify.WatchManager()
+                    notifier = pyinotify.Notifier(wm, self)
+                    wm.add_watch(self.path, mask, rec=True, auto_add=True)
+                    try:
+                        while not self.is_stopped:
+                            if notifier.check_events(int(self.next_timeout() * 1000)):
+                                notifier.read_events()
+                                notifier.process_events()
+                            self.signal_changed()
+                    finally:
+                        notifier.stop()
+
+                def process_default(self, e):
+                    """
+                    Pyinotify catch-all change event.
+
+                    :param e: Pyinotify change event.
+                    :type e: pyinotify.ProcessEvent
+                    """
+                    self.queue_changed(e.pathname, finished=(e.mask & self.finished_mask) != 0,
+                                       structural=(e.mask & self.structural_mask) != 0)
+        except ImportError:
+            pass
 
 elif sys.platform == 'win32':
     try:
@@ -143,7 +418,7 @@ elif sys.platform == 'win32':
                 buf = win32file.AllocateReadBuffer(8192)
                 overlapped = pywintypes.OVERLAPPED()
                 overlapped.hEvent = win32event.CreateEvent(None, 0, 0, None)
-                while True:
+                while not self.is_stopped:
                     win32file.ReadDirectoryChangesW(
                         handle,
                         buf,
@@ -157,7 +432,8 @@ elif sys.platform == 'win32':
                             paths = win32file.FILE_NOTIFY_INFORMATION(buf, nbytes)
                             for action, path in paths:
                                 path = os.path.abspath(os.path.join(self.path, path))
-                                self.queue_changed(path)
+                                # Anything other than FILE_ACTION_MODIFIED (3) adds, removes or renames the path.
+                                self.queue_changed(path, structural=(action != 3))
                     self.signal_changed()
 
             def is_locked(self, path):
@@ -179,6 +455,7 @@ elif sys.platform == 'darwin':
     try:
         from fsevents import Observer as fseObserver
         from fsevents import Stream as fseStream
+        from fsevents import IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO
 
         class Observer(_ObserverBase):
             """
@@ -188,47 +465,175 @@ elif sys.platform == 'darwin':
 
             def start(self):
                 def process_event(e):
-                    self.queue_changed(e.name)
+                    self.queue_changed(e.name,
+                                       structural=(e.mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO)) != 0)
                 observer = fseObserver()
                 stream = fseStream(process_event, self.path, file_events=True)
                 observer.schedule(stream)
                 observer.start()
-                while True:
-                    time.sleep(self.event_timeout)
-                    self.signal_changed()
+                try:
+                    while not self.wait(self.event_timeout):
+                        self.signal_changed()
+                finally:
+                    observer.unschedule(stream)
+                    observer.stop()
     except ImportError:
         pass
 
-if 'Observer' not in globals():
-    class Observer(_ObserverBase):
-        """
-        Platform independent fallback file system observer.
-        """
-        observer = 'fallback'
-        changed_timeout = 25
-        event_timeout = 10
-
-        def start(self):
-            before = self.get_files_list()
-            while True:
-                time.sleep(self.event_timeout)
-                after = self.get_files_list()
-                added = [f for f in after if f not in before]
-                removed = [f for f in before if f not in after]
-                updated = [f for f in after if f in before and after[f] != before[f]]
-                for path in added + removed + updated:
-                    path = os.path.abspath(os.path.join(self.path, path))
-                    self.queue_changed(path)
-                before = after
-                self.signal_changed()
-
-        def get_files_list(self):
-            """
-            Get a flat list of file paths with modified times.
+_PolledDirectory = namedtuple('_PolledDirectory', ['mtime_ns', 'files', 'mtimes', 'directories'])
+"""
+Named Tuple containing a polled directories modified time in nanoseconds, its file names, an array of the files modified
+times in nanoseconds (in the same order, -1 for unreadable files), and its subdirectory names.
+"""
 
-            :return: Dict of file paths and modified times.
-            :rtype: dict[str, int]
-            """
-            walk = os.walk(self.path)
-            files = [os.path.join(path, filename) for path, dirs, files in walk for filename in files]
-            return dict([(path, os.stat(path).st_mtime) for path in files])
+
+class PollingObserver(_ObserverBase):
+    """
+    Platform independent fallback file system observer. Periodically sweeps the observed tree, keeping a snapshot of
+    each directory. Directories with an unchanged modified time are not listed again, only their files are statted. A
+    sweep may be spread over several polls, each doing no more than io_budget stat or list calls.
+    """
+    observer = 'fallback'
+    changed_timeout = 25
+    event_timeout = 10
+    io_budget = 5000
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.directories = {}
+        """:type: dict[str, pydgeot.observer._PolledDirectory]"""
+        self._sweep = []
+        """:type: list[str]"""
+
+    def start(self):
+        self.poll(budget=0, report=False)
+        while not self.wait(self.event_timeout):
+            self.poll()
+            self.signal_changed()
+
+    def poll(self, budget=None, report=True):
+        """
+        Continue the current sweep of the observed tree, or start a new one if the last has finished, queuing any
+        changes found.
+
+        :param budget: Maximum number of stat or list calls to make, or 0 to finish the sweep. Defaults to io_budget.
+        :type budget: int | None
+        :param report: Queue changes found. Disabled when taking the initial snapshot.
+        :type report: bool
+        :return: If the sweep has finished.
+        :rtype: bool
+        """
+        if budget is None:
+            budget = self.io_budget
+        if len(self._sweep) == 0:
+            self._sweep.append('')
+        spent = 0
+        while len(self._sweep) > 0 and (budget <= 0 or spent < budget):
+            spent += self._poll_directory(self._sweep.pop(), report)
+        return len(self._sweep) == 0
+
+    def _poll_directory(self, rel, report):
+        """
+        Poll a single directory, updating its snapshot and adding its subdirectories to the sweep.
+
+        :param rel: Directory path relative to the observed path.
+        :type rel: str
+        :param report: Queue changes found.
+        :type report: bool
+        :return: Number of stat or list calls made.
+        :rtype: int
+        """
+        from array import array
+        from pydgeot.filesystem import Scanner
+
+        path = os.path.join(self.path, rel) if rel != '' else self.path
+        old = self.directories.get(rel, None)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            # Removed, which the parent directory will notice.
+            self._forget(rel)
+            return 1
+
+        if old is not None and old.mtime_ns == mtime_ns:
+            mtimes = array('q', [self._mtime(os.path.join(path, name)) for name in old.files])
+            if mtimes != old.mtimes:
+                if report:
+                    for name, old_mtime, new_mtime in zip(old.files, old.mtimes, mtimes):
+                        if old_mtime != new_mtime:
+                            self.queue_changed(os.path.join(path, name))
+                self.directories[rel] = old._replace(mtimes=mtimes)
+            self._sweep.extend(self._join(rel, name) for name in old.directories)
+            return 1 + len(old.files)
+
+        files = []
+        mtimes = array('q')
+        directories = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        directories.append(entry.name)
+                        continue
+                    files.append(entry.name)
+                    try:
+                        mtimes.append(entry.stat().st_mtime_ns)
+                    except OSError:
+                        mtimes.append(-1)
+        except OSError:
+            self._forget(rel)
+            return 1
+
+        if report and old is not None:
+            old_mtimes = dict(zip(old.files, old.mtimes))
+            for name, new_mtime in zip(files, mtimes):
+                if old_mtimes.pop(name, None) != new_mtime:
+                    self.queue_changed(os.path.join(path, name))
+            for name in old_mtimes:
+                self.queue_changed(os.path.join(path, name))
+            for name in set(directories) ^ set(old.directories):
+                # Created or removed directories are queued whole, to be rescanned.
+                self.queue_changed(os.path.join(path, name), structural=True)
+        for name in set(old.directories if old is not None else ()) - set(directories):
+            self._forget(self._join(rel, name))
+
+        # Directories changed very recently may change again without moving their modified time, so make sure they are
+        # listed again next sweep.
+        if mtime_ns >= time.time() * 1000 * 1000 * 1000 - Scanner.racy_ns:
+            mtime_ns = -1
+        self.directories[rel] = _PolledDirectory(mtime_ns, tuple(files), mtimes, tuple(directories))
+        self._sweep.extend(self._join(rel, name) for name in directories)
+        return 1 + len(files)
+
+    def _forget(self, rel):
+        """
+        Drop the snapshots for a directory and its subdirectories.
+
+        :param rel: Directory path relative to the observed path.
+        :type rel: str
+        """
+        if rel == '':
+            self.directories.clear()
+            return
+        prefix = rel + os.sep
+        for other in [other for other in self.directories if other == rel or other.startswith(prefix)]:
+            del self.directories[other]
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return -1
+
+    @staticmethod
+    def _join(rel, name):
+        return os.path.join(rel, name) if rel != '' else name
+
+
+if 'Observer' not in globals():
+    Observer = PollingObserver
@@ -26,6 +26,23 @@ class Processor:
     help_msg = ''
     """:type: str"""
 
+    # Whether prepare and generate may be called for multiple paths at once from worker threads. Processors that keep
+    # unsynchronized state between calls should set this to False, and will always be run from a single thread.
+    thread_safe = True
+    """:type: bool"""
+
+    # Version of the content the processor generates. Output cached by the Apps build cache is keyed by it, so it should
+    # be changed whenever the processor generates different content for the same source files.
+    version = None
+    """:type: str | None"""
+
+    # Whether generated targets may be restored from the Apps build cache instead of calling generate. Only processors
+    # that also set a version are cached, so upgrading a processor never restores output from an older version. Should
+    # only be set by processors that set every file they generate as a target, and that depend on nothing other than
+    # their source files, their dependencies, and context vars.
+    cacheable = False
+    """:type: bool"""
+
     def __init__(self, app):
         """
         :param app: Parent App instance.
@@ -1,8 +1,9 @@
 import os
-import shutil
+import time
+import threading
 from pydgeot.processors import register, Processor
 from pydgeot.app.dirconfig import BaseDirConfig
-from pydgeot.filesystem import Glob, create_symlink
+from pydgeot.filesystem import Glob, copy_file, create_symlink
 
 
 @register(name='fallback')
@@ -10,7 +11,27 @@ class FallbackProcessor(Processor):
     """
     Copy or create a symlink for any target file over to the build directory. Only does so if no other Processor will
     process the file.
+
+    Files are copied as they are generated, unless the Apps 'copy_jobs' setting is above 1. Copies are then run on a
+    pool of that many I/O threads, and are waited on when generation completes, with each files target only being set
+    once it has been copied.
     """
+    default_copy_jobs = 1
+
+    def __init__(self, app):
+        """
+        :param app: Parent App instance.
+        :type app: pydgeot.app.App
+        """
+        super().__init__(app)
+        self._copies_lock = threading.Lock()
+        self._executor = None
+        """:type: concurrent.futures.ThreadPoolExecutor | None"""
+        self._copies = []
+        """:type: list[tuple[str, str, concurrent.futures.Future]]"""
+        self._copy_stats = None
+        """:type: list[float] | None"""
+
     def can_process(self, path):
         return self._is_copy_path(path) or self._is_symlink_path(path)
 
@@ -19,15 +40,109 @@ class FallbackProcessor(Processor):
         return False
 
     def generate(self, path):
+        """
+        Copy or symlink a file in to the build directory. If 'copy_jobs' is above 1, the copy is only queued here, and
+        finishes in generation_complete, so build profiles record its time under the generation_complete phase, and
+        the target is only set once the copy has succeeded.
+
+        :param path: Source path.
+        :type path: str
+        """
         rel = os.path.relpath(path, self.app.source_root)
         target = os.path.join(self.app.build_root, rel)
         os.makedirs(os.path.dirname(target), exist_ok=True)
         if self._is_copy_path(path):
-            shutil.copy2(path, target)
+            config = DirConfig.get(self.app, path)
+            if not self._copy(path, target, config.copy_mode, config.skip_unchanged):
+                return
         elif self._is_symlink_path(path):
             create_symlink(path, target)
         self.app.sources.set_targets(path, [target])
 
+    def generation_complete(self):
+        """
+        Wait for any pending copies to finish, setting the targets of those that succeeded, and log the number of files
+        and bytes copied, and the throughput.
+        """
+        from concurrent.futures import as_completed
+
+        with self._copies_lock:
+            executor, copies, stats = self._executor, self._copies, self._copy_stats
+            self._executor, self._copies, self._copy_stats = None, [], None
+        if stats is None:
+            return
+
+        if executor is not None:
+            paths = dict((future, (path, target)) for path, target, future in copies)
+            last_report = time.perf_counter()
+            try:
+                for count, future in enumerate(as_completed(paths), 1):
+                    path, target = paths[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.app.log.exception('[%s] exception.generate "%s" %s', self.name,
+                                               self.app.relative_path(path), str(e))
+                    else:
+                        self.app.sources.set_targets(path, [target])
+                    if time.perf_counter() - last_report >= 5:
+                        last_report = time.perf_counter()
+                        self.app.log.info('[%s] copied %d of %d files', self.name, count, len(paths))
+            finally:
+                executor.shutdown()
+
+        start, copied, skipped, size = stats
+        if copied > 0:
+            duration = max(time.perf_counter() - start, 1e-9)
+            self.app.log.info('[%s] copied %d files (%.1fMB) in %.3fs, %.1fMB/s, skipped %d unchanged files',
+                              self.name, copied, size / 1e6, duration, size / 1e6 / duration, skipped)
+
+    def _copy(self, path, target, mode, skip_unchanged):
+        """
+        Copy a file on the I/O thread pool, or immediately if only one copy job is allowed.
+
+        :type path: str
+        :type target: str
+        :type mode: str
+        :type skip_unchanged: bool
+        :return: True if the file was copied immediately, False if the copy was queued.
+        :rtype: bool
+        """
+        jobs = max(int(self.app.settings.get('copy_jobs', self.default_copy_jobs)), 1)
+        with self._copies_lock:
+            if self._copy_stats is None:
+                # Start time, and numbers of files copied, files skipped, and bytes copied.
+                self._copy_stats = [time.perf_counter(), 0, 0, 0]
+            stats = self._copy_stats
+            if jobs > 1:
+                if self._executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    self._executor = ThreadPoolExecutor(max_workers=jobs)
+                self._copies.append((path, target, self._executor.submit(self._copy_file, path, target, mode,
+                                                                         skip_unchanged, stats)))
+                return False
+        self._copy_file(path, target, mode, skip_unchanged, stats)
+        return True
+
+    def _copy_file(self, path, target, mode, skip_unchanged, stats):
+        """
+        Copy a file, adding it to the given copy stats.
+
+        :type path: str
+        :type target: str
+        :type mode: str
+        :type skip_unchanged: bool
+        :type stats: list[float]
+        """
+        size = os.stat(path).st_size
+        copied = copy_file(path, target, mode, skip_unchanged)
+        with self._copies_lock:
+            if copied:
+                stats[1] += 1
+                stats[3] += size
+            else:
+                stats[2] += 1
+
     def _is_copy_path(self, path):
         config = DirConfig.get(self.app, path)
         rel = os.path.relpath(path, self.app.source_root)
@@ -43,8 +158,11 @@ class DirConfig(BaseDirConfig):
     _config_key = 'fallback'
     _default_config = {
         'copy_paths': ['**'],
-        'symlink_paths': []
+        'symlink_paths': [],
+        'copy_mode': 'copy',
+        'skip_unchanged': False
     }
+    _copy_modes = ('copy', 'reflink', 'hardlink')
 
     def __init__(self, app, path):
         """
@@ -55,6 +173,10 @@ class DirConfig(BaseDirConfig):
         """:type: list[Glob] | None"""
         self.symlink_paths = None
         """:type: list[Glob] | None"""
+        self.copy_mode = None
+        """:type: str | None"""
+        self.skip_unchanged = None
+        """:type: bool | None"""
 
         super().__init__(app, path)
 
@@ -74,3 +196,15 @@ class DirConfig(BaseDirConfig):
                 value = [value]
             value = [Glob(glob) for glob in value]
             setattr(self, name, value)
+
+        for name in ('copy_mode', 'skip_unchanged'):
+            value = config.pop(name, None)
+            if value is None:
+                value = self._default_config.get(name) if parent is None else getattr(parent, name)
+            setattr(self, name, value)
+
+        if self.copy_mode not in self._copy_modes:
+            from pydgeot.app import AppError
+            raise AppError('Could not load config \'{}\', unknown copy_mode \'{}\', expected one of {}'.format(
+                config_path, self.copy_mode, ', '.join('\'{}\''.format(mode) for mode in self._copy_modes)))
+        self.skip_unchanged = bool(self.skip_unchanged)
@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+import contextlib
+
+
+class BuildProfiler:
+    """
+    Records wall and CPU times for the phases of a build, and for each processor call made during it. Processor calls
+    may be recorded from multiple worker threads at once.
+    """
+    def __init__(self, app, top=10):
+        """
+        :param app: Parent App instance.
+        :type app: pydgeot.app.App
+        :param top: Number of slowest files to include in the summary.
+        :type top: int
+        """
+        self.app = app
+        self.top = max(top, 0)
+        self.started = None
+        """:type: float | None"""
+        # Phase names, and their total wall and CPU times, in the order they were first run.
+        self.phases = {}
+        """:type: dict[str, list[float]]"""
+        self.calls = []
+        """:type: list[tuple[str, str, str, float, float]]"""
+        self._lock = threading.Lock()
+        self._start_wall = None
+        self._start_cpu = None
+        self._wall = 0.0
+        self._cpu = 0.0
+
+    def start(self):
+        """
+        Start timing the build.
+        """
+        self.started = time.time()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    def stop(self):
+        """
+        Stop timing the build.
+        """
+        if self._start_wall is not None:
+            self._wall = time.perf_counter() - self._start_wall
+            self._cpu = time.process_time() - self._start_cpu
+            self._start_wall = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Context manager timing a build phase. Times for phases run more than once are added together. CPU time covers
+        all threads in the process, so includes worker threads used by the phase.
+
+        :param name: Name of the phase.
+        :type name: str
+        """
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, [0.0, 0.0])
+            totals[0] += time.perf_counter() - start_wall
+            totals[1] += time.process_time() - start_cpu
+
+    def wrap(self, phase, func):
+        """
+        Wrap an App processor method, recording the time taken by each call.
+
+        :param phase: Name of the processor method, such as 'generate'.
+        :type phase: str
+        :param func: App processor method to wrap, returning a tuple of the processor used and its return value.
+        :type func: callable[str]
+        :return: Wrapped method.
+        :rtype: callable[str]
+        """
+        def timed(path):
+            start_wall = time.perf_counter()
+            start_cpu = time.thread_time()
+            result = func(path)
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            processor = result[0] if isinstance(result, tuple) else None
+            name = None
+            if processor is not None:
+                name = processor.name if processor.name else processor.__class__.__name__
+            with self._lock:
+                self.calls.append((self.app.relative_path(path), name, phase, wall, cpu))
+            return result
+        return timed
+
+    def report(self):
+        """
+        Get the recorded timings as a JSON serializable dictionary.
+
+        :return: Dictionary of build, phase, processor, and file timings.
+        :rtype: dict[str, Any]
+        """
+        processors = {}
+        for path, name, phase, wall, cpu in self.calls:
+            if name is None:
+                continue
+            entry = processors.setdefault(name, {}).setdefault(phase, {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+            entry['count'] += 1
+            entry['wall'] += wall
+            entry['cpu'] += cpu
+
+        return {
+            'started': self.started,
+            'wall': self._wall,
+            'cpu': self._cpu,
+            'phases': [{'name': name, 'wall': wall, 'cpu': cpu} for name, (wall, cpu) in self.phases.items()],
+            'processors': processors,
+            'files': [{'path': path, 'processor': name, 'phase': phase, 'wall': wall, 'cpu': cpu}
+                      for path, name, phase, wall, cpu in sorted(self.calls, key=lambda call: -call[3])]
+        }
+
+    def slowest(self):
+        """
+        Get the slowest files, by the total wall time of all processor calls made for them.
+
+        :return: List of tuples of relative file path and wall time, slowest first.
+        :rtype: list[tuple[str, float]]
+        """
+        totals = {}
+        for path, name, phase, wall, cpu in self.calls:
+            totals[path] = totals.get(path, 0.0) + wall
+        return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:self.top]
+
+    def save(self, path=None):
+        """
+        Write the report as JSON.
+
+        :param path: File path to write to. If None, profile.json in the Apps log directory is used.
+        :type path: str | None
+        :return: Path the report was written to.
+        :rtype: str
+        """
+        import json
+
+        if path is None:
+            path = os.path.join(self.app.log_root, 'profile.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            json.dump(self.report(), fh, indent=2)
+        return path
+
+    def log_summary(self):
+        """
+        Log phase timings and the slowest files to the Apps log.
+        """
+        self.app.log.info('Build profile: %.3fs wall, %.3fs cpu', self._wall, self._cpu)
+        for name, (wall, cpu) in self.phases.items():
+            self.app.log.info('  %-20s %8.3fs wall %8.3fs cpu', name, wall, cpu)
+        slowest = self.slowest()
+        if len(slowest) > 0:
+            self.app.log.info('Slowest %d files:', len(slowest))
+            for path, wall in slowest:
+                self.app.log.info('  %8.3fs "%s"', wall, path)
@@ -0,0 +1,100 @@
+import asyncio
+
+
+class Watcher:
+    """
+    asyncio based watch engine. Changes signaled by an Observer are collected on the event loop, and built by a
+    Generator in a worker thread, so the observer keeps taking in and debouncing events while a build runs. Changes
+    signaled during a build are coalesced and built together once it finishes.
+
+    Other coroutines, such as a development server, may be run alongside the watcher on the same event loop, and
+    consumers may be added to be notified after each build.
+    """
+    def __init__(self, generator, observer):
+        """
+        :param generator: Generator to build changes with.
+        :type generator: pydgeot.generator.Generator
+        :param observer: Observer to take changes from.
+        :type observer: pydgeot.observer.Observer
+        """
+        self.generator = generator
+        self.observer = observer
+        self.consumers = set()
+        """:type: set[callable[pydgeot.generator.ChangeSet]]"""
+        self.pending = set()
+        """:type: set[str]"""
+        self._wake = None
+        """:type: asyncio.Event | None"""
+
+    async def run(self, *coroutines):
+        """
+        Observe and build changes until cancelled, or until the observer, a build, or any of the given coroutines fail.
+
+        :param coroutines: Additional coroutines to run alongside the watcher.
+        :type coroutines: collections.Awaitable
+        """
+        self._wake = asyncio.Event()
+        self.observer.on_changed_handlers.add(self.queue)
+
+        tasks = [asyncio.ensure_future(self.observer.observe()), asyncio.ensure_future(self._build_loop())]
+        tasks.extend(asyncio.ensure_future(coroutine) for coroutine in coroutines)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.observer.on_changed_handlers.discard(self.queue)
+
+    def queue(self, paths):
+        """
+        Queue changed paths to be built. Should be called on the event loop.
+
+        :param paths: File or directory paths that have changed.
+        :type paths: set[str]
+        """
+        self.pending |= paths
+        self._wake.set()
+
+    async def _build_loop(self):
+        """
+        Build queued changes in a worker thread, one build at a time, notifying consumers after each. Builds that
+        fail are logged, and do not stop the loop. When cancelled, waits for any running build to finish, so the App is
+        never closed while it is still being built.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        loop = asyncio.get_event_loop()
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            while True:
+                await self._wake.wait()
+                self._wake.clear()
+                paths, self.pending = self.pending, set()
+                try:
+                    changes = await loop.run_in_executor(executor, self._build, paths)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # Such as a config file saved part way through editing. Keep watching, so the next change rebuilds.
+                    self.generator.app.log.exception('Unable to build changes')
+                    continue
+                for consumer in list(self.consumers):
+                    result = consumer(changes)
+                    if asyncio.iscoroutine(result):
+                        await result
+        finally:
+            executor.shutdown(wait=True)
+
+    def _build(self, paths):
+        """
+        Collect and build changes for a set of paths.
+
+        :param paths: File or directory paths that have changed.
+        :type paths: set[str]
+        :return: ChangeSet that was built.
+        :rtype: pydgeot.generator.ChangeSet
+        """
+        changes = self.generator.collect_path_changes(paths)
+        self.generator.process_changes(changes)
+        return changes
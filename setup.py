@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 import sys
 import setuptools
-from distutils.core import setup
+from setuptools import setup
 
-if sys.version_info < (3, 3):
-    print('Sorry, Pydgeot requires Python 3.3+')
+if sys.version_info < (3, 7):
+    print('Sorry, Pydgeot requires Python 3.7+')
     exit(1)
 
 base_package = 'pydgeot'
@@ -24,11 +24,14 @@ setup(
     packages=packages,
     scripts=['scripts/pydgeot'],
     requires=['docopt'],
+    python_requires='>=3.7',
     classifiers=[
         'Intended Audience :: Developers',
         'License :: OSI Approved :: Apache Software License',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ]
 )
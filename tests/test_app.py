@@ -33,3 +33,118 @@ def test_relative_path(temp_app):
     assert temp_app.relative_path(source) == expected
     assert temp_app.relative_path(target) == expected
 
+
+
+def test_processor_cache(temp_app, monkeypatch):
+    import json
+    from pydgeot.app import App
+    from pydgeot.processors.builtins.fallback import FallbackProcessor
+
+    calls = []
+    can_process = FallbackProcessor.can_process
+    monkeypatch.setattr(FallbackProcessor, 'can_process', lambda self, path: calls.append(path) or
+                        can_process(self, path))
+
+    config_path = os.path.join(temp_app.source_root, '.pydgeot.conf')
+    with open(config_path, 'w') as fh:
+        json.dump({'processors': ['fallback']}, fh)
+    os.utime(config_path, (1000, 1000))
+    path = temp_app.source_path('test')
+    temp_app.sources.add_source(path)
+
+    processor = temp_app.processors['fallback']
+    assert temp_app.get_processor(path) is processor
+    assert temp_app.get_processor(path) is processor
+    assert len(calls) == 1
+
+    temp_app.save_processors()
+    temp_app.db_connection.commit()
+    app = App(temp_app.root)
+    assert app.get_processor(path) is app.processors['fallback']
+    assert len(calls) == 1
+
+    # Changing the config resolves the processor again.
+    with open(config_path, 'w') as fh:
+        json.dump({'processors': []}, fh)
+    app.config_cache.refresh()
+    assert app.get_processor(path) is None
+    assert len(calls) == 1
+
+
+def test_database_profile(temp_app):
+    import json
+    import pytest
+    from pydgeot.app import App, AppError
+
+    def pragma(app, name):
+        return app.db_connection.execute('PRAGMA {}'.format(name)).fetchone()[0]
+
+    assert temp_app.db_profile == 'default'
+
+    config_path = os.path.join(temp_app.root, 'pydgeot.conf')
+    with open(config_path, 'w') as fh:
+        json.dump({'database': {'profile': 'fast', 'cache_size': -1024}}, fh)
+    app = App(temp_app.root)
+    assert app.db_profile == 'fast'
+    assert pragma(app, 'journal_mode') == 'wal'
+    assert pragma(app, 'synchronous') == 1
+    assert pragma(app, 'cache_size') == -1024
+    assert pragma(app, 'busy_timeout') == 5000
+
+    # Resetting removes the write ahead log along with the database, so its changes are not replayed.
+    app.sources.add_source(app.source_path('test'))
+    app.db_connection.commit()
+    app.reset()
+    assert app.sources.get_source(app.source_path('test')) is None
+
+    for settings in ({'profile': 'unknown'}, {'page_size': 4096}, {'synchronous': 'SOMETIMES'},
+                     {'cache_size': '1; DROP TABLE sources'}):
+        with open(config_path, 'w') as fh:
+            json.dump({'database': settings}, fh)
+        with pytest.raises(AppError):
+            App(temp_app.root)
+
+
+def test_database_in_memory(temp_app):
+    import json
+    import sqlite3
+    from pydgeot.app import App
+
+    def disk_sources():
+        connection = sqlite3.connect(temp_app.db_path)
+        try:
+            return [row[0] for row in connection.execute('SELECT path FROM sources')]
+        finally:
+            connection.close()
+
+    with open(os.path.join(temp_app.root, 'pydgeot.conf'), 'w') as fh:
+        json.dump({'database': {'in_memory': True, 'profile': 'ephemeral'}}, fh)
+    temp_app.sources.add_source(temp_app.source_path('first'))
+    temp_app.close()
+
+    app = App(temp_app.root)
+    assert app.db_in_memory
+    assert app.sources.get_source(app.source_path('first')) is not None
+
+    # Changes are only written to the store on commit, at most once every save interval.
+    app.sources.add_source(app.source_path('second'))
+    assert disk_sources() == ['first']
+    app.commit()
+    assert disk_sources() == ['first']
+    app.db_save_interval = 0
+    app.commit()
+    assert sorted(disk_sources()) == ['first', 'second']
+
+    # Closing always writes any changes.
+    app.db_save_interval = 60
+    app.sources.add_source(app.source_path('third'))
+    app.commit()
+    assert sorted(disk_sources()) == ['first', 'second']
+    app.close()
+    assert sorted(disk_sources()) == ['first', 'second', 'third']
+
+    app = App(temp_app.root)
+    assert app.sources.get_source(app.source_path('third')) is not None
+    app.reset()
+    app.close()
+    assert disk_sources() == []
@@ -0,0 +1,33 @@
+import os
+
+
+def test_synthetic_app(temp_dir):
+    from benchmarks import SyntheticSpec, create_app, synthetic_processor
+    from pydgeot import processors
+    from pydgeot.generator import Generator
+
+    with synthetic_processor():
+        app = create_app(os.path.join(temp_dir, 'app'), SyntheticSpec(files=50, depth=2, context_globs=1.0))
+    # The processor is only registered while creating apps.
+    assert 'synthetic' not in processors.available
+    Generator(app).generate()
+
+    sources = app.sources.get_sources()
+    assert len(sources) == 50
+    assert any(len(app.sources.get_dependencies(source.path)) > 0 for source in sources)
+    assert any(len(app.contexts.get_dependencies(source.path)) > 0 for source in sources)
+    assert os.path.isfile(os.path.join(app.build_root, 'dir0', 'dir0', 'file0.txt'))
+    app.close()
+
+
+def test_run_benchmarks(temp_dir):
+    from benchmarks import run_benchmarks, compare
+
+    results = run_benchmarks(temp_dir, [20], samples=5)
+
+    assert set(results['20']) == {'collect_changes', 'process_changes', 'collect_changes_noop',
+                                  'process_changes_incremental', 'sources_get_dependencies',
+                                  'contexts_get_dependencies', 'clean'}
+    baseline = {'20': dict((name, value / 2) for name, value in results['20'].items())}
+    assert all(regressed for size, name, base, value, regressed in compare(results, baseline))
+    assert not any(regressed for size, name, base, value, regressed in compare(results, {}))
@@ -0,0 +1,261 @@
+import os
+import json
+import pytest
+from pydgeot.processors import register, Processor
+
+
+class UpperProcessor(Processor):
+    """
+    Generates upper cased copies of text files, counting the files it generates. Lines starting with '#depends' name a
+    source file whose content is appended, lines starting with '#set' set a context var, and lines starting with
+    '#uses' name a context var whose values are appended.
+    """
+    version = '1'
+    cacheable = True
+    generated = []
+
+    def can_process(self, path):
+        return path.endswith('.txt')
+
+    def prepare(self, path):
+        self.app.sources.set_targets(path, [self.app.target_path(path)])
+        contexts = [('title', os.path.basename(path))]
+        dependencies = []
+        uses = []
+        for directive, args in self._directives(path):
+            if directive == '#depends':
+                dependencies.append(self.app.source_path(args[0]))
+            elif directive == '#set':
+                contexts.append((args[0], args[1]))
+            elif directive == '#uses':
+                uses.append((args[0], None, None))
+        self.app.contexts.set_contexts(path, contexts)
+        self.app.sources.set_dependencies(path, dependencies)
+        self.app.contexts.set_dependencies(path, uses)
+
+    def generate(self, path):
+        self.generated.append(self.app.relative_path(path))
+        content = []
+        for directive, args in self._directives(path):
+            if directive is None:
+                content.append(args)
+            elif directive == '#depends':
+                with open(self.app.source_path(args[0])) as fh:
+                    content.append(fh.read())
+            elif directive == '#uses':
+                content.extend(sorted(str(result.value) for result in self.app.contexts.get_contexts(name=args[0])))
+        target = self.app.target_path(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w') as fh:
+            fh.write('\n'.join(content).upper())
+
+    @staticmethod
+    def _directives(path):
+        with open(path) as fh:
+            for line in fh.read().splitlines():
+                if line.startswith('#'):
+                    parts = line.split()
+                    yield parts[0], parts[1:]
+                else:
+                    yield None, line
+
+
+@pytest.fixture
+def cache_root(temp_dir):
+    from pydgeot import processors
+    from pydgeot.app import App
+
+    register(name='test_upper')(UpperProcessor)
+    UpperProcessor.generated = []
+    root = os.path.join(temp_dir, 'app')
+    App.create(root).close()
+    with open(os.path.join(root, 'pydgeot.conf'), 'w') as fh:
+        json.dump({'processors': ['test_upper'], 'build_cache': True}, fh)
+    yield root
+    processors.available.pop('test_upper', None)
+
+
+def _build(root):
+    from pydgeot.app import App
+    from pydgeot.generator import Generator
+
+    app = App(root)
+    Generator(app).generate()
+    app.close()
+    return app
+
+
+def _write(root, rel, content, mtime):
+    path = os.path.join(root, 'source', rel)
+    with open(path, 'w') as fh:
+        fh.write(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _read(root, rel):
+    with open(os.path.join(root, 'build', rel)) as fh:
+        return fh.read()
+
+
+def test_build_cache(cache_root):
+    from pydgeot.app import App
+
+    path = _write(cache_root, 'index.txt', 'first', 10)
+    target = os.path.join(cache_root, 'build', 'index.txt')
+
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt']
+
+    # Rebuilding from scratch restores the target from the cache.
+    app = App(cache_root)
+    app.reset()
+    app.close()
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt']
+    assert _read(cache_root, 'index.txt') == 'FIRST'
+    app = App(cache_root)
+    assert set(result.path for result in app.sources.get_targets(path)) == {target}
+    assert app.contexts.get_context('title', source=path).value == 'index.txt'
+    app.close()
+
+    # Changed content is generated, and changing it back is restored from the cache.
+    _write(cache_root, 'index.txt', 'second', 0)
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt', 'index.txt']
+    _write(cache_root, 'index.txt', 'first', 10)
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt', 'index.txt']
+    assert _read(cache_root, 'index.txt') == 'FIRST'
+
+
+def test_build_cache_dependency(cache_root):
+    _write(cache_root, 'index.txt', 'index\n#depends part.html', 10)
+    _write(cache_root, 'part.html', 'first', 10)
+
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt']
+    assert _read(cache_root, 'index.txt') == 'INDEX\nFIRST'
+
+    # A changed dependency is never restored from the cache entry of its previous content.
+    _write(cache_root, 'part.html', 'second', 20)
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt', 'index.txt']
+    assert _read(cache_root, 'index.txt') == 'INDEX\nSECOND'
+
+    _write(cache_root, 'part.html', 'first', 30)
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt', 'index.txt']
+    assert _read(cache_root, 'index.txt') == 'INDEX\nFIRST'
+
+
+def test_build_cache_context(cache_root):
+    _write(cache_root, 'index.txt', 'index\n#uses tag', 10)
+    _write(cache_root, 'tags.txt', 'tags\n#set tag first', 10)
+
+    _build(cache_root)
+    assert sorted(UpperProcessor.generated) == ['index.txt', 'tags.txt']
+    assert _read(cache_root, 'index.txt') == 'INDEX\nFIRST'
+
+    # A changed context var value is never restored from the cache entry of its previous value.
+    UpperProcessor.generated = []
+    _write(cache_root, 'tags.txt', 'tags\n#set tag second', 20)
+    _build(cache_root)
+    assert sorted(UpperProcessor.generated) == ['index.txt', 'tags.txt']
+    assert _read(cache_root, 'index.txt') == 'INDEX\nSECOND'
+
+    UpperProcessor.generated = []
+    _write(cache_root, 'tags.txt', 'tags\n#set tag first', 30)
+    _build(cache_root)
+    assert UpperProcessor.generated == []
+    assert _read(cache_root, 'index.txt') == 'INDEX\nFIRST'
+
+
+@pytest.mark.parametrize('version, cacheable', [(None, True), ('1', False)])
+def test_build_cache_opt_in(cache_root, monkeypatch, version, cacheable):
+    from pydgeot.app import App
+
+    monkeypatch.setattr(UpperProcessor, 'version', version)
+    monkeypatch.setattr(UpperProcessor, 'cacheable', cacheable)
+    _write(cache_root, 'index.txt', 'first', 10)
+
+    _build(cache_root)
+    app = App(cache_root)
+    app.reset()
+    app.close()
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt', 'index.txt']
+    assert not os.path.exists(os.path.join(cache_root, 'store', 'cache'))
+
+
+def test_build_cache_entries(cache_root):
+    from pydgeot.app import App
+
+    _write(cache_root, 'index.txt', 'first', 10)
+    _build(cache_root)
+
+    # Entries are plain JSON data.
+    app = App(cache_root)
+    entry_paths = list(app.build_cache._files(os.path.join(app.build_cache.root, 'entries')))
+    app.close()
+    assert len(entry_paths) == 1
+    with open(entry_paths[0]) as fh:
+        entry = json.load(fh)
+    assert entry['source'] == 'index.txt'
+    assert entry['contexts'] == [['title', 'index.txt']]
+
+    # Unreadable entries are generated again, rather than restored.
+    with open(entry_paths[0], 'w') as fh:
+        fh.write('not json')
+    app = App(cache_root)
+    app.reset()
+    app.close()
+    _build(cache_root)
+    assert UpperProcessor.generated == ['index.txt', 'index.txt']
+    assert _read(cache_root, 'index.txt') == 'FIRST'
+
+
+def test_build_cache_prune(cache_root):
+    from pydgeot.app import App
+
+    def cached():
+        app = App(cache_root)
+        try:
+            entries = [app.build_cache._read_entry(path)['source']
+                       for path in app.build_cache._files(os.path.join(app.build_cache.root, 'entries'))]
+            objects = list(app.build_cache._files(os.path.join(app.build_cache.root, 'objects')))
+            return sorted(entries), len(objects)
+        finally:
+            app.close()
+
+    _write(cache_root, 'first.txt', 'first', 10)
+    _write(cache_root, 'second.txt', 'second', 10)
+    _build(cache_root)
+    assert cached() == (['first.txt', 'second.txt'], 2)
+
+    # Entries for deleted sources are pruned, along with their cached targets.
+    os.unlink(os.path.join(cache_root, 'source', 'second.txt'))
+    _build(cache_root)
+    assert cached() == (['first.txt'], 1)
+
+    # Entries unused for longer than max_age are pruned.
+    app = App(cache_root)
+    app.build_cache.max_age = 60
+    for path in app.build_cache._files(os.path.join(app.build_cache.root, 'entries')):
+        os.utime(path, (0, 0))
+    assert app.build_cache.prune() == (1, len('FIRST'))
+    app.close()
+    assert cached() == ([], 0)
+
+    # The least recently used entries are pruned once cached targets are larger than max_size.
+    _write(cache_root, 'first.txt', 'first changed', 20)
+    _write(cache_root, 'third.txt', 'third', 10)
+    _build(cache_root)
+    app = App(cache_root)
+    for path in app.build_cache._files(os.path.join(app.build_cache.root, 'entries')):
+        if app.build_cache._read_entry(path)['source'] == 'third.txt':
+            os.utime(path, (1000, 1000))
+    app.build_cache.max_size = len('FIRST CHANGED')
+    assert app.build_cache.prune() == (1, len('THIRD'))
+    app.close()
+    assert cached() == (['first.txt'], 1)
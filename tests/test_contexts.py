@@ -376,3 +376,109 @@ def test_dependency_get_reverse_recursive(temp_app):
     results = temp_app.contexts.get_dependencies('source01', reverse=True, recursive=True)
 
     assert results == expected
+
+
+def test_dependency_get_reverse_removed(temp_app):
+    expected = {
+        _context_result(temp_app, 'source03', 'test', None)
+    }
+
+    temp_app.contexts.add_context('source01', 'test', 0)
+    temp_app.contexts.add_context('source02', 'test', 1)
+    temp_app.contexts.add_dependency('source03', 'test')
+
+    results = temp_app.contexts.get_dependencies('source01', reverse=True)
+
+    assert results == expected
+
+    temp_app.contexts.remove_context(source='source01')
+
+    results = temp_app.contexts.get_dependencies('source01', reverse=True)
+
+    assert results == set()
+
+    temp_app.sources.remove_source('source03')
+
+    results = temp_app.contexts.get_dependencies('source02', reverse=True)
+
+    assert results == set()
+
+
+def test_dependency_reload(temp_app):
+    from pydgeot.app.contexts import Contexts
+
+    temp_app.contexts.add_context('source01', 'test', 'test_01')
+    temp_app.contexts.add_context('source02', 'test', 'other')
+    temp_app.contexts.add_dependency('source03', 'test', value='test_*')
+
+    expected = {
+        _context_result(temp_app, 'source01', 'test', 'test_01')
+    }
+
+    assert temp_app.contexts.get_dependencies('source03') == expected
+    assert Contexts(temp_app).get_dependencies('source03') == expected
+
+
+def test_dependency_tree(temp_app):
+    expected = {temp_app.source_path('source02'), temp_app.source_path('source03')}
+
+    temp_app.contexts.add_context('source01', 'test01', 0)
+    temp_app.contexts.add_context('source02', 'test02', 0)
+    temp_app.contexts.add_dependency('source02', 'test01')
+    temp_app.contexts.add_dependency('source03', 'test02')
+
+    results = temp_app.contexts.get_dependency_tree(['source01'], reverse=True)
+
+    assert results == expected
+
+
+def test_get_value_globbed_like(temp_app):
+    expected = {
+        _context_result(temp_app, 'source01', 'test', 'Test_01'),
+        _context_result(temp_app, 'source03', 'test', 'test_03\nmore')
+    }
+
+    temp_app.contexts.add_context('source01', 'test', 'Test_01')
+    temp_app.contexts.add_context('source02', 'test', 'test_02/sub')
+    temp_app.contexts.add_context('source03', 'test', 'test_03\nmore')
+    temp_app.contexts.add_context('source04', 'test', 'test-04')
+
+    results = temp_app.contexts.get_contexts(value='test_*')
+
+    assert results == expected
+
+
+def test_set_many(temp_app):
+    from pydgeot.app.contexts import Contexts
+
+    expected = {
+        _context_result(temp_app, 'source', 'test01', 0),
+        _context_result(temp_app, 'source', 'test02', 1),
+        _context_result(temp_app, 'source', 'test02', 2),
+        _context_result(temp_app, 'source', 'other', 0)
+    }
+
+    temp_app.contexts.add_contexts('source', {'test01': 0, 'test02': 0, 'other': 0})
+    kept_ids = set(temp_app.db_cursor.execute("SELECT id FROM context_vars WHERE name = 'test01'"))
+    temp_app.contexts.set_contexts('source', [('test01', 0), ('test02', 1), ('test02', 2)])
+
+    assert temp_app.contexts.get_contexts(source='source') == expected
+    assert Contexts(temp_app).get_contexts(source='source') == expected
+    assert set(temp_app.db_cursor.execute("SELECT id FROM context_vars WHERE name = 'test01'")) == kept_ids
+
+
+def test_dependency_set(temp_app):
+    from pydgeot.app.contexts import Contexts
+
+    temp_app.contexts.add_context('source01', 'test', 'test_01')
+    temp_app.contexts.add_context('source02', 'other', 'other_01')
+    temp_app.contexts.add_dependencies('source03', [('test', 'test_*', None), ('other', None, 'source02')])
+    temp_app.contexts.set_dependencies('source03', [('other', None, 'source02')])
+
+    expected = {
+        _context_result(temp_app, 'source02', 'other', 'other_01')
+    }
+
+    assert temp_app.contexts.get_dependencies('source03') == expected
+    assert Contexts(temp_app).get_dependencies('source03') == expected
+    assert temp_app.contexts.get_dependencies('source01', reverse=True) == set()
@@ -0,0 +1,74 @@
+import threading
+
+
+def test_writer_thread():
+    from pydgeot.app.database import DatabaseWriter
+
+    writer = DatabaseWriter()
+
+    assert not writer.is_running
+    assert writer.call(threading.current_thread) is threading.current_thread()
+
+    with writer:
+        assert writer.is_running
+        assert writer.call(threading.current_thread) is not threading.current_thread()
+
+    assert not writer.is_running
+
+
+def test_writer_exception():
+    import pytest
+    from pydgeot.app.database import DatabaseWriter
+
+    def fail():
+        raise ValueError('fail')
+
+    with DatabaseWriter() as writer:
+        with pytest.raises(ValueError):
+            writer.call(fail)
+
+
+def test_concurrent_writes(temp_app):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with temp_app.db_writer, ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(temp_app.contexts.set_context, 'source{:02}'.format(i), 'test', i)
+                   for i in range(32)]
+        for future in futures:
+            future.result()
+
+    assert len(temp_app.contexts.get_contexts(name='test')) == 32
+
+
+def test_writer_stopping():
+    import time
+    from pydgeot.app.database import DatabaseWriter
+
+    writer = DatabaseWriter()
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    writer.__enter__()
+    busy = threading.Thread(target=writer.call, args=(slow,), daemon=True)
+    busy.start()
+    started.wait(5)
+    stopping = threading.Thread(target=writer.__exit__, args=(None, None, None), daemon=True)
+    stopping.start()
+    time.sleep(0.05)
+
+    # A call made while the writer is stopping is run once it has stopped, rather than queued behind the stop.
+    late = threading.Thread(target=lambda: results.append(writer.call(threading.current_thread)), daemon=True)
+    late.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in (busy, stopping, late):
+        thread.join(5)
+
+    assert not late.is_alive()
+    assert results == [late]
+    assert not writer.is_running
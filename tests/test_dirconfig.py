@@ -1,4 +1,5 @@
 import os
+import json
 
 
 def test_base(temp_app, resources):
@@ -30,3 +31,114 @@ def test_overriding(temp_app, resources):
     assert len(config.processors) == 1
     assert isinstance(config.processors[0], SymlinkFallbackProcessor)
     assert config.extra == {'testing01': 0, 'testing02': 2, 'extra': {'test': True, 'ok': 'alright'}}
+
+
+def _write_config(path, config, mtime=None):
+    with open(path, 'w') as fh:
+        json.dump(config, fh)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_cache_refresh(temp_app):
+    from pydgeot.app.dirconfig import DirConfig
+
+    config_path = os.path.join(temp_app.source_root, '.pydgeot.conf')
+    sub_path = os.path.join(temp_app.source_root, 'sub')
+    os.makedirs(sub_path)
+    _write_config(config_path, {'value': 1}, mtime=1000)
+
+    config = DirConfig.get(temp_app, temp_app.source_root)
+    sub_config = DirConfig.get(temp_app, sub_path)
+    assert config.extra == {'value': 1}
+    assert sub_config.extra == {'value': 1}
+
+    temp_app.config_cache.refresh()
+    assert DirConfig.get(temp_app, temp_app.source_root) is config
+
+    _write_config(config_path, {'value': 2}, mtime=2000)
+    assert DirConfig.get(temp_app, sub_path) is sub_config
+    temp_app.config_cache.refresh()
+    assert DirConfig.get(temp_app, temp_app.source_root).extra == {'value': 2}
+    assert DirConfig.get(temp_app, sub_path).extra == {'value': 2}
+
+
+def test_cache_bounded(temp_app):
+    from pydgeot.app.dirconfig import DirConfig
+
+    temp_app.config_cache.max_size = 2
+    for name in ('sub01', 'sub02', 'sub03'):
+        DirConfig.get(temp_app, os.path.join(temp_app.source_root, name))
+
+    assert len(temp_app.config_cache) == 2
+
+    # File paths resolve to their directories entries, without taking up entries of their own.
+    sub_path = os.path.join(temp_app.source_root, 'sub03')
+    os.makedirs(sub_path)
+    paths = [os.path.join(sub_path, 'file{:02}'.format(index)) for index in range(5)]
+    for path in paths:
+        open(path, 'w').close()
+    config = DirConfig.get(temp_app, sub_path)
+    assert all(DirConfig.get(temp_app, path) is config for path in paths)
+    assert len(temp_app.config_cache) == 2
+    assert DirConfig.get(temp_app, sub_path) is config
+
+    # Known files are bounded separately, by the same size.
+    temp_app.config_cache.add_files(paths)
+    assert len(temp_app.config_cache._files) == 2
+
+
+def test_cache_file_replaced(temp_app):
+    from pydgeot.app.dirconfig import DirConfig
+
+    path = os.path.join(temp_app.source_root, 'x')
+    open(path, 'w').close()
+    assert DirConfig.get(temp_app, path).ignore == set()
+
+    # A known file replaced by a directory with its own config resolves to the directories config after refresh.
+    os.unlink(path)
+    os.makedirs(path)
+    _write_config(os.path.join(path, '.pydgeot.conf'), {'ignore': ['*.tmp']})
+    temp_app.config_cache.refresh()
+    assert [glob.value for glob in DirConfig.get(temp_app, path).ignore] == ['x/*.tmp']
+
+
+def test_cache_snapshot(temp_app):
+    from pydgeot.app import App
+    from pydgeot.app.dirconfig import DirConfig
+
+    _write_config(os.path.join(temp_app.source_root, '.pydgeot.conf'), {'processors': ['fallback'], 'value': 1},
+                  mtime=1000)
+    DirConfig.get(temp_app, temp_app.source_root)
+    temp_app.config_cache.save()
+
+    # Snapshots are plain JSON data, parsed again when loaded rather than read from the config files.
+    with open(os.path.join(temp_app.store_root, temp_app.config_cache.snapshot_name)) as fh:
+        assert {'processors': ['fallback'], 'value': 1} in [entry['config'] for entry in json.load(fh)['configs']]
+    _write_config(os.path.join(temp_app.source_root, '.pydgeot.conf'), {'processors': ['fallback'], 'value': 2},
+                  mtime=1000)
+
+    app = App(temp_app.root)
+    assert len(app.config_cache) == 2
+    config = DirConfig.get(app, app.source_root)
+    assert config.extra == {'value': 1}
+    assert config.processors == {app.processors['fallback']}
+    assert config.config_files == DirConfig.get(temp_app, temp_app.source_root).config_files
+
+
+def test_cache_snapshot_classes(temp_app, monkeypatch):
+    from pydgeot.app import App
+    from pydgeot.app.dirconfig import BaseDirConfig, DirConfig
+    from pydgeot.processors.builtins.fallback import FallbackProcessor
+
+    DirConfig.get(temp_app, temp_app.source_root)
+    temp_app.config_cache.save()
+    assert len(App(temp_app.root).config_cache) == 2
+
+    # Snapshots saved with other processor versions or DirConfig classes are not loaded.
+    monkeypatch.setattr(FallbackProcessor, 'version', '2')
+    assert len(App(temp_app.root).config_cache) == 0
+    monkeypatch.undo()
+
+    monkeypatch.setattr(BaseDirConfig, 'classes', BaseDirConfig.classes + [type('OtherDirConfig', (), {})])
+    assert len(App(temp_app.root).config_cache) == 0
@@ -1,5 +1,6 @@
 import os
 import sys
+import pytest
 
 
 def test_is_dotfile(temp_dir):
@@ -50,3 +51,148 @@ def test_create_symlink(temp_dir):
 
         if sys.platform != 'win32':
             assert os.path.islink(sym_path)
+
+
+@pytest.mark.parametrize('mode', ['copy', 'reflink', 'hardlink'])
+def test_copy_file(temp_dir, mode):
+    from pydgeot.filesystem import copy_file
+
+    source = os.path.join(temp_dir, 'source')
+    target = os.path.join(temp_dir, 'target')
+    with open(source, 'w') as fh:
+        fh.write('source')
+    os.utime(source, ns=(1000000000, 1000000000))
+
+    assert copy_file(source, target, mode)
+    with open(target) as fh:
+        assert fh.read() == 'source'
+    assert os.stat(target).st_mtime_ns == 1000000000
+    assert not copy_file(source, target, mode, skip_unchanged=True)
+    assert copy_file(source, target, mode)
+
+    # A target linked to the source is replaced, never written through.
+    os.unlink(target)
+    os.link(source, target)
+    assert copy_file(source, target, 'copy', skip_unchanged=True)
+    assert not os.path.samefile(source, target)
+
+    with pytest.raises(ValueError):
+        copy_file(source, target, 'unknown')
+
+    os.unlink(target)
+    os.makedirs(target)
+    with pytest.raises(IsADirectoryError):
+        copy_file(source, target, mode)
+
+
+def test_copy_file_hardlink_fallback(temp_dir, monkeypatch):
+    from pydgeot.filesystem import copy_file
+
+    source = os.path.join(temp_dir, 'source')
+    target = os.path.join(temp_dir, 'target')
+    with open(source, 'w') as fh:
+        fh.write('source')
+
+    def link(src, dst):
+        raise OSError('Invalid cross-device link')
+
+    # A target copied because it could not be linked is unchanged while the source is.
+    monkeypatch.setattr(os, 'link', link)
+    assert copy_file(source, target, 'hardlink', skip_unchanged=True)
+    assert not os.path.samefile(source, target)
+    assert not copy_file(source, target, 'hardlink', skip_unchanged=True)
+    os.utime(source, ns=(1000000000, 1000000000))
+    assert copy_file(source, target, 'hardlink', skip_unchanged=True)
+
+
+@pytest.mark.parametrize('kernel_copy', ['copy_file_range', 'sendfile', None])
+def test_copy_content(temp_dir, monkeypatch, kernel_copy):
+    from pydgeot.filesystem import copy_content
+
+    for name in ('copy_file_range', 'sendfile'):
+        if name != kernel_copy:
+            monkeypatch.delattr(os, name, raising=False)
+    if kernel_copy is not None and not hasattr(os, kernel_copy):
+        pytest.skip('os.{} is not available'.format(kernel_copy))
+
+    source = os.path.join(temp_dir, 'source')
+    target = os.path.join(temp_dir, 'target')
+    content = os.urandom(1024 * 1024 + 7)
+    with open(source, 'wb') as fh:
+        fh.write(content)
+    with open(target, 'wb') as fh:
+        fh.write(b'old content, longer than nothing')
+
+    copy_content(source, target, chunk_size=64 * 1024)
+    with open(target, 'rb') as fh:
+        assert fh.read() == content
+
+
+def test_scanner(temp_dir):
+    from pydgeot.filesystem import Scanner
+
+    expected = set()
+    for rel in ('file01', os.path.join('sub', 'file02'), os.path.join('sub', 'subsub', 'file03')):
+        path = os.path.join(temp_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(rel)
+        expected.add((rel, len(rel), os.stat(path).st_mtime_ns))
+
+    assert set(Scanner(temp_dir).scan()) == expected
+    assert set(Scanner(temp_dir, jobs=4).scan()) == expected
+    assert set(Scanner(os.path.join(temp_dir, 'missing')).scan()) == set()
+
+
+def test_scanner_snapshots(temp_dir):
+    from pydgeot.filesystem import Scanner
+
+    for rel in ('file01', os.path.join('sub', 'file02')):
+        path = os.path.join(temp_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(rel)
+    # Directories modified within the racy window are not snapshotted.
+    scanner = Scanner(temp_dir)
+    list(scanner.scan())
+    assert scanner.directories == {}
+
+    sub_dir = os.path.join(temp_dir, 'sub')
+    for path in (temp_dir, sub_dir):
+        os.utime(path, ns=(0, 0))
+    scanner = Scanner(temp_dir)
+    list(scanner.scan())
+    assert set(scanner.directories) == {temp_dir, sub_dir}
+    assert scanner.directories[temp_dir].files == ('file01', )
+    assert scanner.directories[temp_dir].directories == ('sub', )
+
+    # Unchanged directories are not listed again, so a file slipped in without moving the mtime goes unseen.
+    with open(os.path.join(sub_dir, 'file03'), 'w') as fh:
+        fh.write('file03')
+    os.utime(sub_dir, ns=(0, 0))
+    snapshots = scanner.directories
+    scanner = Scanner(temp_dir, snapshots=snapshots)
+    assert set(entry.path for entry in scanner.scan()) == {'file01', os.path.join('sub', 'file02')}
+    scanner = Scanner(temp_dir, snapshots=snapshots, trusted=True)
+    assert set(scanner.scan()) == {('file01', None, None), (os.path.join('sub', 'file02'), None, None)}
+
+    os.utime(sub_dir, ns=(1, 1))
+    scanner = Scanner(temp_dir, snapshots=snapshots)
+    assert os.path.join('sub', 'file03') in set(entry.path for entry in scanner.scan())
+    assert set(scanner.directories[sub_dir].files) == {'file02', 'file03'}
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='inotify is only available on Linux')
+def test_inotify(temp_dir):
+    from pydgeot.filesystem import inotify
+
+    with inotify.Inotify() as notifier:
+        wd = notifier.add_watch(temp_dir, inotify.IN_CREATE | inotify.IN_CLOSE_WRITE)
+        with open(os.path.join(temp_dir, 'file01'), 'w') as fh:
+            fh.write('file01')
+
+        events = notifier.read_events()
+
+        assert [(e.wd, e.mask, e.name) for e in events] == [(wd, inotify.IN_CREATE, 'file01'),
+                                                          (wd, inotify.IN_CLOSE_WRITE, 'file01')]
+        assert notifier.read_events() == []
@@ -1,4 +1,7 @@
 import os
+import re
+import logging
+import pytest
 
 
 def test_generate(temp_app, resources):
@@ -25,3 +28,171 @@ def test_delete(temp_app, resources):
     gen.generate()
 
     assert resources.equal('test_generator/expected_build_delete', temp_app.build_root)
+
+
+def test_generate_jobs(temp_app, resources):
+    from pydgeot.generator import Generator
+
+    resources.copy('test_generator/source_app', temp_app.root)
+
+    gen = Generator(temp_app, jobs=4)
+    gen.generate()
+
+    assert resources.equal('test_generator/expected_build_generate', temp_app.build_root)
+
+
+def test_content_hash(temp_app, resources):
+    from pydgeot.generator import Generator
+
+    resources.copy('test_generator/source_app', temp_app.root)
+    temp_app.settings['content_hash'] = True
+
+    gen = Generator(temp_app)
+    gen.generate()
+
+    path = os.path.join(temp_app.source_root, 'index.txt')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime + 10, stat.st_mtime + 10))
+
+    changes = gen.collect_changes()
+
+    assert len(changes.generate) == 0
+    assert gen.collect_changes().generate == set()
+
+    with open(path, 'a') as fh:
+        fh.write('changed')
+
+    assert gen.collect_changes().generate == {path}
+
+
+def test_path_changes(temp_app, resources):
+    from pydgeot.generator import Generator
+
+    resources.copy('test_generator/source_app', temp_app.root)
+
+    gen = Generator(temp_app)
+    gen.generate()
+
+    index_path = os.path.join(temp_app.source_root, 'index.txt')
+    subindex_path = os.path.join(temp_app.source_root, 'sub', 'subindex.txt')
+    new_dir = os.path.join(temp_app.source_root, 'new')
+    new_path = os.path.join(new_dir, 'new.txt')
+    with open(index_path, 'a') as fh:
+        fh.write('changed')
+    os.unlink(subindex_path)
+    os.makedirs(new_dir)
+    with open(new_path, 'w') as fh:
+        fh.write('new')
+
+    changes = gen.collect_path_changes([index_path, subindex_path, new_dir,
+                                        os.path.join(temp_app.source_root, 'missing.txt')])
+
+    assert changes.generate == {index_path, new_path}
+    assert changes.delete == {subindex_path}
+
+
+def test_profile(temp_app, resources):
+    import json
+    from pydgeot.generator import Generator
+    from pydgeot.profiler import BuildProfiler
+
+    resources.copy('test_generator/source_app', temp_app.root)
+
+    profiler = BuildProfiler(temp_app, top=2)
+    gen = Generator(temp_app, jobs=2, profiler=profiler)
+    gen.generate()
+
+    with open(profiler.save()) as fh:
+        report = json.load(fh)
+
+    assert [phase['name'] for phase in report['phases']] == ['scan', 'dependencies', 'delete', 'prepare', 'generate',
+                                                             'generation_complete', 'commit']
+    assert report['wall'] > 0
+    generated = set(entry['path'] for entry in report['files'] if entry['phase'] == 'generate')
+    assert 'index.txt' in generated
+    assert report['processors']['fallback']['generate']['count'] == len(generated)
+    assert len(profiler.slowest()) == 2
+
+
+def test_fallback_copy_mode(temp_app, resources):
+    import json
+    from pydgeot.generator import Generator
+
+    resources.copy('test_generator/source_app', temp_app.root)
+    with open(os.path.join(temp_app.source_root, 'sub', '.pydgeot.conf'), 'w') as fh:
+        json.dump({'fallback': {'copy_mode': 'hardlink'}}, fh)
+
+    gen = Generator(temp_app)
+    gen.generate()
+
+    assert resources.equal('test_generator/expected_build_generate', temp_app.build_root)
+    assert os.path.samefile(os.path.join(temp_app.source_root, 'sub', 'subindex.txt'),
+                            os.path.join(temp_app.build_root, 'sub', 'subindex.txt'))
+    assert not os.path.samefile(os.path.join(temp_app.source_root, 'index.txt'),
+                                os.path.join(temp_app.build_root, 'index.txt'))
+
+
+@pytest.mark.parametrize('copy_jobs', [1, 4])
+def test_fallback_copy_jobs(temp_app, resources, caplog, copy_jobs):
+    from pydgeot.generator import Generator
+
+    resources.copy('test_generator/source_app', temp_app.root)
+    temp_app.settings['copy_jobs'] = copy_jobs
+
+    with caplog.at_level(logging.INFO, logger='app'):
+        gen = Generator(temp_app, jobs=2)
+        gen.generate()
+
+    # Every copy has finished, with its content and modified time, by the time generate returns.
+    assert resources.equal('test_generator/expected_build_generate', temp_app.build_root)
+    for rel in ('index.txt', 'no.ignore', os.path.join('sub', 'subindex.txt'), os.path.join('sub', 'no.ignore')):
+        assert (os.stat(os.path.join(temp_app.source_root, rel)).st_mtime_ns ==
+                os.stat(os.path.join(temp_app.build_root, rel)).st_mtime_ns)
+    assert any(re.match(r'\[fallback\] copied 4 files \(.*MB\) in .*s, .*MB/s, skipped 0 unchanged files$',
+                        record.getMessage()) for record in caplog.records)
+
+
+@pytest.mark.parametrize('copy_jobs', [1, 4])
+def test_fallback_copy_error(temp_app, resources, caplog, monkeypatch, copy_jobs):
+    from pydgeot.generator import Generator
+    from pydgeot.processors.builtins import fallback
+
+    resources.copy('test_generator/source_app', temp_app.root)
+    temp_app.settings['copy_jobs'] = copy_jobs
+
+    def copy_file(source, target, *args):
+        if source.endswith('subindex.txt'):
+            raise OSError('Copy failed')
+        return original_copy_file(source, target, *args)
+
+    original_copy_file = fallback.copy_file
+    monkeypatch.setattr(fallback, 'copy_file', copy_file)
+
+    with caplog.at_level(logging.INFO, logger='app'):
+        Generator(temp_app).generate()
+
+    assert os.path.isfile(os.path.join(temp_app.build_root, 'index.txt'))
+    assert not os.path.exists(os.path.join(temp_app.build_root, 'sub', 'subindex.txt'))
+    errors = [record for record in caplog.records if record.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert errors[0].getMessage() == '[fallback] exception.generate "{}" Copy failed'.format(
+        os.path.join('sub', 'subindex.txt'))
+    # Only files that were copied have their targets set.
+    assert len(temp_app.sources.get_targets(os.path.join(temp_app.source_root, 'index.txt'))) == 1
+    assert temp_app.sources.get_targets(os.path.join(temp_app.source_root, 'sub', 'subindex.txt')) == set()
+
+
+@pytest.mark.parametrize('scan_mode, snapshots', [(None, False), ('full', False), ('prune', True), ('trusted', True)])
+def test_scan_mode(temp_app, resources, scan_mode, snapshots):
+    from pydgeot.generator import Generator
+
+    resources.copy('test_generator/source_app', temp_app.root)
+    if scan_mode is not None:
+        temp_app.settings['scan_mode'] = scan_mode
+
+    gen = Generator(temp_app)
+    gen.generate()
+
+    assert resources.equal('test_generator/expected_build_generate', temp_app.build_root)
+    # Only the opt in scan modes store directory snapshots to skip listing unchanged directories with.
+    assert (len(temp_app.sources.get_directories(temp_app.source_root)) > 0) == snapshots
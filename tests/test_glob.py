@@ -18,3 +18,13 @@ def test_match_path():
     assert glob.match_path('test/dir/subdir/subtest01/test.html')
     assert not glob.match_path('test/subtest01/test.html')
     assert not glob.match_path('test/dir/subtest0/test.html')
+
+
+def test_as_like():
+    from pydgeot.filesystem import Glob
+
+    assert Glob('test_*').like == ('test\\_%', False)
+    assert Glob('**.html').like == ('%.html', True)
+    assert Glob('test/**/ex??**').like is None
+    assert Glob('test/*.html').like is None
+    assert Glob('test+*').like is None
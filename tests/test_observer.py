@@ -0,0 +1,129 @@
+import os
+import sys
+import pytest
+
+
+def _observer(monkeypatch, now):
+    import pydgeot.observer
+    from pydgeot.observer import _ObserverBase
+
+    monkeypatch.setattr(pydgeot.observer.time, 'time', lambda: now[0])
+    observer = _ObserverBase('')
+    signaled = []
+    observer.on_changed_handlers.add(signaled.append)
+    return observer, signaled
+
+
+def test_changed_timeout(monkeypatch):
+    now = [100.0]
+    observer, signaled = _observer(monkeypatch, now)
+
+    observer.queue_changed('file')
+    now[0] += observer.event_timeout
+    assert observer.next_timeout() == observer.event_timeout
+    observer.signal_changed()
+    assert signaled == []
+
+    now[0] += observer.changed_timeout
+    observer.signal_changed()
+    assert signaled == [{'file'}]
+
+
+def test_finished_settle(monkeypatch):
+    now = [100.0]
+    observer, signaled = _observer(monkeypatch, now)
+
+    observer.queue_changed('file01')
+    observer.queue_changed('file01', finished=True)
+    observer.queue_changed('file02', finished=True)
+    assert observer.next_timeout() == pytest.approx(observer.settle_timeout)
+
+    now[0] += observer.settle_timeout
+    observer.signal_changed()
+    assert signaled == [{'file01', 'file02'}]
+    assert observer.changed == {}
+
+
+def test_adaptive_settle(monkeypatch):
+    now = [100.0]
+    observer, signaled = _observer(monkeypatch, now)
+
+    # Written again after finishing, so the settle period doubles.
+    observer.queue_changed('file', finished=True)
+    observer.queue_changed('file')
+    observer.queue_changed('file', finished=True)
+    now[0] += observer.settle_timeout
+    observer.signal_changed()
+    assert signaled == []
+
+    now[0] += observer.settle_timeout
+    observer.signal_changed()
+    assert signaled == [{'file'}]
+
+    # Halved again after signaling.
+    assert observer.settle == {}
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='inotify is only available on Linux')
+def test_inotify_watches(temp_dir):
+    from pydgeot.filesystem import inotify
+    from pydgeot.observer import Observer
+
+    assert Observer.observer == 'inotify'
+
+    sub_dir = os.path.join(temp_dir, 'sub')
+    observer = Observer(temp_dir)
+    with inotify.Inotify() as observer.inotify:
+        observer.add_watches(temp_dir)
+        os.makedirs(sub_dir)
+        observer.process_events()
+        assert sorted(observer.watches.values()) == [temp_dir, sub_dir]
+
+        path = os.path.join(sub_dir, 'file01')
+        with open(path, 'w') as fh:
+            fh.write('file01')
+        observer.process_events()
+        assert set(observer.changed) == {sub_dir, path}
+        assert set(observer.finished) == {sub_dir, path}
+
+        os.rename(sub_dir, os.path.join(temp_dir, 'moved'))
+        observer.process_events()
+        assert sorted(observer.watches.values()) == [temp_dir, os.path.join(temp_dir, 'moved')]
+
+
+def test_polling(temp_dir):
+    from pydgeot.observer import PollingObserver
+
+    sub_dir = os.path.join(temp_dir, 'sub')
+    paths = [os.path.join(temp_dir, 'file01'), os.path.join(sub_dir, 'file02'), os.path.join(sub_dir, 'file03')]
+    os.makedirs(sub_dir)
+    for path in paths:
+        with open(path, 'w') as fh:
+            fh.write(path)
+    for path in (temp_dir, sub_dir):
+        os.utime(path, ns=(0, 0))
+
+    observer = PollingObserver(temp_dir)
+    assert observer.poll(budget=0, report=False)
+    assert observer.directories['sub'].files in (('file02', 'file03'), ('file03', 'file02'))
+
+    os.utime(paths[1], ns=(1, 1))
+    os.unlink(paths[0])
+    os.makedirs(os.path.join(temp_dir, 'new'))
+
+    # Listing the root directory uses the first polls budget, leaving its subdirectories for the next poll.
+    assert not observer.poll(budget=1)
+    assert set(observer.changed) == {paths[0], os.path.join(temp_dir, 'new')}
+    assert observer.poll(budget=4)
+    assert set(observer.changed) == {paths[0], paths[1], os.path.join(temp_dir, 'new')}
+
+
+def test_directory_events(temp_dir, monkeypatch):
+    now = [100.0]
+    observer, signaled = _observer(monkeypatch, now)
+
+    # Directories are only queued when created, deleted or moved, not when a file inside them changes.
+    observer.queue_changed(temp_dir)
+    assert observer.changed == {}
+    observer.queue_changed(temp_dir, structural=True)
+    assert set(observer.changed) == {temp_dir}
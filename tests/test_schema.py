@@ -0,0 +1,50 @@
+import sqlite3
+
+
+def test_migrate(temp_dir):
+    import os
+    from pydgeot.app import schema
+
+    connection = sqlite3.connect(os.path.join(temp_dir, 'test.db'))
+    cursor = connection.cursor()
+    schema.migrate(cursor)
+
+    assert schema.get_version(cursor) == len(schema.migrations)
+
+    # Migrating an up to date database does nothing.
+    schema.migrate(cursor)
+
+    assert schema.get_version(cursor) == len(schema.migrations)
+
+
+def test_migrate_unversioned(temp_dir):
+    import os
+    from pydgeot.app import schema
+
+    connection = sqlite3.connect(os.path.join(temp_dir, 'test.db'))
+    cursor = connection.cursor()
+    # Databases created before schema versioning only had the base tables.
+    schema.migrations[0](cursor)
+    cursor.execute("INSERT INTO sources (path, size, modified) VALUES ('test', 0, 0)")
+    connection.commit()
+
+    schema.migrate(cursor)
+
+    indexes = [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+    assert 'source_targets_path' in indexes
+    assert cursor.execute('SELECT path FROM sources').fetchall() == [('test', )]
+
+
+def test_migrate_newer(temp_dir):
+    import os
+    import pytest
+    from pydgeot.app import AppError, schema
+
+    connection = sqlite3.connect(os.path.join(temp_dir, 'test.db'))
+    cursor = connection.cursor()
+    schema.migrate(cursor)
+    cursor.execute('UPDATE schema_version SET version = ?', (len(schema.migrations) + 1, ))
+    connection.commit()
+
+    with pytest.raises(AppError):
+        schema.migrate(cursor)
@@ -51,6 +51,21 @@ def test_gets_recursive(temp_app):
     assert results == expected
 
 
+def test_gets_case_insensitive(temp_app):
+    temp_app.sources.add_source('Test/source01')
+    temp_app.sources.add_source('Test/Other/source02')
+    temp_app.sources.add_source('testing/source03')
+
+    assert temp_app.sources.get_sources('test', recursive=False) == {_source_result(temp_app, 'Test/source01')}
+    assert temp_app.sources.get_sources('test', recursive=True) == {_source_result(temp_app, 'Test/source01'),
+                                                                    _source_result(temp_app, 'Test/Other/source02')}
+
+    condition, params = temp_app.directory_filter(temp_app.source_path('test'), recursive=True)
+    plan = temp_app.db_cursor.execute('EXPLAIN QUERY PLAN SELECT id FROM sources WHERE {0}'.format(condition),
+                                      params).fetchall()
+    assert any('sources_directory_nocase' in row[-1] for row in plan)
+
+
 def test_remove(temp_app):
     temp_app.sources.add_source('source')
     temp_app.sources.remove_source('source')
@@ -84,3 +99,119 @@ def test_dependencies(temp_app):
     results = temp_app.sources.get_dependencies('source01')
 
     assert results == expected
+
+
+def test_dependencies_reverse_recursive(temp_app):
+    expected = {
+        _source_result(temp_app, 'source01'),
+        _source_result(temp_app, 'source02'),
+        _source_result(temp_app, 'source03')
+    }
+
+    temp_app.sources.set_dependencies('source01', ['source02'])
+    temp_app.sources.set_dependencies('source02', ['source03'])
+    temp_app.sources.set_dependencies('source03', ['source01', 'source04'])
+
+    results = temp_app.sources.get_dependencies('source04', reverse=True, recursive=True)
+
+    assert results == expected
+
+    temp_app.sources.remove_source('source02')
+
+    results = temp_app.sources.get_dependencies('source04', reverse=True, recursive=True)
+
+    assert results == {_source_result(temp_app, 'source03')}
+
+
+def test_dependencies_reload(temp_app):
+    from pydgeot.app.sources import Sources
+
+    temp_app.sources.set_dependencies('source01', ['source02', 'source03'])
+    temp_app.sources.set_dependencies('source01', ['source03'])
+
+    expected = temp_app.sources.get_dependencies('source03', reverse=True)
+    results = Sources(temp_app).get_dependencies('source03', reverse=True)
+
+    assert results == expected == {_source_result(temp_app, 'source01')}
+
+
+def test_dependency_tree(temp_app):
+    expected = {temp_app.source_path('source01'), temp_app.source_path('source02'), temp_app.source_path('source04')}
+
+    temp_app.sources.set_dependencies('source01', ['source02'])
+    temp_app.sources.set_dependencies('source02', ['source03'])
+    temp_app.sources.set_dependencies('source04', ['source05'])
+
+    results = temp_app.sources.get_dependency_tree(['source03', 'source05'], reverse=True)
+
+    assert results == expected
+
+
+def test_gets_recursive_sibling(temp_app):
+    expected = {
+        _source_result(temp_app, 'test/source02'),
+        _source_result(temp_app, 'test/other/source04')
+    }
+
+    temp_app.sources.add_source('test/source02')
+    temp_app.sources.add_source('test/other/source04')
+    temp_app.sources.add_source('test-other/source05')
+    temp_app.sources.add_source('test0/source06')
+
+    results = temp_app.sources.get_sources('test', recursive=True)
+
+    assert results == expected
+
+
+def test_directories(temp_app):
+    from pydgeot.filesystem import DirectorySnapshot
+
+    root = temp_app.source_root
+    test = temp_app.source_path('test')
+    snapshots = {
+        root: DirectorySnapshot(1, ('source01', ), ('test', 'test-other')),
+        test: DirectorySnapshot(2, ('source02', ), ()),
+        temp_app.source_path('test-other'): DirectorySnapshot(3, (), ())
+    }
+
+    temp_app.sources.set_directories(root, snapshots)
+    assert temp_app.sources.get_directories(root) == snapshots
+    assert temp_app.sources.get_directories('test') == {test: snapshots[test]}
+
+    temp_app.sources.set_directories('test', {})
+    assert set(temp_app.sources.get_directories(root)) == {root, temp_app.source_path('test-other')}
+
+
+def test_set_many(temp_app):
+    from pydgeot.app.sources import Sources
+
+    temp_app.sources.set_many_targets({'source01': ['target01', 'target02'], 'source02': ['target03']})
+    temp_app.sources.set_many_dependencies({'source01': ['source03'], 'source02': ['source03', 'source04']})
+    target_ids = set(temp_app.db_cursor.execute("SELECT id FROM source_targets WHERE path = 'target01'"))
+
+    temp_app.sources.set_many_targets({'source01': ['target01']})
+    temp_app.sources.set_many_dependencies({'source02': ['source04']})
+
+    assert temp_app.sources.get_targets('source01') == {_source_result(temp_app, 'target01', build_root=True)}
+    assert temp_app.sources.get_targets('source02') == {_source_result(temp_app, 'target03', build_root=True)}
+    assert set(temp_app.db_cursor.execute("SELECT id FROM source_targets WHERE path = 'target01'")) == target_ids
+    for sources in (temp_app.sources, Sources(temp_app)):
+        assert sources.get_dependencies('source03', reverse=True) == {_source_result(temp_app, 'source01')}
+        assert sources.get_dependencies('source02') == {_source_result(temp_app, 'source04')}
+
+
+def test_clean_many(temp_app):
+    count = 1200
+    paths = ['sub/source{:04}'.format(i) for i in range(count)]
+    temp_app.sources.set_many_targets(dict((path, [path + '.html']) for path in paths))
+    temp_app.sources.set_many_dependencies(dict((path, [paths[(i + 1) % count]]) for i, path in enumerate(paths)))
+    temp_app.sources.set_dependencies('source01', [paths[0]])
+    for path in paths:
+        temp_app.contexts.add_context(path, 'test', 0)
+
+    temp_app.sources.clean([temp_app.source_path('sub')])
+    temp_app.contexts.clean([temp_app.source_path('sub')])
+
+    assert temp_app.sources.get_sources() == {_source_result(temp_app, 'source01')}
+    assert temp_app.sources.get_dependencies('source01') == set()
+    assert temp_app.contexts.get_contexts(name='test') == set()
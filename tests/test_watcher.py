@@ -0,0 +1,159 @@
+import os
+import sys
+import asyncio
+import pytest
+
+
+def _watch(temp_app, resources, observer, write):
+    from pydgeot.generator import Generator
+    from pydgeot.watcher import Watcher
+
+    resources.copy('test_generator/source_app', temp_app.root)
+    gen = Generator(temp_app)
+    gen.generate()
+
+    watcher = Watcher(gen, observer)
+
+    async def main():
+        built = asyncio.get_event_loop().create_future()
+        watcher.consumers.add(lambda changes: built.done() or built.set_result(changes))
+        task = asyncio.ensure_future(watcher.run(write()))
+        try:
+            return await asyncio.wait_for(built, 5)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def test_watcher_threaded(temp_app, resources):
+    import time
+    from pydgeot.observer import _ObserverBase
+
+    path = os.path.join(temp_app.source_root, 'index.txt')
+
+    class TestObserver(_ObserverBase):
+        def start(self):
+            with open(path, 'a') as fh:
+                fh.write('changed')
+            self.on_changed({path})
+            while not self.wait(0.01):
+                pass
+            stopped.append(True)
+
+    async def write():
+        pass
+
+    stopped = []
+    changes = _watch(temp_app, resources, TestObserver(temp_app.source_root), write)
+
+    assert changes.generate == {path}
+    # The observer thread stops once the watcher is cancelled.
+    for _ in range(100):
+        if stopped:
+            break
+        time.sleep(0.01)
+    assert stopped == [True]
+
+
+def test_watcher_build_error(temp_app, resources, monkeypatch):
+    from pydgeot.app import AppError
+    from pydgeot.generator import Generator
+    from pydgeot.observer import _ObserverBase
+
+    path = os.path.join(temp_app.source_root, 'index.txt')
+    process_changes = Generator.process_changes
+    calls = []
+
+    def failing_process_changes(self, changes):
+        calls.append(changes)
+        # Fail the first watched build, after the initial build.
+        if len(calls) == 2:
+            raise AppError('Could not load config')
+        return process_changes(self, changes)
+
+    monkeypatch.setattr(Generator, 'process_changes', failing_process_changes)
+
+    class TestObserver(_ObserverBase):
+        def start(self):
+            for _ in range(2):
+                with open(path, 'a') as fh:
+                    fh.write('changed')
+                self.on_changed({path})
+                self.wait(0.2)
+            while not self.wait(0.01):
+                pass
+
+    async def write():
+        pass
+
+    changes = _watch(temp_app, resources, TestObserver(temp_app.source_root), write)
+
+    assert len(calls) == 3
+    assert changes.generate == {path}
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='inotify is only available on Linux')
+def test_watcher_inotify(temp_app, resources):
+    from pydgeot.observer import Observer
+
+    path = os.path.join(temp_app.source_root, 'index.txt')
+
+    async def write():
+        await asyncio.sleep(0.1)
+        with open(path, 'a') as fh:
+            fh.write('changed')
+
+    changes = _watch(temp_app, resources, Observer(temp_app.source_root), write)
+
+    assert changes.generate == {path}
+
+
+def test_watcher_cancel_build(temp_app, resources, monkeypatch):
+    import time
+    import threading
+    from pydgeot.generator import Generator
+    from pydgeot.observer import _ObserverBase
+    from pydgeot.watcher import Watcher
+
+    path = os.path.join(temp_app.source_root, 'index.txt')
+    process_changes = Generator.process_changes
+    started = threading.Event()
+    finished = []
+
+    def slow_process_changes(self, changes):
+        if started.is_set() or changes.generate != {path}:
+            return process_changes(self, changes)
+        started.set()
+        time.sleep(0.2)
+        process_changes(self, changes)
+        finished.append(changes)
+
+    resources.copy('test_generator/source_app', temp_app.root)
+    gen = Generator(temp_app)
+    gen.generate()
+    monkeypatch.setattr(Generator, 'process_changes', slow_process_changes)
+
+    class TestObserver(_ObserverBase):
+        def start(self):
+            with open(path, 'a') as fh:
+                fh.write('changed')
+            self.on_changed({path})
+            while not self.wait(0.01):
+                pass
+
+    async def main():
+        task = asyncio.ensure_future(Watcher(gen, TestObserver(temp_app.source_root)).run())
+        await asyncio.get_event_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+
+    # Cancelling the watcher part way through a build waits for the build to finish.
+    assert len(finished) == 1